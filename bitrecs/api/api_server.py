@@ -11,13 +11,14 @@ from functools import partial
 from fastapi import FastAPI, HTTPException, Request, APIRouter, Header
 from fastapi.responses import JSONResponse
 from fastapi.middleware.gzip import GZipMiddleware
-from bitrecs.llms.prompt_factory import PromptFactory
+from bitrecs.llms.context_packer import context_packer
 from bitrecs.utils import constants as CONST
-from bitrecs.commerce.product import ProductFactory
+from bitrecs.commerce.catalog_cache import catalog_cache
 from bitrecs.protocol import BitrecsRequest
+from bitrecs.utils.parsing import get_parsed_response
 from bitrecs.api.api_core import filter_allowed_ips, limiter
 from bitrecs.api.utils import (
-    api_key_validator, get_proxy_public_key, 
+    api_key_validator, get_proxy_public_key, get_strict_recs,
     json_only_middleware, parse_ip_whitelist
 )
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
@@ -93,6 +94,7 @@ class ApiServer:
         self.router = APIRouter()
         self.router.add_api_route("/ping", self.ping, methods=["GET"])
         self.router.add_api_route("/version", self.version, methods=["GET"])
+        self.router.add_api_route("/latency", self.latency, methods=["GET"])
         if self.network == "localnet":
             self.router.add_api_route("/rec", self.generate_product_rec_localnet, methods=["POST"]) 
         elif self.network == "testnet":
@@ -201,6 +203,13 @@ class ApiServer:
         return JSONResponse(status_code=200, content={"detail": "version", "meta_data": v, "st": st})
     
     
+    async def latency(self, request: Request):
+        bt.logging.info(f"\033[1;32m API Server latency \033[0m")
+        st = int(time.time())
+        histograms = self.validator.miner_latency.to_dict()
+        return JSONResponse(status_code=200, content={"detail": "latency", "miners": histograms, "st": st})
+    
+    
     async def generate_product_rec_localnet(
             self, 
             request: BitrecsRequest,
@@ -219,19 +228,19 @@ class ApiServer:
           
             await self.verify_request_localnet(request, x_signature, x_timestamp)
 
-            store_catalog = ProductFactory.try_parse_context(request.context)
-            catalog_size = len(store_catalog)
+            catalog = catalog_cache.get(request.context, request.site_key)
+            if catalog.error == "dupes":
+                bt.logging.error(f"API Too many duplicates in catalog: {catalog.dupes}")
+                return JSONResponse(status_code=400,
+                                    content={"detail": "error - dupe threshold reached", "status_code": 400})
+            catalog_size = len(catalog.products)
             bt.logging.trace(f"REQUEST CATALOG SIZE: {catalog_size}")
             if catalog_size < CONST.MIN_CATALOG_SIZE or catalog_size > CONST.MAX_CATALOG_SIZE:
                 bt.logging.error(f"API invalid catalog size")                
                 return JSONResponse(status_code=400,
                                     content={"detail": "error - invalid catalog", "status_code": 400})            
             
-            dupes = ProductFactory.get_dupe_count(store_catalog)
-            if dupes > catalog_size * CONST.CATALOG_DUPE_THRESHOLD:
-                bt.logging.error(f"API Too many duplicates in catalog: {dupes}")                
-                return JSONResponse(status_code=400,
-                                    content={"detail": "error - dupe threshold reached", "status_code": 400})
+            request.context = catalog.context
 
             st = time.perf_counter()
             response = await self.forward_fn(request)
@@ -242,7 +251,7 @@ class ApiServer:
                 return JSONResponse(status_code=500,
                                     content={"detail": "error - forward", "status_code": 500})
 
-            final_recs = [json.loads(idx.replace("'", '"')) for idx in response.results]            
+            final_recs = get_parsed_response(response).items
             response_text = "Bitrecs Took {:.2f} seconds to process this request".format(total_time)
 
             response = {
@@ -292,22 +301,27 @@ class ApiServer:
 
             await self.verify_request_signature(request, x_signature, x_timestamp)
 
-            if len(request.context) > 100_000:
-                tc = PromptFactory.get_token_count(request.context)
-                if tc > CONST.MAX_CONTEXT_TOKEN_COUNT:
-                    bt.logging.error(f"API context too large: {tc} tokens")
-                    return JSONResponse(status_code=400,
-                                        content={"detail": "error - context too large", "status_code": 400})
-
-            store_catalog = ProductFactory.try_parse_context_strict(request.context)
+            catalog = catalog_cache.get(request.context, request.site_key)
+            bt.logging.trace(f"Catalog cache: {catalog_cache.stats()}")
+            store_catalog = catalog.products
             catalog_size = len(store_catalog)
             bt.logging.trace(f"REQUEST CATALOG SIZE: {catalog_size}")
+            if catalog.error == "dupes":
+                bt.logging.error(f"API Too many duplicates in catalog: {catalog.dupes}")
+                return JSONResponse(status_code=400,
+                                    content={"detail": "error - dupe threshold reached", "status_code": 400})
             if catalog_size < CONST.MIN_CATALOG_SIZE or catalog_size > CONST.MAX_CATALOG_SIZE:
                 bt.logging.error(f"API invalid catalog size")
                 return JSONResponse(status_code=400,
                                     content={"detail": "error - invalid catalog - size", "status_code": 400})
+            if len(catalog.context) > 100_000:
+                tc = context_packer.count(catalog.context)
+                if tc > CONST.MAX_CONTEXT_TOKEN_COUNT:
+                    bt.logging.error(f"API context too large: {tc} tokens")
+                    return JSONResponse(status_code=400,
+                                        content={"detail": "error - context too large", "status_code": 400})
             
-            request.context = json.dumps([asdict(store_catalog) for store_catalog in store_catalog], separators=(',', ':'))
+            request.context = catalog.context
             sn_t = time.perf_counter()
             response = await self.forward_fn(request)
             subnet_time = time.perf_counter() - sn_t
@@ -338,7 +352,7 @@ class ApiServer:
 
             #final_recs = [json.loads(idx.replace("'", '"')) for idx in response.results]
             
-            final_recs = [json.loads(idx) for idx in response.results]
+            final_recs = get_strict_recs(response)
             response = {
                 "user": "", 
                 "original_query": response.query,
@@ -388,22 +402,27 @@ class ApiServer:
 
             await self.verify_request_signature(request, x_signature, x_timestamp)
 
-            if len(request.context) > 100_000:
-                tc = PromptFactory.get_token_count(request.context)
-                if tc > CONST.MAX_CONTEXT_TOKEN_COUNT:
-                    bt.logging.error(f"API context too large: {tc} tokens")
-                    return JSONResponse(status_code=400,
-                                        content={"detail": "error - context too large", "status_code": 400})
-
-            store_catalog = ProductFactory.try_parse_context_strict(request.context)
+            catalog = catalog_cache.get(request.context, request.site_key)
+            bt.logging.trace(f"Catalog cache: {catalog_cache.stats()}")
+            store_catalog = catalog.products
             catalog_size = len(store_catalog)
             bt.logging.trace(f"REQUEST CATALOG SIZE: {catalog_size}")
+            if catalog.error == "dupes":
+                bt.logging.error(f"API Too many duplicates in catalog: {catalog.dupes}")
+                return JSONResponse(status_code=400,
+                                    content={"detail": "error - dupe threshold reached", "status_code": 400})
             if catalog_size < CONST.MIN_CATALOG_SIZE or catalog_size > CONST.MAX_CATALOG_SIZE:
                 bt.logging.error(f"API invalid catalog size: {catalog_size} skus")
                 return JSONResponse(status_code=400,
                                     content={"detail": "error - invalid catalog - size", "status_code": 400})
+            if len(catalog.context) > 100_000:
+                tc = context_packer.count(catalog.context)
+                if tc > CONST.MAX_CONTEXT_TOKEN_COUNT:
+                    bt.logging.error(f"API context too large: {tc} tokens")
+                    return JSONResponse(status_code=400,
+                                        content={"detail": "error - context too large", "status_code": 400})
             
-            request.context = json.dumps([asdict(store_catalog) for store_catalog in store_catalog], separators=(',', ':'))
+            request.context = catalog.context
             sn_t = time.perf_counter()
             response = await self.forward_fn(request)
             subnet_time = time.perf_counter() - sn_t
@@ -416,7 +435,7 @@ class ApiServer:
                                     content={"detail": "error - forward", "status_code": 500})
          
             #final_recs = [json.loads(idx.replace("'", '"')) for idx in response.results]            
-            final_recs = [json.loads(idx) for idx in response.results]
+            final_recs = get_strict_recs(response)
             response = {
                 "user": "", 
                 "original_query": response.query,
@@ -5,6 +5,8 @@ from typing import Any, Union
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from slowapi.errors import RateLimitExceeded
+from bitrecs.protocol import BitrecsRequest
+from bitrecs.utils.parsing import get_parsed_response
     
 
 def get_proxy_public_key(proxy_url: str) -> bytes:
@@ -82,4 +84,15 @@ def parse_ip_whitelist(whitelist_env: str) -> list[str]:
         except ValueError:
             bt.logging.error(f"Invalid IP address in whitelist: {ip_str}")
             raise ValueError(f"Invalid IP address in VALIDATOR_API_WHITELIST: {ip_str}")
-    return allowed_ips
\ No newline at end of file
+    return allowed_ips
+
+
+def get_strict_recs(response: BitrecsRequest) -> list[dict]:
+    """
+    Decoded results of the elected response, reusing the parse done during scoring.
+    Clients only get strict JSON, raises ValueError if any item needed repair.
+    """
+    parsed = get_parsed_response(response)
+    if not parsed.is_strict:
+        raise ValueError(f"Elected response is not strict JSON: {parsed.errors or parsed.repaired}")
+    return parsed.items
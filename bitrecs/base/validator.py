@@ -25,14 +25,13 @@ import threading
 import bittensor as bt
 import time
 import traceback
-import anyio.to_thread
 import wandb
 import anyio
 from random import SystemRandom
 safe_random = SystemRandom()
-from typing import List, Union, Optional
+from typing import Dict, List, Union, Optional
 from dataclasses import dataclass
-from queue import SimpleQueue, Empty
+from collections import deque
 from bitrecs.base.neuron import BaseNeuron
 from bitrecs.base.utils.weight_utils import (
     process_weights_for_netuid,
@@ -41,13 +40,19 @@ from bitrecs.base.utils.weight_utils import (
 from bitrecs.utils import constants as CONST
 from bitrecs.utils.config import add_validator_args
 from bitrecs.api.api_server import ApiServer
-from bitrecs.protocol import BitrecsRequest
+from bitrecs.protocol import BitrecsRequest, catalog_hash
 from bitrecs.utils.distance import (
+    analyze_similar_sets,
     display_rec_matrix_numpy,
-    rec_list_to_set, 
-    select_most_similar_bitrecs
+    response_to_set, 
+    select_quorum_bitrecs
 )
-from bitrecs.validator.reward import get_rewards
+from bitrecs.validator.reward import get_catalog_validator, get_rewards, validate_response
+from bitrecs.validator.latency import MinerLatencyTracker
+from bitrecs.validator.catalog_refs import CatalogRefTracker
+from bitrecs.validator.codecs import MinerCodecTracker
+from bitrecs.utils.compression import SUPPORTED_CODECS, decode_results, encode_text
+from bitrecs.utils.uids import get_weighted_miner_uids
 from bitrecs.validator.rules import validate_br_request
 from bitrecs.utils.logging import (    
     read_timestamp, 
@@ -56,26 +61,86 @@ from bitrecs.utils.logging import (
     write_node_info
 )
 from bitrecs.utils.wandb import WandbHelper
-from bitrecs.commerce.user_action import UserAction
+from bitrecs.commerce.user_action import UserAction, UserActionIndex
 from dotenv import load_dotenv
 load_dotenv()
 
-api_queue = SimpleQueue() # Queue of SynapseEventPair
-
 @dataclass
-class SynapseWithEvent:
-    """ Object that API server can send to main thread to be serviced. """
+class SynapseWithFuture:
+    """ Object that API server can send to the validator loop to be serviced. """
     input_synapse: BitrecsRequest
-    event: threading.Event
+    future: asyncio.Future
     output_synapse: BitrecsRequest
 
+    def set_result(self, output_synapse: Optional[BitrecsRequest] = None):
+        """
+        Resolve the future on the API server loop, the API will then return to the client.
+        Safe to call from any thread and more than once, only the first call wins.
+        """
+        if output_synapse is not None:
+            self.output_synapse = output_synapse
+        loop = self.future.get_loop()
+        if loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(self.output_synapse)
+
+
+class ApiRequestQueue:
+    """
+    Loop-safe queue between the API server loop and the validator loop.
+    Producers can put from any thread, the consumer awaits on the validator loop
+    without blocking it. Items put before the validator loop is bound are buffered.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: deque = deque()
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """ Attach the queue to the consuming (validator) loop, must be called from that loop. """
+        with self._lock:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            while self._pending:
+                self._queue.put_nowait(self._pending.popleft())
+
+    def put(self, item: SynapseWithFuture):
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._pending.append(item)
+                return
+            loop, queue = self._loop, self._queue
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[SynapseWithFuture]:
+        """ Wait for the next request, returns None if nothing arrived within timeout. """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def qsize(self) -> int:
+        with self._lock:
+            buffered = len(self._pending)
+            queue = self._queue
+        return buffered + (queue.qsize() if queue else 0)
+
+
+api_queue = ApiRequestQueue()
+
 
 async def api_forward(synapse: BitrecsRequest) -> BitrecsRequest:
     """ Forward function for API server. """
     bt.logging.trace(f"API FORWARD validator synapse type: {type(synapse)}")
-    synapse_with_event = SynapseWithEvent(
+    synapse_with_future = SynapseWithFuture(
         input_synapse=synapse,
-        event=threading.Event(),
+        future=asyncio.get_running_loop().create_future(),
         output_synapse=BitrecsRequest(
             name=synapse.name,                     
             created_at=synapse.created_at,
@@ -90,10 +155,9 @@ async def api_forward(synapse: BitrecsRequest) -> BitrecsRequest:
             miner_hotkey=""
         )
     )
-    api_queue.put(synapse_with_event)
-    # Wait until the main thread marks this synapse as processed.
-    await anyio.to_thread.run_sync(synapse_with_event.event.wait)
-    return synapse_with_event.output_synapse
+    api_queue.put(synapse_with_future)
+    # Wait until the validator loop resolves this synapse.
+    return await synapse_with_future.future
 
 
 class BaseValidatorNeuron(BaseNeuron):
@@ -120,6 +184,17 @@ class BaseValidatorNeuron(BaseNeuron):
         # Set up initial scoring weights for validation
         bt.logging.info("Building validation weights.")
         self.scores = np.zeros(self.metagraph.n, dtype=np.float32)
+        self.scores_lock = threading.Lock()
+        self.recent_validity = np.ones(self.metagraph.n, dtype=np.float32)
+        self.catalog_refs = CatalogRefTracker()
+        self.miner_codecs = MinerCodecTracker()
+
+        if self.config.neuron.similarity_mode == "minhash" and \
+            self.config.neuron.minhash_permutations % max(self.config.neuron.lsh_bands, 1) != 0:
+            raise Exception("--neuron.lsh_bands must divide --neuron.minhash_permutations")
+        if self.config.neuron.compression not in ("none", "auto") and \
+            self.config.neuron.compression not in SUPPORTED_CODECS:
+            raise Exception(f"--neuron.compression {self.config.neuron.compression} is not available, install zstandard")
 
         # Init sync with the network. Updates the metagraph.
         self.sync()
@@ -156,9 +231,14 @@ class BaseValidatorNeuron(BaseNeuron):
         self.is_running: bool = False
         self.thread: Union[threading.Thread, None] = None
         self.lock = asyncio.Lock()
+        self.background_tasks: set = set()
+        self.miner_latency = MinerLatencyTracker()
+        # Connect round trip of each active miner from the last miner sync, in seconds
+        self.miner_ping_latency: Dict[int, float] = {}
         self.active_miners: List[int] = []
         self.network = os.environ.get("NETWORK").strip().lower() #localnet / testnet / mainnet        
         self.user_actions: List[UserAction] = []
+        self.user_action_index = UserActionIndex()
         
         write_node_info(
             network=self.network,
@@ -180,7 +260,7 @@ class BaseValidatorNeuron(BaseNeuron):
                     "network": self.network,
                     "neuron_type": self.neuron_type,
                     "sample_size": self.config.neuron.sample_size,
-                    "num_concurrent_forwards": 1,
+                    "num_concurrent_forwards": self.config.neuron.num_concurrent_forwards,
                     "vpermit_tao_limit": self.config.neuron.vpermit_tao_limit,
                     "run_name": f"validator_{wandb.util.generate_id()}"
                 }
@@ -248,7 +328,7 @@ class BaseValidatorNeuron(BaseNeuron):
                     dendrite_time = 0
                     if "bt_header_dendrite_process_time" in headers:
                         dendrite_time = float(headers["bt_header_dendrite_process_time"])
-                    skus = rec_list_to_set(br.results)
+                    skus = response_to_set(br)
                     if skus:
                         valid_requests.append(br)
                         valid_recs.append(skus)
@@ -266,16 +346,25 @@ class BaseValidatorNeuron(BaseNeuron):
             
             top_n = await get_dynamic_top_n(len(valid_requests))
             bt.logging.info(f"\033[1;32m Top {top_n} of {len(valid_requests)}/{len(requests)} (valid/total) bitrecs \033[0m")
-            most_similar = select_most_similar_bitrecs(valid_requests, top_n)
+            approximate = (self.config.neuron.similarity_mode == "minhash"
+                           and len(valid_requests) >= self.config.neuron.lsh_min_responses)
+            analysis = analyze_similar_sets(valid_recs, top_n, approximate=approximate,
+                                            num_perm=self.config.neuron.minhash_permutations,
+                                            bands=self.config.neuron.lsh_bands)
+            if len(valid_requests) < 2:
+                most_similar = valid_requests
+            else:
+                most_similar = [valid_requests[i] for i in analysis.selected]
             if not most_similar:
                 bt.logging.warning(f"\033[33m No similar recs found in this round step: {self.step} \033[0m")
                 return
             for sim in most_similar:
                 bt.logging.info(f"\033[32m Miner {sim.miner_uid} {sim.models_used}\033[0m - batch: {sim.site_key}")
+            if len(analysis.pair_similarity):
+                bt.logging.info(f"Best pair similarity: {analysis.pair_similarity[0]:.3f} ({len(analysis.pairs)} pairs ranked)")
 
             if self.config.logging.trace:
-                most_similar_indices = [valid_requests.index(req) for req in most_similar]
-                matrix = display_rec_matrix_numpy(valid_recs, models_used, highlight_indices=most_similar_indices)            
+                matrix = display_rec_matrix_numpy(valid_recs, models_used, analysis=analysis)
                 bt.logging.trace(matrix)
 
             et = time.perf_counter()
@@ -289,6 +378,420 @@ class BaseValidatorNeuron(BaseNeuron):
             return
         
 
+    async def process_api_request(self, synapse_with_future: SynapseWithFuture):
+        """
+        Service a single API request: fan out to miners, score the responses and return
+        the consensus result to the client. Safe to run concurrently, shared state is
+        updated under the validator lock.
+        """
+        bt.logging.info("** Processing synapse from API server **")
+        bt.logging.info(f"Queue Size: {api_queue.qsize()}")
+
+        # Validate the input synapse
+        if not validate_br_request(synapse_with_future.input_synapse):
+            bt.logging.error("Request failed Validation, skipped.")
+            synapse_with_future.set_result()
+            return
+
+        chosen_uids : list[int] = list(self.active_miners)
+        if len(chosen_uids) == 0:
+            bt.logging.error("\033[31m API Request- No active miners, skipping - check your connectivity \033[0m")
+            synapse_with_future.set_result()
+            return
+        bt.logging.trace(f"chosen_uids: {chosen_uids}")
+
+        api_request = synapse_with_future.input_synapse
+        number_of_recs_desired = api_request.num_results
+        timeout = min(5, CONST.MAX_DENDRITE_TIMEOUT)
+        if not self.config.neuron.disable_adaptive_timeouts:
+            chosen_uids = self.filter_slow_miners(chosen_uids, timeout)
+        sampled_uids = self.sample_miners(chosen_uids)
+        skipped_uids = [uid for uid in chosen_uids if uid not in sampled_uids]
+        chosen_uids = sampled_uids
+        timeouts = [timeout] * len(chosen_uids)
+        if not self.config.neuron.disable_adaptive_timeouts:
+            timeouts = [self.miner_latency.timeout_for(uid, timeout, min_timeout=CONST.MIN_DENDRITE_TIMEOUT,
+                                                       headroom=CONST.LATENCY_TIMEOUT_HEADROOM)
+                        for uid in chosen_uids]
+        chosen_axons = [self.metagraph.axons[uid] for uid in chosen_uids]
+        if self.config.neuron.catalog_refs:
+            api_request.context_hash = catalog_hash(api_request.context)
+
+        st = time.perf_counter()
+        deadline = st + max(timeout, self.config.neuron.request_deadline)
+        tasks = self.query_miners(chosen_axons, api_request, timeouts)
+        if self.config.neuron.quorum > 0:
+            quorum = await self.await_quorum(number_of_recs_desired, api_request, tasks)
+            if quorum:
+                winner = safe_random.sample(quorum, 1)[0]
+                bt.logging.info(f"\033[1;32m Quorum miner: {winner.miner_uid} from {winner.models_used} in \033[1;32m{time.perf_counter()-st:0.4f}\033[0m seconds \033[0m")
+                elected = winner.model_copy()
+                elected.context = "" #save bandwidth
+                elected.user = ""
+                # Answer the client now, stragglers are scored in the background
+                synapse_with_future.set_result(elected)
+                self.track_background_task(
+                    self.score_stragglers(number_of_recs_desired, api_request, chosen_uids, tasks, skipped_uids)
+                )
+                return
+
+        responses = list(await asyncio.gather(*tasks))
+        #TODO: 503 error handling async bug?
+        any_success = any([r for r in responses if r.is_success])
+        if not any_success:
+            bt.logging.error("\033[1;33mRETRY ATTEMPT\033[0m")
+            responses = await self.retry_miners(chosen_uids, api_request, responses, deadline)
+        et = time.perf_counter()
+        bt.logging.trace(f"Miners responded with {len(responses)} responses in \033[1;32m{et-st:0.4f}\033[0m seconds")
+
+        # Adjust the scores based on responses from miners.
+        rewards = get_rewards(num_recs=number_of_recs_desired,
+                              ground_truth=api_request,
+                              responses=responses, actions=self.user_action_index)
+
+        if not len(chosen_uids) == len(responses) == len(rewards):
+            bt.logging.error("MISMATCH in lengths of chosen_uids, responses and rewards")
+            synapse_with_future.set_result()
+            return
+
+        # Default - send top score to client
+        selected_rec = rewards.argmax()
+        good_indices = np.where(rewards > 0)[0]
+        if len(good_indices) > 0:
+            good_responses = [responses[i] for i in good_indices]
+            bt.logging.info(f"Filtered to {len(good_responses)} from {len(responses)} total responses")
+            top_k = await self.analyze_similar_requests(number_of_recs_desired, good_responses)
+            if top_k and 1==1: #Top score now pulled from top_k
+                winner = safe_random.sample(top_k, 1)[0]
+                bt.logging.info(f"\033[1;32m Consensus miner: {winner.miner_uid} from {winner.models_used} - batch: {winner.site_key} \033[0m")
+                #bt.logging.trace(f"{winner.results}")
+                selected_rec = responses.index(winner)
+        else:
+            bt.logging.error("\033[1;33mZERO rewards - no valid candidates in responses \033[0m")
+            synapse_with_future.set_result()
+            return
+
+        elected : BitrecsRequest = responses[selected_rec]
+        elected.context = "" #save bandwidth
+        elected.user = ""
+
+        bt.logging.info("SCORING DONE")
+        bt.logging.info(f"\033[1;32mWINNING MINER: {elected.miner_uid} \033[0m")
+        bt.logging.info(f"\033[1;32mWINNING MODEL: {elected.models_used} \033[0m")
+        bt.logging.info(f"\033[1;32mWINNING RESULT: {elected} \033[0m")
+        bt.logging.info(f"\033[1;32mWINNING Batch Id: {elected.site_key} \033[0m")
+        bt.logging.info(f"\033[1;32mQueue Size: {api_queue.qsize()} \033[0m")
+
+        if len(elected.results) == 0:
+            bt.logging.error("FATAL - Elected response has no results")
+            #TODO this causes empty results back to the client resulting in poor UX fix in API?
+            synapse_with_future.set_result()
+            return
+
+        # Mark the synapse as processed, API will then return to the client
+        synapse_with_future.set_result(elected)
+        await self.score_responses(rewards, chosen_uids, responses, skipped_uids)
+
+
+    def query_miners(self, axons: list, synapse: BitrecsRequest, timeouts: List[float]) -> List[asyncio.Task]:
+        """ Send the synapse to each axon with its own timeout, returns one task per axon in the same order. """
+        return [
+            asyncio.create_task(self.call_miner(axon, synapse, timeout))
+            for axon, timeout in zip(axons, timeouts)
+        ]
+
+
+    async def call_miner(self, axon, synapse: BitrecsRequest, timeout: float) -> BitrecsRequest:
+        """
+        Query one miner. With --neuron.catalog_refs a miner that acknowledged the catalog hash
+        is sent only the hash, if it reports the catalog missing it is sent again in full
+        within the remaining timeout. Other miners always get the full context.
+        """
+        digest = synapse.context_hash
+        if not self.config.neuron.catalog_refs or not digest or not synapse.context:
+            return await self.send_to_miner(axon, synapse, timeout)
+
+        hotkey = axon.hotkey
+        context_bytes = len(synapse.context)
+        if self.catalog_refs.has(hotkey, digest):
+            st = time.perf_counter()
+            response = await self.send_to_miner(axon, synapse.model_copy(update={"context": ""}), timeout)
+            self.catalog_refs.record(hotkey, digest, response, by_ref=True, context_bytes=context_bytes)
+            if not response.catalog_missing:
+                return response
+            timeout -= time.perf_counter() - st
+            if timeout <= 0:
+                return response
+            bt.logging.trace(f"Miner {hotkey} is missing catalog {digest}, sending it in full")
+
+        response = await self.send_to_miner(axon, synapse, timeout)
+        self.catalog_refs.record(hotkey, digest, response, by_ref=False, context_bytes=context_bytes)
+        return response
+
+
+    async def send_to_miner(self, axon, synapse: BitrecsRequest, timeout: float) -> BitrecsRequest:
+        """
+        One dendrite call. With --neuron.compression the context is compressed with a codec
+        the miner advertised in its last response and compressed results are decoded, so
+        callers always see plain results.
+        """
+        compression = self.config.neuron.compression
+        if compression == "none":
+            return await self.dendrite.call(target_axon=axon, synapse=synapse.model_copy(),
+                                            timeout=timeout, deserialize=False)
+
+        update = {"accept_codecs": SUPPORTED_CODECS, "codec": None}
+        codec = self.miner_codecs.codec_for(axon.hotkey, None if compression == "auto" else compression)
+        if codec and synapse.context:
+            update["context"] = encode_text(synapse.context, codec)
+            update["codec"] = codec
+        context = update.get("context", synapse.context) or ""
+        response = await self.dendrite.call(target_axon=axon, synapse=synapse.model_copy(update=update),
+                                            timeout=timeout, deserialize=False)
+        self.miner_codecs.record(axon.hotkey, response, len(synapse.context or ""), len(context))
+        if response.is_success and response.codec:
+            response.results = decode_results(response.results, response.codec)
+        response.codec = None
+        return response
+
+
+    def sample_miners(self, uids: List[int]) -> List[int]:
+        """ Pick --neuron.fan_out miners for this request, all of them when fan out is disabled. """
+        fan_out = self.config.neuron.fan_out
+        if fan_out <= 0 or fan_out >= len(uids):
+            return uids
+        latencies = [self.miner_latency.percentile(uid, 0.5, default=self.latency_prior(uid)) for uid in uids]
+        sampled = get_weighted_miner_uids(uids, fan_out, self.scores, self.recent_validity,
+                                          latencies, exploration=self.config.neuron.exploration)
+        bt.logging.trace(f"Sampled {len(sampled)} of {len(uids)} miners: {sampled}")
+        return sampled
+
+
+    def latency_prior(self, uid: int) -> float:
+        """
+        Expected response time of a miner without dendrite history: half the dendrite timeout
+        plus its ping round trip, so unseen miners far away on the network rank behind near ones.
+        """
+        prior = CONST.MAX_DENDRITE_TIMEOUT / 2 + self.miner_ping_latency.get(uid, 0.0)
+        return min(prior, CONST.MAX_DENDRITE_TIMEOUT)
+
+
+    def filter_slow_miners(self, uids: List[int], deadline: float) -> List[int]:
+        """
+        Drop miners whose p95 latency cannot meet the client deadline. A small share of
+        them is still queried so their latency history can recover.
+        """
+        fast = []
+        for uid in uids:
+            if self.miner_latency.can_meet(uid, deadline) or safe_random.random() < CONST.LATENCY_REPROBE_RATE:
+                fast.append(uid)
+        if len(fast) == 0:
+            bt.logging.warning(f"No miners meet the {deadline}s deadline, querying all {len(uids)}")
+            return uids
+        if len(fast) < len(uids):
+            bt.logging.trace(f"Skipped {len(uids) - len(fast)} slow miners for {deadline}s deadline")
+        return fast
+
+
+    async def retry_miners(self, uids: List[int], synapse: BitrecsRequest,
+                           responses: List[BitrecsRequest], deadline: float) -> List[BitrecsRequest]:
+        """
+        Re-query only the fastest few miners instead of re-broadcasting to everyone.
+        A retry still running past its miner's usual latency percentile is hedged with a
+        duplicate request to the next ranked miner. Nothing is sent after the deadline and
+        the first successful response cancels the retries still running.
+        Returns the responses with retried slots replaced, aligned with uids.
+        """
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            bt.logging.warning("Request deadline reached, skipping retry")
+            return responses
+
+        ranked = self.miner_latency.rank(uids)
+        retry_count = max(1, self.config.neuron.retry_count)
+        reserve = ranked[retry_count:]
+        hedge_percentile = self.config.neuron.hedge_percentile
+        slots = {uid: i for i, uid in enumerate(uids)}
+        responses = list(responses)
+        pending = {}
+        hedge_at = {}
+
+        def launch(uid: int) -> float:
+            now = time.perf_counter()
+            task = asyncio.create_task(self.call_miner(self.metagraph.axons[uid], synapse, deadline - now))
+            pending[task] = uid
+            return now
+
+        for uid in ranked[:retry_count]:
+            started = launch(uid)
+            hedge_at[uid] = started + self.miner_latency.percentile(uid, hedge_percentile, default=remaining / 2)
+        bt.logging.trace(f"Retrying miners {ranked[:retry_count]} with {remaining:0.2f}s left")
+
+        any_success = False
+        while pending:
+            wait_for = None
+            if hedge_at:
+                wait_for = max(0.0, min(hedge_at.values()) - time.perf_counter())
+            done, _ = await asyncio.wait(pending.keys(), timeout=wait_for,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                uid = pending.pop(task)
+                hedge_at.pop(uid, None)
+                responses[slots[uid]] = task.result()
+                any_success = any_success or responses[slots[uid]].is_success
+            if any_success:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                break
+            now = time.perf_counter()
+            for uid in [u for u, at in hedge_at.items() if at <= now]:
+                del hedge_at[uid]
+                if not reserve or now >= deadline:
+                    continue
+                hedge_uid = reserve.pop(0)
+                bt.logging.trace(f"Hedging slow miner {uid} with miner {hedge_uid}")
+                launch(hedge_uid)
+        return responses
+
+
+    async def await_quorum(self, num_recs: int, ground_truth: BitrecsRequest,
+                           tasks: List[asyncio.Task]) -> Optional[List[BitrecsRequest]]:
+        """
+        Consume miner responses as they arrive and return as soon as a quorum of valid
+        responses agree. Returns None if all miners responded without reaching quorum.
+        """
+        catalog_validator = get_catalog_validator(ground_truth)
+        if catalog_validator is None:
+            return None
+        quorum = self.config.neuron.quorum
+        similarity = self.config.neuron.quorum_similarity
+        valid_responses = []
+        for next_response in asyncio.as_completed(tasks):
+            response = await next_response
+            if not validate_response(num_recs, catalog_validator, response):
+                continue
+            valid_responses.append(response)
+            agreed = select_quorum_bitrecs(valid_responses, quorum, similarity)
+            if agreed:
+                bt.logging.info(f"\033[1;32m Quorum of {quorum} reached with {len(valid_responses)} valid responses \033[0m")
+                return agreed
+        bt.logging.warning(f"\033[33m No quorum of {quorum} from {len(valid_responses)} valid responses \033[0m")
+        return None
+
+
+    async def score_stragglers(self, num_recs: int, ground_truth: BitrecsRequest,
+                               uids: List[int], tasks: List[asyncio.Task], skipped_uids: List[int] = None):
+        """ Wait for the remaining miners after an early client response, then score everyone. """
+        try:
+            responses = list(await asyncio.gather(*tasks))
+            rewards = get_rewards(num_recs=num_recs,
+                                  ground_truth=ground_truth,
+                                  responses=responses, actions=self.user_action_index)
+            if not len(uids) == len(responses) == len(rewards):
+                bt.logging.error("MISMATCH in lengths of uids, responses and rewards for stragglers")
+                return
+            await self.score_responses(rewards, uids, responses, skipped_uids)
+        except Exception as e:
+            bt.logging.error(f"score_stragglers failed with exception: {e}")
+            bt.logging.error(traceback.format_exc())
+
+
+    async def score_responses(self, rewards: np.ndarray, uids: List[int], responses: List[BitrecsRequest],
+                              skipped_uids: List[int] = None):
+        bt.logging.info(f"Scored responses: {rewards}")
+        hotkeys = [self.metagraph.hotkeys[uid] for uid in uids]
+        self.miner_latency.record_responses(uids, responses, timeout=CONST.MAX_DENDRITE_TIMEOUT, hotkeys=hotkeys)
+        if self.config.neuron.catalog_refs:
+            bt.logging.trace(f"Catalog refs: {self.catalog_refs.stats()}")
+        if self.config.neuron.compression != "none":
+            bt.logging.trace(f"Compression: {self.miner_codecs.stats()}")
+        async with self.lock:
+            self.total_request_in_interval +=1
+            self.update_scores(rewards, uids, skipped_uids)
+            self.update_validity(rewards, uids)
+            log_miner_responses_to_sql(self.step, responses)
+
+
+    def track_background_task(self, coro) -> asyncio.Task:
+        """ Keep a reference to fire and forget tasks so they are not garbage collected. """
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+
+
+    async def chain_worker(self):
+        """
+        Keeps chain state current on its own schedule: registration check, metagraph sync,
+        set_weights and save_state run in a thread so API requests never wait on chain I/O.
+        """
+        bt.logging.info(f"Chain worker started, syncing every {CONST.CHAIN_SYNC_INTERVAL} seconds")
+        last_sync = time.monotonic()
+        while not self.should_exit:
+            await asyncio.sleep(CONST.API_QUEUE_POLL_INTERVAL)
+            if time.monotonic() - last_sync < CONST.CHAIN_SYNC_INTERVAL:
+                continue
+            last_sync = time.monotonic()
+            if self.step < 1:
+                continue
+            try:
+                st = time.perf_counter()
+                await asyncio.to_thread(self.sync)
+                bt.logging.trace(f"Chain sync finished in {time.perf_counter() - st:0.2f} seconds")
+            except Exception as e:
+                bt.logging.error(traceback.format_exc())
+                bt.logging.error(f"Failed to sync with exception: {e}")
+
+
+    async def api_worker(self, worker_id: int):
+        """ Pulls API requests off the queue and services them until the validator exits. """
+        bt.logging.info(f"API worker {worker_id} started")
+        while True:
+            api_enabled = self.config.api.enabled
+            api_exclusive = self.config.api.exclusive
+
+            # Wait on the loop instead of blocking it, wake up periodically to check for exit.
+            synapse_with_future = await api_queue.get(timeout=CONST.API_QUEUE_POLL_INTERVAL)
+            if synapse_with_future is None and api_exclusive:
+                if self.should_exit:
+                    return
+                continue
+
+            try:
+                bt.logging.trace(f"worker {worker_id} api_enabled: {api_enabled} | api_exclusive {api_exclusive}")
+                if synapse_with_future is not None and api_enabled: #API request
+                    bt.logging.info(f"NEW API REQUEST {synapse_with_future.input_synapse.name} on worker {worker_id}")
+                    await self.process_api_request(synapse_with_future)
+                else:
+                    if not api_exclusive: #Regular validator loop  
+                        bt.logging.info("Processing synthetic concurrent forward")
+                        #self.loop.run_until_complete(self.concurrent_forward())
+                        raise NotImplementedError("concurrent_forward not implemented")
+
+                if self.should_exit:
+                    return
+
+                # Chain sync and set_weights run in chain_worker, off the request path.
+                async with self.lock:
+                    self.step += 1
+
+            except Exception as e:
+                bt.logging.error(f"Main validator RUN loop exception on worker {worker_id}: {e}")
+                if synapse_with_future is not None:
+                    bt.logging.error("API MISSED REQUEST - Marking synapse as processed due to exception")
+                    synapse_with_future.set_result()
+                bt.logging.error(traceback.format_exc())
+                bt.logging.error("\033[31m Sleeping for 60 seconds ... \033[0m")
+                await asyncio.sleep(60)
+            finally:
+                if api_enabled and api_exclusive:
+                    bt.logging.info(f"API MODE - worker {worker_id} forward finished, ready for next request")
+                else:
+                    bt.logging.info(f"LIMP MODE forward finished, sleep for {45} seconds")
+                    await asyncio.sleep(45)
+
+
     async def main_loop(self):
         """Main loop for the validator."""
         bt.logging.info(
@@ -298,150 +801,11 @@ class BaseValidatorNeuron(BaseNeuron):
         
         bt.logging.info(f"Validator starting at block: {self.block}")
         bt.logging.info(f"Validator SAMPLE SIZE: {self.config.neuron.sample_size}")
+        num_workers = max(1, self.config.neuron.num_concurrent_forwards)
+        bt.logging.info(f"Validator API WORKERS: {num_workers}")
+        api_queue.bind(asyncio.get_running_loop())
         try:
-            while True:
-                try:
-                    api_enabled = self.config.api.enabled
-                    api_exclusive = self.config.api.exclusive
-                    bt.logging.trace(f"api_enabled: {api_enabled} | api_exclusive {api_exclusive}")
-
-                    synapse_with_event: Optional[SynapseWithEvent] = None
-                    try:
-                        synapse_with_event = api_queue.get()
-                        bt.logging.info(f"NEW API REQUEST {synapse_with_event.input_synapse.name}")
-                    except Empty:
-                        # No synapse from API server.
-                        pass #continue prevents regular val loop
-
-                    if synapse_with_event is not None and api_enabled: #API request
-                        bt.logging.info("** Processing synapse from API server **")                        
-                        bt.logging.info(f"Queue Size: {api_queue.qsize()}")
-
-                        # Validate the input synapse
-                        if not validate_br_request(synapse_with_event.input_synapse):
-                            bt.logging.error("Request failed Validation, skipped.")
-                            synapse_with_event.event.set()
-                            continue
-                        
-                        chosen_uids : list[int] = self.active_miners                     
-                        if len(chosen_uids) == 0:
-                            bt.logging.error("\033[31m API Request- No active miners, skipping - check your connectivity \033[0m")
-                            synapse_with_event.event.set()
-                            continue
-                        bt.logging.trace(f"chosen_uids: {chosen_uids}")
-
-                        chosen_axons = [self.metagraph.axons[uid] for uid in chosen_uids]
-                        api_request = synapse_with_event.input_synapse
-                        number_of_recs_desired = api_request.num_results
-                        
-                        st = time.perf_counter()
-                        responses = await self.dendrite.forward(
-                            axons = chosen_axons, 
-                            synapse = api_request,
-                            timeout = min(5, CONST.MAX_DENDRITE_TIMEOUT),
-                            deserialize=False,
-                            run_async=True
-                        )
-                        #TODO: 503 error handling async bug?
-                        any_success = any([r for r in responses if r.is_success])
-                        if not any_success:
-                            bt.logging.error("\033[1;33mRETRY ATTEMPT\033[0m")
-                            responses = await self.dendrite.forward(
-                                axons = chosen_axons, 
-                                synapse = api_request,
-                                timeout = min(5, CONST.MAX_DENDRITE_TIMEOUT),
-                                deserialize=False,
-                                run_async=True
-                            )
-                        et = time.perf_counter()
-                        bt.logging.trace(f"Miners responded with {len(responses)} responses in \033[1;32m{et-st:0.4f}\033[0m seconds")                        
-                       
-                        # Adjust the scores based on responses from miners.
-                        rewards = get_rewards(num_recs=number_of_recs_desired,
-                                              ground_truth=api_request,
-                                              responses=responses, actions=self.user_actions)
-                        
-                        if not len(chosen_uids) == len(responses) == len(rewards):
-                            bt.logging.error("MISMATCH in lengths of chosen_uids, responses and rewards")
-                            synapse_with_event.event.set()
-                            continue                                                
-                        
-                        # Default - send top score to client
-                        selected_rec = rewards.argmax()
-                        good_indices = np.where(rewards > 0)[0]
-                        if len(good_indices) > 0:
-                            good_responses = [responses[i] for i in good_indices]
-                            bt.logging.info(f"Filtered to {len(good_responses)} from {len(responses)} total responses")
-                            top_k = await self.analyze_similar_requests(number_of_recs_desired, good_responses)
-                            if top_k and 1==1: #Top score now pulled from top_k
-                                winner = safe_random.sample(top_k, 1)[0]
-                                bt.logging.info(f"\033[1;32m Consensus miner: {winner.miner_uid} from {winner.models_used} - batch: {winner.site_key} \033[0m")
-                                #bt.logging.trace(f"{winner.results}")
-                                selected_rec = responses.index(winner)
-                        else:
-                            bt.logging.error("\033[1;33mZERO rewards - no valid candidates in responses \033[0m")
-                            synapse_with_event.event.set()
-                            continue
-                    
-                        elected : BitrecsRequest = responses[selected_rec]
-                        elected.context = "" #save bandwidth
-                        elected.user = ""
-
-                        bt.logging.info("SCORING DONE")
-                        bt.logging.info(f"\033[1;32mWINNING MINER: {elected.miner_uid} \033[0m")
-                        bt.logging.info(f"\033[1;32mWINNING MODEL: {elected.models_used} \033[0m")
-                        bt.logging.info(f"\033[1;32mWINNING RESULT: {elected} \033[0m")
-                        bt.logging.info(f"\033[1;32mWINNING Batch Id: {elected.site_key} \033[0m")
-                        bt.logging.info(f"\033[1;32mQueue Size: {api_queue.qsize()} \033[0m")
-                        
-                        if len(elected.results) == 0:
-                            bt.logging.error("FATAL - Elected response has no results")
-                            #TODO this causes empty results back to the client resulting in poor UX fix in API?
-                            synapse_with_event.event.set()
-                            continue
-                        
-                        synapse_with_event.output_synapse = elected
-                        # Mark the synapse as processed, API will then return to the client
-                        synapse_with_event.event.set()
-                        self.total_request_in_interval +=1
-                    
-                        bt.logging.info(f"Scored responses: {rewards}")
-                        self.update_scores(rewards, chosen_uids)
-                        log_miner_responses_to_sql(self.step, responses)
-                        
-                    else:
-                        if not api_exclusive: #Regular validator loop  
-                            bt.logging.info("Processing synthetic concurrent forward")
-                            #self.loop.run_until_complete(self.concurrent_forward())
-                            raise NotImplementedError("concurrent_forward not implemented")
-
-                    if self.should_exit:
-                        return
-
-                    try:
-                        if self.step >= 1:
-                            self.sync()
-                      
-                    except Exception as e:
-                        bt.logging.error(traceback.format_exc())
-                        bt.logging.error(f"Failed to sync with exception: {e}")
-                    finally:
-                        self.step += 1
-
-                except Exception as e:
-                    bt.logging.error(f"Main validator RUN loop exception: {e}")
-                    if synapse_with_event and synapse_with_event.event:
-                        bt.logging.error("API MISSED REQUEST - Marking synapse as processed due to exception")
-                        synapse_with_event.event.set()
-                    bt.logging.error(traceback.format_exc())
-                    bt.logging.error("\033[31m Sleeping for 60 seconds ... \033[0m")
-                    await asyncio.sleep(60)
-                finally:
-                    if api_enabled and api_exclusive:
-                        bt.logging.info(f"API MODE - forward finished, ready for next request")                        
-                    else:
-                        bt.logging.info(f"LIMP MODE forward finished, sleep for {45} seconds")
-                        await asyncio.sleep(45)
+            await asyncio.gather(self.chain_worker(), *[self.api_worker(i) for i in range(num_workers)])
 
         except KeyboardInterrupt:
             bt.logging.info("Caught keyboard interrupt. Cleaning up...")
@@ -510,16 +874,20 @@ class BaseValidatorNeuron(BaseNeuron):
         Sets the validator weights to the metagraph hotkeys based on the scores it has received from the miners. The weights determine the trust and incentive level the validator assigns to miner nodes on the network.
         """
 
-        # Check if self.scores contains any NaN values and log a warning if it does.
+        # Snapshot the scores so request handling can keep updating them while we talk to the chain.
+        with self.scores_lock:
+            scores = self.scores.copy()
+
+        # Check if scores contains any NaN values and log a warning if it does.
         bt.logging.info(f"set_weights on chain start")       
-        bt.logging.info(f"Scores: {self.scores}")       
+        bt.logging.info(f"Scores: {scores}")       
 
-        if np.isnan(self.scores).any():
+        if np.isnan(scores).any():
             bt.logging.warning(
                 f"Scores contain NaN values. This may be due to a lack of responses from miners, or a bug in your reward functions."
             )
         
-        if np.all(self.scores == 0):
+        if np.all(scores == 0):
             bt.logging.warning(
                 f"Scores are all zero. This may be due to a lack of responses from miners, or a bug in your reward functions."
             )
@@ -528,7 +896,7 @@ class BaseValidatorNeuron(BaseNeuron):
         # Calculate the average reward for each uid across non-zero values.
         # Replace any NaN values with 0.
         # Compute the norm of the scores
-        norm = np.linalg.norm(self.scores, ord=1, axis=0, keepdims=True)
+        norm = np.linalg.norm(scores, ord=1, axis=0, keepdims=True)
 
         # Check if the norm is zero or contains NaN values
         if np.any(norm == 0) or np.isnan(norm).any():
@@ -537,7 +905,7 @@ class BaseValidatorNeuron(BaseNeuron):
         bt.logging.debug("norm", norm)
         
         # Compute raw_weights safely
-        raw_weights = self.scores / norm         
+        raw_weights = scores / norm         
         
         # Printing type of arr object
         bt.logging.debug("Array is of type: ", type(raw_weights))
@@ -619,16 +987,22 @@ class BaseValidatorNeuron(BaseNeuron):
         """Resyncs the metagraph and updates the hotkeys and moving averages based on the new metagraph."""
         bt.logging.info("resync_metagraph()")
 
-        # Copies state of metagraph before syncing.
-        previous_metagraph = copy.deepcopy(self.metagraph)
-
-        # Sync the metagraph.
-        self.metagraph.sync(subtensor=self.subtensor)
+        # Sync a copy of the metagraph so requests in flight keep a consistent view, then swap it in.
+        metagraph = copy.deepcopy(self.metagraph)
+        metagraph.sync(subtensor=self.subtensor)
+        previous_metagraph = self.metagraph
 
         # Check if the metagraph axon info has changed.
-        if previous_metagraph.axons == self.metagraph.axons:
+        if previous_metagraph.axons == metagraph.axons:
+            self.metagraph = metagraph
             return
 
+        with self.scores_lock:
+            self.metagraph = metagraph
+            self._resync_scores()
+
+    def _resync_scores(self):
+        """ Reset scores of replaced hotkeys and grow the moving averages, caller holds scores_lock. """
         bt.logging.info(
             "Metagraph updated, re-syncing hotkeys, dendrite pool and moving averages"
         )
@@ -636,6 +1010,7 @@ class BaseValidatorNeuron(BaseNeuron):
         for uid, hotkey in enumerate(self.hotkeys):
             if hotkey != self.metagraph.hotkeys[uid]:
                 self.scores[uid] = 0  # hotkey has been replaced
+                self.recent_validity[uid] = 1
 
         # Check to see if the metagraph has changed size.
         # If so, we need to add new hotkeys and moving averages.
@@ -645,12 +1020,21 @@ class BaseValidatorNeuron(BaseNeuron):
             min_len = min(len(self.hotkeys), len(self.scores))
             new_moving_average[:min_len] = self.scores[:min_len]
             self.scores = new_moving_average
+            new_validity = np.ones((self.metagraph.n), dtype=np.float32)
+            min_len = min(len(self.hotkeys), len(self.recent_validity))
+            new_validity[:min_len] = self.recent_validity[:min_len]
+            self.recent_validity = new_validity
 
         # Update the hotkeys.
         self.hotkeys = copy.deepcopy(self.metagraph.hotkeys)
+        self.catalog_refs.prune(self.hotkeys)
+        self.miner_codecs.prune(self.hotkeys)
 
-    def update_scores(self, rewards: np.ndarray, uids: List[int]):
-        """Performs exponential moving average on the scores based on the rewards received from the miners."""
+    def update_scores(self, rewards: np.ndarray, uids: List[int], skipped_uids: List[int] = None):
+        """
+        Performs exponential moving average on the scores based on the rewards received from the miners.
+        Active miners left out of a sampled request (skipped_uids) keep their score instead of decaying.
+        """
 
         # Check if rewards contains NaN values.
         if np.isnan(rewards).any():
@@ -682,25 +1066,47 @@ class BaseValidatorNeuron(BaseNeuron):
                 f"cannot be broadcast to uids array of shape {uids_array.shape}"
             )
 
-        # Compute forward pass rewards, assumes uids are mutually exclusive.
-        # shape: [ metagraph.n ]
-        scattered_rewards: np.ndarray = np.zeros_like(self.scores)
-        scattered_rewards[uids_array] = rewards
-        #bt.logging.debug(f"Scattered rewards: {rewards}")
-
-        # Update scores with rewards produced by this step.
-        # shape: [ metagraph.n ]
-        alpha: float = self.config.neuron.moving_average_alpha
-        self.scores: np.ndarray = (
-            alpha * scattered_rewards + (1 - alpha) * self.scores
-        )
-        bt.logging.debug(f"Updated moving avg scores: {self.scores}")
+        with self.scores_lock:
+            # Compute forward pass rewards, assumes uids are mutually exclusive.
+            # shape: [ metagraph.n ]
+            scattered_rewards: np.ndarray = np.zeros_like(self.scores)
+            scattered_rewards[uids_array] = rewards
+            #bt.logging.debug(f"Scattered rewards: {rewards}")
+
+            # Update scores with rewards produced by this step.
+            # shape: [ metagraph.n ]
+            alpha: float = self.config.neuron.moving_average_alpha
+            new_scores: np.ndarray = (
+                alpha * scattered_rewards + (1 - alpha) * self.scores
+            )
+            if skipped_uids:
+                skipped = np.array(skipped_uids, dtype=int)
+                new_scores[skipped] = self.scores[skipped]
+            self.scores = new_scores
+        bt.logging.debug(f"Updated moving avg scores: {new_scores}")
+
+    def update_validity(self, rewards: np.ndarray, uids: List[int]):
+        """ Moving average of how often each miner returns a valid (rewarded) response. """
+        if len(uids) == 0:
+            return
+        uids_array = np.array(uids, dtype=int)
+        valid = (np.nan_to_num(np.asarray(rewards), nan=0) > 0).astype(np.float32)
+        alpha = CONST.VALIDITY_MOVING_AVERAGE_ALPHA
+        with self.scores_lock:
+            if len(self.recent_validity) < len(self.scores):
+                new_validity = np.ones(len(self.scores), dtype=np.float32)
+                new_validity[:len(self.recent_validity)] = self.recent_validity
+                self.recent_validity = new_validity
+            self.recent_validity[uids_array] = alpha * valid + (1 - alpha) * self.recent_validity[uids_array]
 
     def save_state(self):                
+        with self.scores_lock:
+            scores = self.scores.copy()
+            hotkeys = copy.deepcopy(self.hotkeys)
         np.savez(self.config.neuron.full_path + "/state.npz",
                  step=self.step,
-                 scores=self.scores,
-                 hotkeys=self.hotkeys)        
+                 scores=scores,
+                 hotkeys=hotkeys)        
         bt.logging.info("Saving validator state.")
         write_timestamp(time.time())
 
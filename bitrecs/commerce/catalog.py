@@ -0,0 +1,164 @@
+import sys
+import numpy as np
+import bittensor as bt
+import bitrecs.utils.constants as CONST
+from array import array
+from dataclasses import dataclass
+from json.encoder import encode_basestring_ascii
+from typing import Iterable, Iterator, List, Optional, Tuple
+from bitrecs.commerce.product import CatalogLimitError, CatalogStream, Product
+
+
+class StringColumn:
+    """
+    Immutable column of strings stored as one concatenated string plus row offsets.
+    A row costs its characters and a 4 byte offset instead of a full str object.
+    """
+    __slots__ = ("_blob", "_offsets")
+
+    def __init__(self, values: Iterable[str]):
+        values = values if isinstance(values, list) else list(values)
+        self._blob = "".join(values)
+        # 4 byte offsets unless the column is larger than any context we accept
+        offsets = array("I" if len(self._blob) < 2 ** 32 else "q", [0])
+        offsets.extend(np.cumsum(np.fromiter(map(len, values), dtype=np.int64, count=len(values))).tolist())
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        if row < 0:
+            row += len(self)
+        return self._blob[self._offsets[row]:self._offsets[row + 1]]
+
+    def __iter__(self) -> Iterator[str]:
+        blob = self._blob
+        offsets = self._offsets
+        for row in range(len(offsets) - 1):
+            yield blob[offsets[row]:offsets[row + 1]]
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self._blob) + self._offsets.itemsize * len(self._offsets)
+
+
+def normalize_sku(sku: str) -> str:
+    return sku.lower().strip()
+
+
+class Catalog:
+    """
+    Columnar store catalog: sku, name and price columns in row order with a hash
+    index over the normalized (lowercased, stripped) skus.
+
+    Membership tests take a normalized sku, so a Catalog can stand in for the sku
+    set of a CatalogValidator. Rows are materialized only while iterating.
+    """
+    __slots__ = ("skus", "names", "prices", "_hashes", "_rows")
+
+    def __init__(self, skus: List[str], names: List[str], prices: List[str]):
+        if not len(skus) == len(names) == len(prices):
+            raise ValueError("catalog columns must have the same length")
+        self.skus = StringColumn(skus)
+        self.names = StringColumn(names)
+        self.prices = StringColumn(prices)
+        hashes = np.fromiter((hash(normalize_sku(sku)) for sku in skus), dtype=np.int64, count=len(skus))
+        self._rows = np.argsort(hashes, kind="stable").astype(np.int32)
+        self._hashes = hashes[self._rows]
+
+    @staticmethod
+    def from_products(products: Iterable[Product]) -> "Catalog":
+        skus, names, prices = [], [], []
+        for product in products:
+            skus.append(product.sku)
+            names.append(product.name)
+            prices.append(product.price)
+        return Catalog(skus, names, prices)
+
+    def __len__(self) -> int:
+        return len(self.skus)
+
+    def __iter__(self) -> Iterator[Product]:
+        for sku, name, price in self.rows():
+            yield Product(sku=sku, name=name, price=price)
+
+    def __getitem__(self, row: int) -> Product:
+        return Product(sku=self.skus[row], name=self.names[row], price=self.prices[row])
+
+    def __contains__(self, normalized_sku: str) -> bool:
+        return self.find(normalized_sku) is not None
+
+    def rows(self) -> Iterator[Tuple[str, str, str]]:
+        return zip(self.skus, self.names, self.prices)
+
+    def find(self, normalized_sku: str) -> Optional[int]:
+        """ Row of the first product whose normalized sku matches, None if not in the catalog """
+        if not isinstance(normalized_sku, str):
+            return None
+        h = hash(normalized_sku)
+        pos = int(np.searchsorted(self._hashes, h))
+        while pos < len(self._hashes) and self._hashes[pos] == h:
+            row = int(self._rows[pos])
+            if normalize_sku(self.skus[row]) == normalized_sku:
+                return row
+            pos += 1
+        return None
+
+    def to_json(self) -> str:
+        """
+        Canonical compact json, identical to
+        json.dumps([asdict(p) for p in products], separators=(',', ':'))
+        """
+        encode = encode_basestring_ascii
+        return "[" + ",".join(
+            f'{{"sku":{encode(sku)},"name":{encode(name)},"price":{encode(price)}}}'
+            for sku, name, price in self.rows()
+        ) + "]"
+
+    @property
+    def nbytes(self) -> int:
+        return (self.skus.nbytes + self.names.nbytes + self.prices.nbytes
+                + self._hashes.nbytes + self._rows.nbytes)
+
+
+@dataclass
+class CatalogIngest:
+    """
+    Result of ingesting a catalog context in one pass.
+
+    catalog: cleaned products with duplicate skus dropped (first kept), sorted by name
+    total: valid products in the context, duplicates included
+    dupes: products dropped as duplicate skus
+    error: "size", "dupes" or "invalid" when the context was rejected, the catalog is then empty
+    """
+    catalog: Catalog
+    total: int
+    dupes: int
+    error: Optional[str] = None
+
+
+def ingest_catalog(context: str, max_size: Optional[int] = CONST.MAX_CATALOG_SIZE,
+                   dupe_threshold: Optional[float] = CONST.CATALOG_DUPE_THRESHOLD) -> CatalogIngest:
+    """
+    Parse, clean, dedupe and count duplicates in a single traversal of the context,
+    rejecting it as soon as max_size or dupe_threshold is exceeded, then sort by name.
+    Replaces try_parse_context_strict + get_dupe_count + dedupe + sort as separate passes.
+    """
+    stream = CatalogStream(context, max_size, dupe_threshold, dedupe=True)
+    skus, names, prices = [], [], []
+    try:
+        for sku, name, price in stream:
+            skus.append(sku)
+            names.append(name)
+            prices.append(price)
+    except CatalogLimitError as e:
+        bt.logging.error(f"ingest_catalog rejected catalog: {e}")
+        return CatalogIngest(Catalog([], [], []), stream.count, stream.dupes, e.reason)
+    except Exception as e:
+        bt.logging.error(f"ingest_catalog Exception: {e}")
+        return CatalogIngest(Catalog([], [], []), stream.count, stream.dupes, "invalid")
+
+    order = sorted(range(len(names)), key=names.__getitem__)
+    catalog = Catalog([skus[i] for i in order], [names[i] for i in order], [prices[i] for i in order])
+    return CatalogIngest(catalog, stream.count, stream.dupes)
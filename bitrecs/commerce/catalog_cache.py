@@ -0,0 +1,190 @@
+import sys
+import hashlib
+import threading
+import bitrecs.utils.constants as CONST
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from bitrecs.commerce.catalog import Catalog, ingest_catalog
+from bitrecs.protocol import catalog_hash
+
+
+@dataclass(frozen=True)
+class CachedCatalog:
+    """
+    A parsed store catalog, shared read only between the API and reward scoring.
+
+    products: columnar catalog from ingest_catalog (cleaned, deduped, sorted by name),
+              also the normalized sku index used by CatalogValidator
+    context: canonical compact json sent to miners
+    nbytes: approximate memory held by the entry
+    dupes: duplicate skus dropped from the context
+    error: why the context was rejected ("size", "dupes", "invalid"), products is then empty
+    """
+    products: Catalog
+    context: str
+    nbytes: int
+    dupes: int = 0
+    error: Optional[str] = None
+
+
+class CatalogCache:
+    """
+    LRU cache of parsed catalogs keyed by a digest of site_key and context.
+    Entries are stored once under the digest of their canonical context, the digests of
+    other forms of the same catalog are aliases to it and are dropped with it.
+    Evicts least recently used catalogs once the approximate size exceeds max_bytes.
+    Used from the API server and validator threads, all access is under a lock.
+    """
+
+    def __init__(self, max_bytes: int = CONST.CATALOG_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedCatalog] = OrderedDict()
+        self._aliases: Dict[str, str] = {}
+        self._alias_keys: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def digest(context: str, site_key: str = "") -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update((site_key or "").encode("utf-8"))
+        h.update(b"\0")
+        h.update((context or "").encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, context: str, site_key: str = "") -> CachedCatalog:
+        """
+        Parsed catalog for the context, parsing and caching it on a miss.
+        The canonical context is aliased as well so scoring the canonical request is a hit.
+        """
+        key = self.digest(context, site_key)
+        with self._lock:
+            entry_key = self._aliases.get(key, key)
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = self.parse(context)
+        with self._lock:
+            # Rejected catalogs all share the empty canonical context, keep them under their own key
+            canonical_key = key if entry.error else self.digest(entry.context, site_key)
+            cached = self._entries.get(canonical_key)
+            if cached is not None:
+                entry = cached
+                self._entries.move_to_end(canonical_key)
+            else:
+                self._put(canonical_key, entry)
+            if canonical_key != key and key not in self._aliases:
+                self._aliases[key] = canonical_key
+                self._alias_keys.setdefault(canonical_key, []).append(key)
+            self._evict()
+        return entry
+
+    @staticmethod
+    def parse(context: str) -> CachedCatalog:
+        ingest = ingest_catalog(context)
+        canonical = ingest.catalog.to_json()
+        nbytes = sys.getsizeof(canonical) + ingest.catalog.nbytes
+        return CachedCatalog(products=ingest.catalog, context=canonical, nbytes=nbytes,
+                             dupes=ingest.dupes, error=ingest.error)
+
+    def _put(self, key: str, entry: CachedCatalog):
+        self._entries[key] = entry
+        self.bytes += entry.nbytes
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            key, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            for alias in self._alias_keys.pop(key, []):
+                self._aliases.pop(alias, None)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+            self._alias_keys.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "aliases": len(self._aliases),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+
+class CatalogStore:
+    """
+    Miner side LRU of catalog contexts keyed by catalog_hash, so validators in catalog
+    reference mode only send a catalog the first time. Evicts least recently used
+    catalogs once the approximate size exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = CONST.CATALOG_STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, digest: str, context: str) -> bool:
+        """ Store the context under its hash, False if the hash does not match the context """
+        if not context or catalog_hash(context) != digest:
+            return False
+        nbytes = sys.getsizeof(context)
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+                return True
+            self._entries[digest] = context
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= sys.getsizeof(evicted)
+                self.evictions += 1
+        return True
+
+    def get(self, digest: str) -> Optional[str]:
+        with self._lock:
+            context = self._entries.get(digest)
+            if context is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return context
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+
+catalog_cache = CatalogCache()
@@ -3,14 +3,164 @@ import json
 import bittensor as bt
 import pandas as pd
 import operator
+import re
 import bitrecs.utils.constants as CONST
 from abc import abstractmethod
 from enum import Enum
-from typing import Any, Counter, Dict, Set
+from typing import Any, Callable, Counter, Dict, Iterator, List, Optional, Set, Tuple
 from pydantic import BaseModel
 from dataclasses import asdict, dataclass
 
 
+# shortest array item that can become a Product: ,{"sku":1,"name":1}
+MIN_PRODUCT_JSON_LENGTH = 19
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class CatalogLimitError(ValueError):
+    """
+    Raised while streaming a catalog as soon as it can no longer be accepted.
+    reason is "size" or "dupes".
+    """
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def iter_json_array(text: str) -> Iterator[Tuple[Any, int]]:
+    """
+    Decode a top level json array one item at a time, yielding each item with the
+    offset where it ends. Only the current item is materialized and a malformed tail
+    is only reached if every item before it was consumed.
+    """
+    ws = _JSON_WHITESPACE.match
+    idx = ws(text, 0).end()
+    if text[idx:idx + 1] != "[":
+        raise ValueError("catalog is not a json array")
+    idx = ws(text, idx + 1).end()
+    if text[idx:idx + 1] == "]":
+        end = idx + 1
+    else:
+        while True:
+            item, idx = _JSON_DECODER.raw_decode(text, idx)
+            yield item, idx
+            idx = ws(text, idx).end()
+            delimiter = text[idx:idx + 1]
+            if delimiter == ",":
+                idx = ws(text, idx + 1).end()
+                continue
+            if delimiter == "]":
+                end = idx + 1
+                break
+            raise ValueError(f"expected ',' or ']' at {idx}")
+    if ws(text, end).end() != len(text):
+        raise ValueError(f"extra data after catalog at {end}")
+
+
+def iter_csv_chunks(file_path: str, columns: List[str], chunk_rows: int = CONST.CSV_CHUNK_ROWS,
+                    dtype: Optional[Dict[str, Any]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a csv export chunk_rows rows at a time, parsing only the wanted columns.
+    Chunks hold the columns present in the file in the order of columns.
+    """
+    wanted = set(columns)
+    with pd.read_csv(file_path, usecols=lambda c: c in wanted, chunksize=max(1, chunk_rows), dtype=dtype) as reader:
+        for chunk in reader:
+            yield chunk[[c for c in columns if c in chunk.columns]]
+
+
+def _csv_column_kind(values: pd.Series) -> Optional[str]:
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind == "empty":
+        return None
+    if kind == "boolean":
+        return "boolean"
+    if kind in ("integer", "floating", "mixed-integer-float", "decimal"):
+        return "numeric"
+    return "string"
+
+
+def _strip_html(values: pd.Series) -> pd.Series:
+    # a chunk where the column is empty parses it as float, there is nothing to strip
+    if values.dtype != object:
+        return values
+    return values.str.replace(r'<[^<>]*>', '', regex=True)
+
+
+def _clean_csv_frame(df: pd.DataFrame) -> pd.DataFrame:
+    float_cols = df.select_dtypes(include=['float64']).columns
+    df[float_cols] = df[float_cols].astype(object)
+    df.fillna('', inplace=True)
+    return df
+
+
+def _sort_by_name_price(df: pd.DataFrame, max_rows: int) -> pd.DataFrame:
+    # sort on the cleaned values, the same keys a full load sorts on
+    keys = _clean_csv_frame(df[['name', 'price']].copy())
+    order = keys.sort_values(by=['name', 'price'], ascending=[True, True], na_position='last').index
+    return df.loc[order[:max_rows]]
+
+
+def read_csv_sorted(file_path: str, columns: List[str], prepare: Callable[[pd.DataFrame], pd.DataFrame],
+                    max_rows: int, chunk_rows: int = CONST.CSV_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    First max_rows rows of a csv export sorted by name then price, the same rows a full
+    read_csv + sort_values + head returns, holding at most max_rows + chunk_rows rows.
+
+    prepare runs on every chunk and must return it with name and price columns.
+    Chunks infer dtypes on their own rows, a column that is text in one chunk and
+    numeric in another is read again as str and int columns with gaps in any chunk
+    become float, as a full read would have parsed them.
+    """
+    dtype: Dict[str, Any] = {}
+    while True:
+        kinds: Dict[str, str] = {}
+        float_columns: Set[str] = set()
+        conflict = None
+        best = None
+        trimmed = False
+        for chunk in iter_csv_chunks(file_path, columns, chunk_rows, dtype or None):
+            for column in chunk.columns:
+                if column in dtype:
+                    continue
+                kind = _csv_column_kind(chunk[column])
+                if kind is not None and kinds.setdefault(column, kind) != kind:
+                    conflict = column
+                    break
+                if chunk[column].dtype.kind == "f":
+                    float_columns.add(column)
+            if conflict:
+                break
+
+            chunk = prepare(chunk)
+            if trimmed and len(best) and best['name'].dtype == object:
+                # rows sorting after the last kept name can never make the cut
+                worst = best['name'].iloc[-1]
+                try:
+                    chunk = chunk[~(chunk['name'].fillna('') > ('' if pd.isna(worst) else worst))]
+                except TypeError:
+                    pass
+            best = chunk if best is None else pd.concat([best, chunk])
+            if len(best) > max_rows:
+                best = _sort_by_name_price(best, max_rows)
+                trimmed = True
+
+        if conflict is None:
+            break
+        bt.logging.trace(f"read_csv_sorted re-reading mixed column {conflict} as str")
+        dtype[conflict] = str
+
+    if best is None:
+        return pd.DataFrame()
+    best = _sort_by_name_price(best, max_rows)
+    for column in best.columns:
+        if column in float_columns and best[column].dtype.kind in "iu":
+            best[column] = best[column].astype("float64")
+    return best
+
+
 class CatalogProvider(Enum):
     BITRECS = 0
     SHOPIFY = 1
@@ -20,7 +170,7 @@ class CatalogProvider(Enum):
     WALMART = 5
 
 
-@dataclass
+@dataclass(slots=True)
 class Product:
     sku: str
     name: str
@@ -33,15 +183,74 @@ class Product:
         return json.dumps(self.to_dict(), separators=(',', ':'))
 
 
+class CatalogStream:
+    """
+    One pass over a catalog context: decode, clean, optionally dedupe and count duplicate skus.
+    Iterating yields (sku, name, price) rows, count and dupes are final once it is exhausted.
+    Raises CatalogLimitError as soon as more than max_size products are read or
+    the duplicate skus exceed dupe_threshold of the largest catalog still possible.
+    """
+
+    def __init__(self, context: str, max_size: Optional[int] = None,
+                 dupe_threshold: Optional[float] = None, dedupe: bool = False):
+        self.context = context
+        self.max_size = max_size
+        self.dupe_threshold = dupe_threshold
+        self.dedupe = dedupe
+        self.count = 0
+        self.dupes = 0
+
+    def __iter__(self) -> Iterator[Tuple[str, str, str]]:
+        context = self.context
+        max_size = self.max_size
+        dupe_threshold = self.dupe_threshold
+        seen = set()
+        for product, offset in iter_json_array(context):
+            sku = product.get("sku")
+            name = product.get("name")
+            price = product.get("price", "0")
+            if not (sku and name and price):
+                continue
+
+            sku = str(sku)
+            name = str(name)
+            price = str(price)
+            name = CONST.RE_PRODUCT_NAME.sub("", name).strip()
+            if not name or not sku:
+                continue
+
+            self.count += 1
+            if max_size is not None and self.count > max_size:
+                raise CatalogLimitError(f"catalog exceeds {max_size} products", "size")
+            if sku in seen:
+                self.dupes += 1
+                if dupe_threshold is not None:
+                    # the rest of the context can add at most this many products
+                    remaining = (len(context) - offset) // MIN_PRODUCT_JSON_LENGTH
+                    largest = self.count + remaining if max_size is None else min(max_size, self.count + remaining)
+                    if self.dupes > largest * dupe_threshold:
+                        raise CatalogLimitError(f"catalog exceeds dupe threshold: {self.dupes} duplicate skus", "dupes")
+                if self.dedupe:
+                    continue
+            else:
+                seen.add(sku)
+            yield sku, name, price
+
+        if dupe_threshold is not None and self.dupes > self.count * dupe_threshold:
+            raise CatalogLimitError(f"catalog exceeds dupe threshold: {self.dupes} duplicate skus", "dupes")
+
+
 class ProductFactory:
 
     @staticmethod
-    def tryload_catalog(file_path: str, max_rows=100_000) -> list:
+    def tryload_catalog(file_path: str, max_rows=100_000, chunk_rows=CONST.CSV_CHUNK_ROWS) -> list:
         """
         Try to load a woo catalog into a normalized list
+        Reads chunk_rows rows at a time and keeps only the max_rows first by name and price
 
         :param file_path: Path to the WooCommerce CSV file
         :param max_rows: Maximum number of rows to process
+        :param chunk_rows: Number of rows read at a time
         :return: List of dictionaries with 'sku', 'name', 'price'
         """
         try:
@@ -49,35 +258,25 @@ class ProductFactory:
                 bt.logging.error(f"File not found: {file_path}")
                 raise FileNotFoundError(f"File not found: {file_path}")
             
-            df = pd.read_csv(file_path)
             #WooCommerce Format
             columns = ["ID", "Type", "SKU", "Name", "Published", "Description", "In stock?", "Stock", "Regular price", "Categories"]
-            df = df[[c for c in columns if c in df.columns]]            
-            
-            if 'Description' in df.columns:
-                df['Description'] = df['Description'].str.replace(r'<[^<>]*>', '', regex=True)
-            
+
+            def prepare(chunk: pd.DataFrame) -> pd.DataFrame:
+                #Final renaming of columns
+                return chunk.rename(columns={'SKU': 'sku', 'Name': 'name', 'Regular price': 'price', 'In stock?': 'InStock', 'Stock': 'OnHand'})
+
+            df = read_csv_sorted(file_path, columns, prepare, max_rows, chunk_rows)
+
             #Only take simple and variable products
             #product_types = ["simple", "variable"]
             #df = df[df['Type'].isin(product_types)]
 
-            #Final renaming of columns
-            df = df.rename(columns={'SKU': 'sku', 'Name': 'name', 'Regular price': 'price', 'In stock?': 'InStock', 'Stock': 'OnHand'})            
-            float_cols = df.select_dtypes(include=['float64']).columns
-            df[float_cols] = df[float_cols].astype(object)
-            df.fillna('', inplace=True)
-            
-            # df = df.sort_values(by=['sku', 'name', 'price'], 
-            #                   ascending=[True, True, True],
-            #                   na_position='last')
-
-            df = df.sort_values(by=['name', 'price'], 
-                            ascending=[True, True],
-                            na_position='last')
+            # only the kept rows need their html stripped
+            if 'Description' in df.columns:
+                df['Description'] = _strip_html(df['Description'])
 
-            df = df.head(max_rows)
-            df = df.to_dict(orient='records')
-            return df
+            df = _clean_csv_frame(df)
+            return df.to_dict(orient='records')
         except Exception as e:
             bt.logging.error(str(e))
             return []
@@ -122,30 +321,29 @@ class ProductFactory:
         
         
     @staticmethod
-    def try_parse_context_strict(context: str) -> list[Product]:
+    def iter_context_strict(context: str, max_size: Optional[int] = None,
+                            dupe_threshold: Optional[float] = None) -> Iterator[Product]:
+        """
+        Stream Products from a json array of products with sku/name/price fields.
+        Items without sku/name/price are skipped, names are cleaned per item.
+        Raises CatalogLimitError as soon as more than max_size products are read or
+        the duplicate skus exceed dupe_threshold of the largest catalog still possible.
+
+        """
+        for sku, name, price in CatalogStream(context, max_size, dupe_threshold):
+            yield Product(sku=sku, name=name, price=price)
+
+
+    @staticmethod
+    def try_parse_context_strict(context: str, max_size: Optional[int] = CONST.MAX_CATALOG_SIZE,
+                                 dupe_threshold: Optional[float] = CONST.CATALOG_DUPE_THRESHOLD) -> list[Product]:
         """
         Strict converter expects a json array of products with sku/name/price fields
+        Catalogs over max_size products or dupe_threshold duplicate skus are rejected while streaming.
 
         """ 
-        result: list[Product] = []        
         try:
-            products_data = json.loads(context)
-
-            for product in products_data:
-                sku = product.get("sku")
-                name = product.get("name")
-                price = product.get("price", "0")
-                if not (sku and name and price):
-                    continue
-                
-                sku = str(sku)
-                name = str(name)
-                price = str(price)
-                name = CONST.RE_PRODUCT_NAME.sub("", name).strip()
-                if not name or not sku:
-                    continue
-                    
-                result.append(Product(sku=sku, name=name, price=price))
+            result: list[Product] = list(ProductFactory.iter_context_strict(context, max_size, dupe_threshold))
         except Exception as e:
             bt.logging.error(f"try_parse_context_strict Exception: {e}")
             return []        
@@ -326,13 +524,15 @@ class ShopifyConverter(BaseConverter):
         return result
 
     @staticmethod
-    def tryload_catalog_shopify(file_path: str, max_rows=100_000) -> list:
+    def tryload_catalog_shopify(file_path: str, max_rows=100_000, chunk_rows=CONST.CSV_CHUNK_ROWS) -> list:
         """
         Try to load a Shopify catalog into a normalized list
         *this will squash variants down 
+        Reads chunk_rows rows at a time and stops once max_rows products with a SKU are loaded
         
         :param file_path: Path to the Shopify CSV file
         :param max_rows: Maximum number of rows to process
+        :param chunk_rows: Number of rows read at a time
         :return: List of dictionaries with 'sku', 'name', 'price'
         """
         try:
@@ -340,7 +540,6 @@ class ShopifyConverter(BaseConverter):
                 bt.logging.error(f"File not found: {file_path}")
                 raise FileNotFoundError(f"File not found: {file_path}")
             
-            df = pd.read_csv(file_path)
             # Select relevant columns
             columns = [
                 "Handle", "Title", "Variant SKU", "Variant Price", 
@@ -349,59 +548,62 @@ class ShopifyConverter(BaseConverter):
                 "Option3 Name", "Option3 Value", 
                 "Status"
             ]
-            df = df[[c for c in columns if c in df.columns]]
-
-            # Rename columns for clarity
-            df = df.rename(columns={
-                'Handle': 'handle',
-                'Title': 'name',
-                'Variant SKU': 'sku',
-                'Variant Price': 'price',
-                'Option1 Name': 'option1_name',
-                'Option1 Value': 'option1_value',
-                'Option2 Name': 'option2_name',
-                'Option2 Value': 'option2_value',
-                'Option3 Name': 'option3_name',
-                'Option3 Value': 'option3_value'
-            })
-
-            # Clean and preprocess data
-            df['name'] = df['name'].fillna('').str.replace(r'<[^<>]*>', '', regex=True)
-            df['sku'] = df['sku'].astype(str).str.lstrip("'").replace('nan', '')  # Remove leading ' and invalid 'nan' values
-            
-            float_cols = df.select_dtypes(include=['float64']).columns
-            df[float_cols] = df[float_cols].astype(object)
-            df.fillna('', inplace=True)
-
-            # Fill empty names with the parent name grouped by 'handle'
-            parent_names = df.groupby('handle')['name'].first().to_dict()
-            df['name'] = df.apply(lambda row: parent_names.get(row['handle'], '') if row['name'] == '' else row['name'], axis=1)
-
-            # Remove rows without a SKU
-            df = df[df['sku'] != '']
+            # SKUs stay text, a chunk of numeric SKUs would otherwise parse as numbers
+            chunks = iter_csv_chunks(file_path, columns, chunk_rows, dtype={"Variant SKU": str})
 
-            # Limit rows for processing
-            df = df.head(max_rows)
-
-            # Convert to list of dictionaries
+            # Parent name per handle, the first row of a handle can be in an earlier chunk
+            parent_names: Dict[str, str] = {}
             products = []
-            for _, row in df.iterrows():
-                product = {
-                    'handle': row['handle'],
-                    'name': row['name'],
-                    'sku': row['sku'],
-                    'price': row['price'],
-                    'variants': []
-                }
+            for df in chunks:
+                if len(products) >= max_rows:
+                    break
+
+                # Rename columns for clarity
+                df = df.rename(columns={
+                    'Handle': 'handle',
+                    'Title': 'name',
+                    'Variant SKU': 'sku',
+                    'Variant Price': 'price',
+                    'Option1 Name': 'option1_name',
+                    'Option1 Value': 'option1_value',
+                    'Option2 Name': 'option2_name',
+                    'Option2 Value': 'option2_value',
+                    'Option3 Name': 'option3_name',
+                    'Option3 Value': 'option3_value'
+                })
+
+                # Clean and preprocess data
+                df['name'] = df['name'].fillna('').astype(str).str.replace(r'<[^<>]*>', '', regex=True)
+                df['sku'] = df['sku'].astype(str).str.lstrip("'").replace('nan', '')  # Remove leading ' and invalid 'nan' values
+                df = _clean_csv_frame(df)
+
+                # Fill empty names with the parent name grouped by 'handle'
+                firsts = df.drop_duplicates('handle')
+                for handle, name in zip(firsts['handle'], firsts['name']):
+                    parent_names.setdefault(handle, name)
+                empty = df['name'] == ''
+                if empty.any():
+                    df.loc[empty, 'name'] = df.loc[empty, 'handle'].map(parent_names).fillna('')
+
+                # Remove rows without a SKU
+                df = df[df['sku'] != '']
+
+                # Limit rows for processing
+                df = df.head(max_rows - len(products))
 
                 # Add variant details if available
+                options = []
                 for i in range(1, 4):
-                    option_name = row.get(f'option{i}_name', '').strip()
-                    option_value = row.get(f'option{i}_value', '').strip()
-                    if option_name and option_value:
-                        product['variants'].append({option_name: option_value})
+                    if f'option{i}_name' in df.columns and f'option{i}_value' in df.columns:
+                        options.append((df[f'option{i}_name'].astype(str).str.strip(),
+                                        df[f'option{i}_value'].astype(str).str.strip()))
+                variants = [[{n: v} for n, v in pairs if n and v] for pairs in zip(*(zip(n, v) for n, v in options))] \
+                    if options else [[] for _ in range(len(df))]
 
-                products.append(product)
+                products.extend(
+                    {'handle': handle, 'name': name, 'sku': sku, 'price': price, 'variants': variant}
+                    for handle, name, sku, price, variant in zip(df['handle'], df['name'], df['sku'], df['price'], variants)
+                )
 
             return products
         except Exception as e:
@@ -477,12 +679,14 @@ class WalmartConverter(BaseConverter):
     
 
     @staticmethod
-    def tryload_catalog(file_path: str, max_rows=100_000) -> list:
+    def tryload_catalog(file_path: str, max_rows=100_000, chunk_rows=CONST.CSV_CHUNK_ROWS) -> list:
         """
         Try to load a walmart catalog into a normalized list
+        Reads chunk_rows rows at a time and keeps only the max_rows first by name and price
 
         :param file_path: Path to the Walmart CSV file
         :param max_rows: Maximum number of rows to process
+        :param chunk_rows: Number of rows read at a time
         :return: List of dictionaries with 'sku', 'name', 'price'
         """
         try:
@@ -490,30 +694,21 @@ class WalmartConverter(BaseConverter):
                 bt.logging.error(f"File not found: {file_path}")
                 raise FileNotFoundError(f"File not found: {file_path}")
             
-            df = pd.read_csv(file_path)            
-            columns = ["UNIQUE_ID", "PRODUCT_NAME", "LIST_PRICE", "SALE_PRICE", "BRAND", "ITEM_NUMBER", "GTIN", "CATEGORY", "IN_STOCK"]            
-            df = df[[c for c in columns if c in df.columns]]            
-            df['PRODUCT_NAME'] = df['PRODUCT_NAME'].str.replace(r'<[^<>]*>', '', regex=True)
-            df['BRAND'] = df['BRAND'].str.replace(r'<[^<>]*>', '', regex=True)
-            df['CATEGORY'] = df['CATEGORY'].str.replace(r'<[^<>]*>', '', regex=True)            
-            
-            #Final renaming of columns
-            df = df.rename(columns={'GTIN': 'sku', 'PRODUCT_NAME': 'name', 'LIST_PRICE': 'price', 'IN_STOCK': 'InStock', 'BRAND' : 'brand'})
-            float_cols = df.select_dtypes(include=['float64']).columns
-            df[float_cols] = df[float_cols].astype(object)
-            df.fillna('', inplace=True)
-
-            # df = df.sort_values(by=['sku', 'name', 'price'], 
-            #                   ascending=[True, True, True],
-            #                   na_position='last')
-
-            df = df.sort_values(by=['name', 'price'], 
-                              ascending=[True, True],
-                              na_position='last')
-
-            df = df.head(max_rows)
-            df = df.to_dict(orient='records')
-            return df
+            columns = ["UNIQUE_ID", "PRODUCT_NAME", "LIST_PRICE", "SALE_PRICE", "BRAND", "ITEM_NUMBER", "GTIN", "CATEGORY", "IN_STOCK"]
+
+            def prepare(chunk: pd.DataFrame) -> pd.DataFrame:
+                # names are sorted on so they are stripped before the sort
+                chunk['PRODUCT_NAME'] = _strip_html(chunk['PRODUCT_NAME'])
+                #Final renaming of columns
+                return chunk.rename(columns={'GTIN': 'sku', 'PRODUCT_NAME': 'name', 'LIST_PRICE': 'price', 'IN_STOCK': 'InStock', 'BRAND' : 'brand'})
+
+            df = read_csv_sorted(file_path, columns, prepare, max_rows, chunk_rows)
+            for column in ['brand', 'CATEGORY']:
+                if column in df.columns:
+                    df[column] = _strip_html(df[column])
+
+            df = _clean_csv_frame(df)
+            return df.to_dict(orient='records')
         except Exception as e:
             bt.logging.error(str(e))
             return []
\ No newline at end of file
@@ -0,0 +1,163 @@
+import re
+import json
+import threading
+import numpy as np
+import bittensor as bt
+import bitrecs.utils.constants as CONST
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+from bitrecs.commerce.catalog import normalize_sku
+from bitrecs.protocol import catalog_hash
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(["a", "an", "and", "at", "by", "for", "from", "in", "of", "on", "or", "the", "to", "with"])
+
+
+def tokenize(text: str) -> List[str]:
+    """ Lowercased alphanumeric words without stopwords, | category separators and punctuation split words """
+    return [t for t in _TOKEN.findall(str(text).lower()) if t not in _STOPWORDS]
+
+
+class CatalogIndex:
+    """
+    BM25 index over the product names of a catalog context, including the | category
+    hierarchy embedded in names. Postings are stored per term (CSR) with their BM25
+    weight precomputed, so a query is a bincount over the postings of its terms.
+    """
+
+    def __init__(self, products: List[dict], k1: float = 1.2, b: float = 0.75):
+        self.products = products
+        self.skus = {}
+        for row, product in enumerate(products):
+            self.skus.setdefault(normalize_sku(str(product.get("sku", ""))), row)
+
+        vocab = {}
+        doc_ids = []
+        term_ids = []
+        lengths = np.zeros(len(products), dtype=np.float64)
+        for row, product in enumerate(products):
+            tokens = tokenize(product.get("name", ""))
+            lengths[row] = len(tokens)
+            doc_ids.extend([row] * len(tokens))
+            term_ids.extend(vocab.setdefault(token, len(vocab)) for token in tokens)
+        self.vocab = vocab
+
+        n = max(len(products), 1)
+        pairs, tf = np.unique(np.asarray(term_ids, dtype=np.int64) * n + np.asarray(doc_ids, dtype=np.int64),
+                              return_counts=True)
+        terms = pairs // n
+        self.postings = (pairs % n).astype(np.int32)
+        self.indptr = np.searchsorted(terms, np.arange(len(vocab) + 1))
+
+        df = np.diff(self.indptr)
+        idf = np.log(1.0 + (len(products) - df + 0.5) / (df + 0.5))
+        avgdl = lengths.mean() if len(products) else 0.0
+        norm = k1 * (1.0 - b + b * lengths[self.postings] / max(avgdl, 1e-9))
+        self.weights = idf[terms] * tf * (k1 + 1.0) / (tf + norm)
+
+    @staticmethod
+    def from_context(context: str) -> "CatalogIndex":
+        products = [p for p in json.loads(context) if isinstance(p, dict)]
+        return CatalogIndex(products)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def find(self, sku: str) -> Optional[int]:
+        return self.skus.get(normalize_sku(str(sku)))
+
+    def scores(self, tokens: Iterable[str]) -> np.ndarray:
+        """ BM25 score of every product for the query tokens, repeated tokens count once """
+        ids = [self.vocab[t] for t in set(tokens) if t in self.vocab]
+        if not ids:
+            return np.zeros(len(self.products))
+        rows = np.concatenate([self.postings[self.indptr[i]:self.indptr[i + 1]] for i in ids])
+        weights = np.concatenate([self.weights[self.indptr[i]:self.indptr[i + 1]] for i in ids])
+        return np.bincount(rows, weights=weights, minlength=len(self.products))
+
+    def search(self, tokens: Iterable[str], k: int) -> List[int]:
+        """ Rows of the k best matching products with a positive score, best first, ties in catalog order """
+        scores = self.scores(tokens)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        order = np.lexsort((matched, -scores[matched]))
+        return matched[order].tolist()
+
+    def select_candidates(self, sku: str, k: int, cart: Optional[list] = None) -> List[dict]:
+        """
+        Products to put in a prompt for the viewed sku: the viewed product and cart items
+        found in the catalog plus the k products whose names best match theirs, in catalog order.
+        Returns every product when the viewed product is not in the catalog.
+        """
+        anchor = self.find(sku)
+        if anchor is None:
+            return self.products
+        keep = {anchor}
+        tokens = tokenize(self.products[anchor].get("name", ""))
+        for item in cart or []:
+            if not isinstance(item, dict):
+                continue
+            row = self.find(item.get("sku", ""))
+            if row is not None:
+                keep.add(row)
+            tokens += tokenize(item.get("name", ""))
+        limit = k + len(keep)
+        for row in self.search(tokens, limit):
+            if len(keep) >= limit:
+                break
+            keep.add(row)
+        return [self.products[row] for row in sorted(keep)]
+
+
+class CatalogIndexCache:
+    """
+    LRU of CatalogIndex keyed by catalog_hash so repeat requests for a catalog skip the build.
+    Shared by concurrent miner requests, all access is under a lock.
+    """
+
+    def __init__(self, max_entries: int = CONST.CATALOG_INDEX_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CatalogIndex] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, context: str, digest: Optional[str] = None) -> CatalogIndex:
+        digest = digest or catalog_hash(context)
+        with self._lock:
+            index = self._entries.get(digest)
+            if index is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return index
+            self.misses += 1
+
+        index = CatalogIndex.from_context(context)
+        with self._lock:
+            self._entries[digest] = index
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+
+catalog_index_cache = CatalogIndexCache()
+
+
+def retrieve_candidates(context: str, sku: str, k: int, cart: Optional[list] = None,
+                        digest: Optional[str] = None) -> str:
+    """
+    Compact json context of the candidates for sku from a catalog context.
+    Returns the context unchanged when it already fits in k products or cannot be indexed.
+    """
+    try:
+        index = catalog_index_cache.get(context, digest)
+        if len(index) <= k + 1 + len(cart or []):
+            return context
+        candidates = index.select_candidates(sku, k, cart)
+        if len(candidates) == len(index):
+            return context
+        return json.dumps(candidates, separators=(',', ':'))
+    except Exception as e:
+        bt.logging.error(f"retrieve_candidates Exception: {e}")
+        return context
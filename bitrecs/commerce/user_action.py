@@ -4,6 +4,7 @@ import requests
 from enum import Enum
 from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass, field
+from typing import Dict, Optional
 
 
 class ActionType(Enum):
@@ -77,5 +78,81 @@ class UserAction:
         end_date = datetime.now(timezone.utc) - timedelta(days=30)
         start_date = end_date - timedelta(days=30)
         return start_date, end_date
-        
-        
\ No newline at end of file
+
+
+@dataclass
+class ActionCounts:
+    actions: int = 0
+    views: int = 0
+    add_to_carts: int = 0
+    purchases: int = 0
+
+    def add(self, action: str):
+        self.actions += 1
+        if action == ActionType.VIEW_PRODUCT.name:
+            self.views += 1
+        elif action == ActionType.ADD_TO_CART.name:
+            self.add_to_carts += 1
+        elif action == ActionType.PURCHASE.name:
+            self.purchases += 1
+
+
+class UserActionIndex:
+    """
+    Per hotkey action counts, built once per action sync so scoring is a dict lookup.
+    Optional time buckets keep counts per hotkey per bucket start (UTC).
+    Build a new index and assign it, never mutate one that is in use.
+    """
+
+    def __init__(self, counts: Dict[str, ActionCounts] = None,
+                 buckets: Dict[str, Dict[datetime, ActionCounts]] = None, size: int = 0):
+        self.counts = counts or {}
+        self.buckets = buckets or {}
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def get(self, hot_key: str) -> ActionCounts:
+        if not hot_key:
+            return ActionCounts()
+        return self.counts.get(hot_key.lower(), ActionCounts())
+
+    def get_buckets(self, hot_key: str) -> Dict[datetime, ActionCounts]:
+        if not hot_key:
+            return {}
+        return self.buckets.get(hot_key.lower(), {})
+
+    @staticmethod
+    def build(actions: list, bucket_size: Optional[timedelta] = None) -> "UserActionIndex":
+        """
+        Aggregate raw actions (dicts from the proxy) by lowercased hot_key.
+        """
+        counts: Dict[str, ActionCounts] = {}
+        buckets: Dict[str, Dict[datetime, ActionCounts]] = {}
+        size = 0
+        for a in actions or []:
+            try:
+                hot_key = a["hot_key"].lower()
+                action = a["action"]
+            except Exception as e:
+                bt.logging.trace(f"UserActionIndex skipped action: {e}")
+                continue
+            size += 1
+            counts.setdefault(hot_key, ActionCounts()).add(action)
+            if bucket_size:
+                bucket = UserActionIndex._bucket_start(a.get("created_at"), bucket_size)
+                if bucket is not None:
+                    buckets.setdefault(hot_key, {}).setdefault(bucket, ActionCounts()).add(action)
+        return UserActionIndex(counts, buckets, size)
+
+    @staticmethod
+    def _bucket_start(created_at: str, bucket_size: timedelta) -> Optional[datetime]:
+        try:
+            ts = datetime.fromisoformat(str(created_at).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        return epoch + ((ts - epoch) // bucket_size) * bucket_size
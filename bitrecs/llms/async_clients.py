@@ -0,0 +1,109 @@
+import asyncio
+import httpx
+import weakref
+import bitrecs.utils.constants as CONST
+from typing import Dict, Optional
+from openai import AsyncOpenAI
+
+BITRECS_HEADERS = {
+    "HTTP-Referer": "https://bitrecs.ai",
+    "X-Title": "bitrecs"
+}
+
+
+class LLMClientPool:
+    """
+    Long lived async LLM clients so a miner can run many LLM calls in parallel on its event loop.
+    One AsyncOpenAI client per base url and key, one httpx client for plain http providers,
+    each keeping a pool of open connections. Clients are bound to the event loop they were created on.
+    """
+
+    def __init__(self,
+                 max_connections: int = CONST.LLM_MAX_CONNECTIONS,
+                 timeout: float = CONST.LLM_REQUEST_TIMEOUT,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = timeout
+        self.transport = transport
+        self._loops: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.created = 0
+
+    def _clients(self) -> Dict:
+        loop = asyncio.get_running_loop()
+        clients = self._loops.get(loop)
+        if clients is None:
+            clients = {}
+            self._loops[loop] = clients
+        return clients
+
+    def http(self) -> httpx.AsyncClient:
+        clients = self._clients()
+        client = clients.get("http")
+        if client is None:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, transport=self.transport)
+            clients["http"] = client
+            self.created += 1
+        return client
+
+    def openai(self, api_key: str, base_url: Optional[str] = None) -> AsyncOpenAI:
+        clients = self._clients()
+        key = ("openai", base_url, api_key)
+        client = clients.get(key)
+        if client is None:
+            http_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, transport=self.transport)
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, timeout=self.timeout)
+            clients[key] = client
+            self.created += 1
+        return client
+
+    async def chat_openai(self, api_key: str, base_url: Optional[str], model: str, messages: list,
+                          temp: float, extra_headers: Optional[dict] = None) -> str:
+        completion = await self.openai(api_key, base_url).chat.completions.create(
+            extra_headers=extra_headers,
+            model=model,
+            messages=messages,
+            temperature=temp,
+            max_tokens=2048
+        )
+        return completion.choices[0].message.content
+
+    async def chat_ollama(self, url: str, model: str, system_prompt: str, temp: float, prompt: str,
+                          keep_alive: int = 3600) -> str:
+        data = {
+            "model": model,
+            "system": system_prompt,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": False,
+            "keep_alive": keep_alive,
+            "options": {
+                "temperature": temp
+            }
+        }
+        response = await self.http().post(url, json=data)
+        if response.status_code != 200:
+            return "Error: Unable to get caption from LLama server status {}".format(response.status_code)
+        return response.json()["message"]["content"]
+
+    async def chat_chutes(self, api_key: str, model: str, temp: float, prompt: str) -> str:
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": False,
+            "max_tokens": 2048,
+            "temperature": temp
+        }
+        response = await self.http().post("https://llm.chutes.ai/v1/chat/completions", headers=headers, json=data)
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def aclose(self):
+        """ Close the clients of the running event loop """
+        clients = self._loops.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.close() if isinstance(client, AsyncOpenAI) else await client.aclose()
+
+
+llm_clients = LLMClientPool()
@@ -0,0 +1,160 @@
+import json
+import hashlib
+import threading
+import tiktoken
+import numpy as np
+import bitrecs.utils.constants as CONST
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional
+from bitrecs.commerce.catalog import normalize_sku
+from bitrecs.protocol import catalog_hash
+
+
+@lru_cache(maxsize=4)
+def _get_cached_encoding(encoding_name: str):
+    return tiktoken.get_encoding(encoding_name)
+
+
+def tiktoken_counter(encoding_name: str = "o200k_base") -> Callable[[List[str]], List[int]]:
+    """ Batch token counter for a tiktoken encoding, the encoding is loaded on first use """
+    def count(texts: List[str]) -> List[int]:
+        return [len(tokens) for tokens in _get_cached_encoding(encoding_name).encode_ordinary_batch(texts)]
+    return count
+
+
+@dataclass(frozen=True)
+class PackedCatalog:
+    """
+    Token counts of a catalog context.
+
+    compact: compact json of the context, the context itself when it already is compact
+    offsets: start of each row in compact followed by the length of compact, a row ends one separator before the next offset
+    skus: normalized sku of each row
+    tokens: tokens of each row plus its , or ] separator
+    total: tokens of the whole context, an estimate as tokens can merge across row boundaries
+    """
+    compact: str
+    offsets: np.ndarray
+    skus: List[str]
+    tokens: np.ndarray
+    total: int
+
+    def row(self, i: int) -> str:
+        return self.compact[self.offsets[i]:self.offsets[i + 1] - 1]
+
+
+class ContextPacker:
+    """
+    Fits catalog contexts into a token budget without encoding whole prompts.
+    Token counts are cached per product row, keyed by a short digest of the row and shared
+    between catalogs of a site, and per catalog hash, so counting or packing a catalog seen
+    before is a lookup.
+    Shared by request threads, all cache access is under a lock.
+    """
+
+    def __init__(self,
+                 count_fn: Optional[Callable[[List[str]], List[int]]] = None,
+                 max_rows: int = CONST.TOKEN_CACHE_MAX_ROWS,
+                 max_catalogs: int = CONST.TOKEN_CACHE_MAX_CATALOGS):
+        self.count_fn = count_fn or tiktoken_counter()
+        self.max_rows = max_rows
+        self.max_catalogs = max_catalogs
+        self._rows: OrderedDict[bytes, int] = OrderedDict()
+        self._catalogs: OrderedDict[str, PackedCatalog] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _row_key(row: str) -> bytes:
+        return hashlib.blake2b(row.encode("utf-8"), digest_size=8).digest()
+
+    def _row_tokens(self, rows: List[str]) -> np.ndarray:
+        counts = np.zeros(len(rows), dtype=np.int64)
+        keys = [self._row_key(row) for row in rows]
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                count = self._rows.get(key)
+                if count is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._rows.move_to_end(key)
+                    counts[i] = count
+        if missing:
+            encoded = self.count_fn([rows[positions[0]] for positions in missing.values()])
+            with self._lock:
+                for (key, positions), count in zip(missing.items(), encoded):
+                    counts[positions] = count
+                    self._rows[key] = count
+                while len(self._rows) > self.max_rows:
+                    self._rows.popitem(last=False)
+        return counts
+
+    def get(self, context: str, digest: Optional[str] = None) -> PackedCatalog:
+        """ Token counts for a json array context, computed and cached on a miss """
+        digest = digest or catalog_hash(context)
+        with self._lock:
+            entry = self._catalogs.get(digest)
+            if entry is not None:
+                self._catalogs.move_to_end(digest)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        products = [p for p in json.loads(context) if isinstance(p, dict)]
+        rows = [json.dumps(p, separators=(',', ':')) for p in products]
+        skus = [normalize_sku(str(p.get("sku", ""))) for p in products]
+        tokens = self._row_tokens(rows) + 1
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) + 1 for row in rows], out=offsets[1:])
+        offsets += 1
+        compact = "[" + ",".join(rows) + "]"
+        if compact == context:
+            compact = context
+        entry = PackedCatalog(compact=compact, offsets=offsets, skus=skus, tokens=tokens, total=int(tokens.sum()) + 1)
+        with self._lock:
+            self._catalogs[digest] = entry
+            while len(self._catalogs) > self.max_catalogs:
+                self._catalogs.popitem(last=False)
+        return entry
+
+    def count(self, context: str, digest: Optional[str] = None) -> int:
+        return self.get(context, digest).total
+
+    def pack(self, context: str, budget: int, keep: Iterable[str] = (),
+             digest: Optional[str] = None) -> Optional[str]:
+        """
+        Context trimmed to at most budget tokens, None when the kept products or a single product cannot fit.
+        Truncation is deterministic: products whose sku is in keep are always included,
+        then the remaining products in context order until the budget is spent.
+        The context is returned unchanged when it already fits.
+        """
+        entry = self.get(context, digest)
+        if entry.total <= budget:
+            return context
+        wanted = {normalize_sku(str(sku)) for sku in keep}
+        kept = np.fromiter((sku in wanted for sku in entry.skus), dtype=bool, count=len(entry.skus))
+        remaining = budget - 1 - int(entry.tokens[kept].sum())
+        if remaining < 0:
+            return None
+        others = np.flatnonzero(~kept)
+        fit = int(np.searchsorted(np.cumsum(entry.tokens[others]), remaining, side="right"))
+        kept[others[:fit]] = True
+        if not kept.any():
+            return None
+        return "[" + ",".join(entry.row(i) for i in np.flatnonzero(kept)) + "]"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "catalogs": len(self._catalogs),
+                "rows": len(self._rows),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+context_packer = ContextPacker()
@@ -8,6 +8,7 @@ from bitrecs.llms.open_router import OpenRouter
 from bitrecs.llms.chat_gpt import ChatGPT
 from bitrecs.llms.vllm_router import vLLM
 from bitrecs.llms.chutes import Chutes
+from bitrecs.llms.async_clients import BITRECS_HEADERS, llm_clients
 
 
 class LLM(Enum):
@@ -47,6 +48,53 @@ class LLMFactory:
             case _:
                 raise ValueError("Unknown LLM server")
             
+    @staticmethod
+    async def query_llm_async(server: LLM, model: str,
+                              system_prompt="You are a helpful assistant",
+                              temp=0.0, user_prompt="") -> str:
+        """
+        Async query_llm over the pooled clients in llm_clients, does not block the event loop
+        and reuses connections between calls. Same providers and request bodies as query_llm.
+        """
+        messages = [{"role": "user", "content": user_prompt}]
+        match server:
+            case LLM.OLLAMA_LOCAL:
+                url = os.environ.get("OLLAMA_LOCAL_URL", "").removesuffix("/")
+                if not url:
+                    raise ValueError("OLLAMA_LOCAL_URL is not set")
+                return await llm_clients.chat_ollama(url, model, system_prompt or "You are a helpful assistant.",
+                                                     temp, user_prompt)
+            case LLM.OPEN_ROUTER:
+                return await llm_clients.chat_openai(LLMFactory._api_key("OPENROUTER_API_KEY"),
+                                                     "https://openrouter.ai/api/v1", model, messages, temp,
+                                                     extra_headers=BITRECS_HEADERS)
+            case LLM.CHAT_GPT:
+                return await llm_clients.chat_openai(LLMFactory._api_key("CHATGPT_API_KEY"), None,
+                                                     model, messages, temp, extra_headers=BITRECS_HEADERS)
+            case LLM.VLLM:
+                return await llm_clients.chat_openai(LLMFactory._api_key("VLLM_API_KEY"),
+                                                     "http://localhost:8000/v1", model, messages, temp)
+            case LLM.GEMINI:
+                messages = [{"role": "system", "content": system_prompt}] + messages
+                return await llm_clients.chat_openai(LLMFactory._api_key("GEMINI_API_KEY"),
+                                                     "https://generativelanguage.googleapis.com/v1beta/openai/",
+                                                     model, messages, temp, extra_headers=BITRECS_HEADERS)
+            case LLM.CHUTES:
+                return await llm_clients.chat_chutes(LLMFactory._api_key("CHUTES_API_KEY"), model, temp, user_prompt)
+            case LLM.GROK:
+                raise NotImplementedError("Grok is not implemented yet")
+            case LLM.CLAUDE:
+                raise NotImplementedError("Claude is not implemented yet")
+            case _:
+                raise ValueError("Unknown LLM server")
+
+    @staticmethod
+    def _api_key(name: str) -> str:
+        key = os.environ.get(name)
+        if not key:
+            raise ValueError(f"{name} is not set")
+        return key
+
     @staticmethod
     def try_parse_llm(value: str) -> LLM:
         match value.upper():
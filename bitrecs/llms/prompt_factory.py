@@ -7,6 +7,8 @@ from functools import lru_cache
 from typing import List, Optional
 from datetime import datetime
 from bitrecs.commerce.user_profile import UserProfile
+from bitrecs.commerce.retrieval import retrieve_candidates
+from bitrecs.llms.context_packer import context_packer
 
 
 class PromptFactory:
@@ -45,14 +47,23 @@ class PromptFactory:
                  context: str, 
                  num_recs: int = 5,                                  
                  profile: Optional[UserProfile] = None,
-                 debug: bool = False) -> None:
+                 debug: bool = False,
+                 max_candidates: int = 0,
+                 max_context_tokens: int = 0,
+                 prefix_cache: bool = False) -> None:
         """
         Generates a prompt for product recommendations based on the provided SKU and context.
         :param sku: The SKU of the product being viewed.
         :param context: The context string containing available products.
         :param num_recs: The number of recommendations to generate (default is 5).
         :param profile: Optional UserProfile object containing user-specific data.
-        :param debug: If True, enables debug logging."""
+        :param debug: If True, enables debug logging.
+        :param max_candidates: If set, the context is narrowed to the viewed product, the cart and this many
+            products retrieved by name relevance before prompting (0 keeps the full context).
+        :param max_context_tokens: If set, the context is packed into this many tokens keeping the viewed product
+            and the cart first, raises ValueError when they alone do not fit (0 for no budget).
+        :param prefix_cache: If True, the prompt puts the instructions, persona and catalog first and the query,
+            cart and date last so requests against the same catalog share a prefix the LLM server can reuse."""
 
         if len(sku) < CONST.MIN_QUERY_LENGTH or len(sku) > CONST.MAX_QUERY_LENGTH:
             raise ValueError(f"SKU must be between {CONST.MIN_QUERY_LENGTH} and {CONST.MAX_QUERY_LENGTH} characters long")
@@ -63,6 +74,7 @@ class PromptFactory:
         self.context = context
         self.num_recs = num_recs
         self.debug = debug
+        self.prefix_cache = prefix_cache
         self.catalog = []
         self.cart = []
         self.cart_json = "[]"
@@ -78,92 +90,36 @@ class PromptFactory:
             self.cart_json = json.dumps(self.cart, separators=(',', ':'))
             self.orders = profile.orders
             # self.order_json = json.dumps(self.orders, separators=(',', ':'))
+        if max_candidates > 0:
+            self.context = retrieve_candidates(context, sku, max_candidates, self.cart)
+        if max_context_tokens > 0:
+            keep = [sku] + [item.get("sku", "") for item in self.cart if isinstance(item, dict)]
+            packed = context_packer.pack(self.context, max_context_tokens, keep)
+            if packed is None:
+                raise ValueError(f"context does not fit in {max_context_tokens} tokens")
+            self.context = packed
 
 
     def generate_prompt(self) -> str:
         """Generates a text prompt for product recommendations with persona details."""
         bt.logging.info("PROMPT generating prompt: {}".format(self.sku))
+        if self.prefix_cache:
+            return self.generate_prefix_cached_prompt()
 
         today = datetime.now().strftime("%Y-%m-%d")
         season = self.season
         persona_data = self.PERSONAS[self.persona]
 
-        prompt = f"""# SCENARIO
-    A shopper is viewing a product with SKU <sku>{self.sku}</sku> on your e-commerce store.
-    They are looking for complementary products to add to their cart.
-    You will build a recommendation set based on the provided context and your persona qualities.
-        
-    # YOUR PERSONA
-    <persona>{self.persona}</persona>
-
-    <core_attributes>
-    You embody: {persona_data['description']}
-    Your mindset: {persona_data['tone']}
-    Your expertise: {persona_data['response_style']}
-    Core values: {', '.join(persona_data['priorities'])}
-    </core_attributes>
-
-    YOUR ROLE:
-    - Recommend complementary products (A -> X,Y,Z)
-    - Increase average order value and conversion rate
-    - Use deep product catalog knowledge
-    - Understand product attributes and revenue impact
-    - Avoid variant duplicates (same product in different colors/sizes)
-    - Consider seasonal relevance
-
-    Current season: <season>{season}</season>
-    Today's date: {today} 
-
-    # TASK
-    Given a product SKU <sku>{self.sku}</sku> select {self.num_recs} complementary products from the context.
-    Use your persona qualities to THINK about which products to select, but return ONLY a JSON array.
-    Evaluate each product name and price fields before making your recommendations.
-    The name field is the most important attribute followed by price.
-    The product name will often contain important information like which category it belongs to, sometimes denoted by | characters indicating the category hierarchy.    
-    Leverage the complete information ecosystem - product catalog, user context, seasonal trends, and your role expertise as a {self.persona} - to deliver strategically aligned recommendations.
-    Apply comprehensive analysis using all available inputs: product attributes from the context, user cart history, seasonal relevance, pricing considerations and your persona's core values to create a cohesive recommendation set.
-    Utilize your core_attributes to make the best recommendations.
-    Do not recommend products that are already in the cart.
-
-    # INPUT
-    Query SKU: <sku>{self.sku}</sku>
-
-    Available products:
-    <context>
-    {self.context}
-    </context>
-
-    Current cart:
-    <cart>
-    {self.cart_json}
-    </cart>
-
-    # OUTPUT REQUIREMENTS
-    - Return ONLY a JSON array.
-    - NO Python dictionary syntax (no single quotes).
-    - Each item must be valid JSON with: "sku": "...", "name": "...", "price": "...", "reason": "..."
-    - Each item must have: sku, name, price and reason.
-    - If the Query SKU product is gendered, consider recommending products that match the gender of the Query SKU.
-    - If the Query SKU is gender neutral, recommend more gender neutral products.
-    - Never mix gendered products in the recommendation set, use common sense for example if the user is looking at womans shoes, do not recommend mens shoes.
-    - Do not conflate pet products with baby products, they are different categories.
-    - Must return exactly {self.num_recs} items.
-    - Return items MUST exist in context.
-    - Return items must NOT exist in the cart.
-    - No duplicates. Very important! The final result MUST be a SET of products from the context.
-    - Product matching Query SKU must not be included in the set of recommendations.
-    - Return items should be ordered by relevance/profitability, the first being your top recommendation.
-    - Each item must have a reason explaining why the product is a good recommendation for the related Query SKU.
-    - The reason should be a single succinct sentence consisting of plain words without punctuation, or line breaks.
-    - You will be graded on your reasoning, so make sure to provide a good reason for each recommendation which is relevant to the Query SKU.
-    - If you recommend nonsensical products, you will be penalized heavily and possibly banned from the system.
-    - No explanations or text outside the JSON array.
-
-    Example format:
-    
-    [{{"sku": "XYZ", "name": "Hunter Original Play Boot Chelsea", "price": "115", "reason": "User is viewing rainboots, we recommend this alternative pair of rainboots which is our best seller"}},
-        {{"sku": "ABC", "name": "Men's Lightweight Hooded Rain Jacket", "price": "149", "reason": "Since the user is looking at mens rainboots, given the season a mens raincoat should be a good fit"}},
-        {{"sku": "DEF", "name": "Davek Elite Umbrella", "price": "159", "reason": "An Umbrella would go nicely with ABC Lightweight Hooded Rain Jacket and is often paired with it"}}]"""
+        prompt = _join(
+            _scenario(self.sku),
+            _persona(self.persona),
+            _lines(_season(season), _today(today)),
+            _task(self.sku, self.num_recs, self.persona),
+            _lines("# INPUT", _query(self.sku)),
+            _catalog(self.context),
+            _cart(self.cart_json),
+            _output_requirements(self.num_recs)
+        )
 
         prompt_length = len(prompt)
         bt.logging.info(f"LLM QUERY Prompt length: {prompt_length}")
@@ -180,6 +136,42 @@ class PromptFactory:
         return prompt
     
     
+    def generate_prefix_cached_prompt(self) -> str:
+        """
+        The sections of generate_prompt reordered for KV cache reuse: the static prefix
+        (persona, instructions, output requirements, catalog) only depends on the persona,
+        season, number of recommendations and context, the query sku, cart and date follow
+        in a short suffix.
+        """
+        prefix = PromptFactory._static_prefix(self.persona, self.season, self.num_recs, self.context)
+        today = datetime.now().strftime("%Y-%m-%d")
+        suffix = _join(
+            "",
+            _lines("# INPUT", _today(today), _query(self.sku)),
+            _cart(self.cart_json),
+            _scenario(self.sku),
+            _lines("# TASK", _task_line(self.sku, self.num_recs))
+        )
+        prompt = prefix + suffix
+        bt.logging.info(f"LLM QUERY Prompt length: {len(prompt)} (static prefix {len(prefix)})")
+        if self.debug:
+            bt.logging.info(f"LLM QUERY Prompt Token count: {PromptFactory.get_token_count(prompt)}")
+            bt.logging.debug(f"Prompt suffix: {suffix}")
+        return prompt
+
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _static_prefix(persona: str, season: str, num_recs: int, context: str) -> str:
+        """ Prompt prefix shared by every request against a catalog, cached so it is built once """
+        return _join(
+            _persona(persona),
+            _season(season),
+            _lines("# GUIDELINES", _guidelines(persona)),
+            _output_requirements(num_recs),
+            _lines("# CATALOG", _catalog(context))
+        )
+
+
     @staticmethod
     def get_token_count(prompt: str, encoding_name: str="o200k_base") -> int:
         encoding = PromptFactory._get_cached_encoding(encoding_name)
@@ -220,3 +212,118 @@ class PromptFactory:
         except Exception as e:
             bt.logging.error(str(e))
             return []
+
+
+# Prompt sections shared by both prompt layouts, sections are joined by a blank line
+# and every line after the first of a section is indented like the prompt body
+
+_INDENT = "\n    "
+
+ROLE = """YOUR ROLE:
+    - Recommend complementary products (A -> X,Y,Z)
+    - Increase average order value and conversion rate
+    - Use deep product catalog knowledge
+    - Understand product attributes and revenue impact
+    - Avoid variant duplicates (same product in different colors/sizes)
+    - Consider seasonal relevance"""
+
+GUIDELINES = """Use your persona qualities to THINK about which products to select, but return ONLY a JSON array.
+    Evaluate each product name and price fields before making your recommendations.
+    The name field is the most important attribute followed by price.
+    The product name will often contain important information like which category it belongs to, sometimes denoted by | characters indicating the category hierarchy.
+    Leverage the complete information ecosystem - product catalog, user context, seasonal trends, and your role expertise as a {persona} - to deliver strategically aligned recommendations.
+    Apply comprehensive analysis using all available inputs: product attributes from the context, user cart history, seasonal relevance, pricing considerations and your persona's core values to create a cohesive recommendation set.
+    Utilize your core_attributes to make the best recommendations.
+    Do not recommend products that are already in the cart."""
+
+OUTPUT_REQUIREMENTS = """# OUTPUT REQUIREMENTS
+    - Return ONLY a JSON array.
+    - NO Python dictionary syntax (no single quotes).
+    - Each item must be valid JSON with: "sku": "...", "name": "...", "price": "...", "reason": "..."
+    - Each item must have: sku, name, price and reason.
+    - If the Query SKU product is gendered, consider recommending products that match the gender of the Query SKU.
+    - If the Query SKU is gender neutral, recommend more gender neutral products.
+    - Never mix gendered products in the recommendation set, use common sense for example if the user is looking at womans shoes, do not recommend mens shoes.
+    - Do not conflate pet products with baby products, they are different categories.
+    - Must return exactly {num_recs} items.
+    - Return items MUST exist in context.
+    - Return items must NOT exist in the cart.
+    - No duplicates. Very important! The final result MUST be a SET of products from the context.
+    - Product matching Query SKU must not be included in the set of recommendations.
+    - Return items should be ordered by relevance/profitability, the first being your top recommendation.
+    - Each item must have a reason explaining why the product is a good recommendation for the related Query SKU.
+    - The reason should be a single succinct sentence consisting of plain words without punctuation, or line breaks.
+    - You will be graded on your reasoning, so make sure to provide a good reason for each recommendation which is relevant to the Query SKU.
+    - If you recommend nonsensical products, you will be penalized heavily and possibly banned from the system.
+    - No explanations or text outside the JSON array.
+
+    Example format:
+
+    [{{"sku": "XYZ", "name": "Hunter Original Play Boot Chelsea", "price": "115", "reason": "User is viewing rainboots, we recommend this alternative pair of rainboots which is our best seller"}},
+        {{"sku": "ABC", "name": "Men's Lightweight Hooded Rain Jacket", "price": "149", "reason": "Since the user is looking at mens rainboots, given the season a mens raincoat should be a good fit"}},
+        {{"sku": "DEF", "name": "Davek Elite Umbrella", "price": "159", "reason": "An Umbrella would go nicely with ABC Lightweight Hooded Rain Jacket and is often paired with it"}}]"""
+
+
+def _lines(*lines: str) -> str:
+    return _INDENT.join(lines)
+
+
+def _join(*sections: str) -> str:
+    return ("\n" + _INDENT).join(sections)
+
+
+def _scenario(sku: str) -> str:
+    return _lines("# SCENARIO",
+                  f"A shopper is viewing a product with SKU <sku>{sku}</sku> on your e-commerce store.",
+                  "They are looking for complementary products to add to their cart.",
+                  "You will build a recommendation set based on the provided context and your persona qualities.")
+
+
+def _persona(persona: str) -> str:
+    persona_data = PromptFactory.PERSONAS[persona]
+    return _join(
+        _lines("# YOUR PERSONA", f"<persona>{persona}</persona>"),
+        _lines("<core_attributes>",
+               f"You embody: {persona_data['description']}",
+               f"Your mindset: {persona_data['tone']}",
+               f"Your expertise: {persona_data['response_style']}",
+               f"Core values: {', '.join(persona_data['priorities'])}",
+               "</core_attributes>"),
+        ROLE
+    )
+
+
+def _season(season: str) -> str:
+    return f"Current season: <season>{season}</season>"
+
+
+def _today(today: str) -> str:
+    return f"Today's date: {today}"
+
+
+def _task_line(sku: str, num_recs: int) -> str:
+    return f"Given a product SKU <sku>{sku}</sku> select {num_recs} complementary products from the context."
+
+
+def _guidelines(persona: str) -> str:
+    return GUIDELINES.format(persona=persona)
+
+
+def _task(sku: str, num_recs: int, persona: str) -> str:
+    return _lines("# TASK", _task_line(sku, num_recs), _guidelines(persona))
+
+
+def _query(sku: str) -> str:
+    return f"Query SKU: <sku>{sku}</sku>"
+
+
+def _catalog(context: str) -> str:
+    return _lines("Available products:", "<context>", context, "</context>")
+
+
+def _cart(cart_json: str) -> str:
+    return _lines("Current cart:", "<cart>", cart_json, "</cart>")
+
+
+def _output_requirements(num_recs: int) -> str:
+    return OUTPUT_REQUIREMENTS.format(num_recs=num_recs)
@@ -17,9 +17,16 @@
 # DEALINGS IN THE SOFTWARE.
 
 
+import hashlib
 import pydantic
 import bittensor as bt
 
+
+def catalog_hash(context: str) -> str:
+    """ Content hash of a catalog context, how validators and miners refer to a catalog """
+    return hashlib.blake2b((context or "").encode("utf-8"), digest_size=16).hexdigest()
+
+
 class BitrecsRequest(bt.Synapse):
     created_at: str | None
     user: str | None
@@ -34,6 +41,16 @@ class BitrecsRequest(bt.Synapse):
     models_used: list | None
     miner_uid: str | None
     miner_hotkey: str | None
+    # Catalog reference mode: hash of the catalog, context is empty when the miner already holds it.
+    # Miners echo the hash once they hold the catalog and set catalog_missing when they do not.
+    context_hash: str | None = None
+    catalog_missing: bool = False
+    # Compression: codecs the sender can decode, and the codec applied to this message's
+    # context and results (see bitrecs.utils.compression), None is plain json
+    accept_codecs: list | None = None
+    codec: str | None = None
+    # Decoded results, see bitrecs.utils.parsing.get_parsed_response
+    _parsed: tuple | None = pydantic.PrivateAttr(default=None)
     
 
     def to_dict(self) -> dict:
@@ -0,0 +1,114 @@
+import gzip
+import zlib
+import json
+import base64
+import bittensor as bt
+import bitrecs.utils.constants as CONST
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Codecs this node can decode, most preferred first
+SUPPORTED_CODECS: List[str] = (["zstd"] if zstandard is not None else []) + ["gzip"]
+
+
+def negotiate(accepted: Optional[list], preferred: Optional[str] = None) -> Optional[str]:
+    """
+    Codec to use towards a peer that accepts the given codecs, None for plain json.
+    preferred restricts the choice to that codec, otherwise the first supported one wins.
+    """
+    if not accepted:
+        return None
+    for codec in SUPPORTED_CODECS:
+        if codec in accepted and (preferred is None or codec == preferred):
+            return codec
+    return None
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if codec == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Unsupported codec: {codec}")
+
+
+class DecompressionLimitError(ValueError):
+    """ Raised when a payload decompresses to more than the allowed size """
+
+
+def _decompress(data: bytes, codec: str, max_size: int) -> bytes:
+    """
+    Decompress at most max_size bytes, peers control the payload so output is never
+    allowed to grow past the limit before it is checked.
+    """
+    if codec == "gzip":
+        decompressor = zlib.decompressobj(wbits=31)
+        out = decompressor.decompress(data, max_size + 1)
+        if len(out) > max_size or decompressor.unconsumed_tail:
+            raise DecompressionLimitError(f"gzip payload exceeds {max_size} bytes")
+        if not decompressor.eof:
+            raise ValueError("truncated gzip payload")
+        return out
+    if codec == "zstd" and zstandard is not None:
+        chunks = []
+        size = 0
+        with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+            while True:
+                chunk = reader.read(min(65536, max_size + 1 - size))
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise DecompressionLimitError(f"zstd payload exceeds {max_size} bytes")
+                chunks.append(chunk)
+        return b"".join(chunks)
+    raise ValueError(f"Unsupported codec: {codec}")
+
+
+@lru_cache(maxsize=16)
+def encode_text(text: str, codec: str) -> str:
+    """
+    Compressed and base64 encoded text for a synapse field.
+    Cached, a catalog sent to many miners is only compressed once per codec.
+    """
+    return base64.b64encode(_compress(text.encode("utf-8"), codec)).decode("ascii")
+
+
+def decode_text(data: str, codec: str, max_size: int = CONST.MAX_CONTEXT_BYTES) -> str:
+    """ Decompressed text of a synapse field, raises DecompressionLimitError past max_size bytes """
+    return _decompress(base64.b64decode(data), codec, max_size).decode("utf-8")
+
+
+def encode_results(results: list, codec: Optional[str]) -> Tuple[list, Optional[str]]:
+    """
+    Results as a single compressed item when that is smaller, returns the results
+    and the codec applied (None when they are left as is).
+    """
+    if not codec or not results:
+        return results, None
+    plain = json.dumps(results, separators=(',', ':'))
+    encoded = base64.b64encode(_compress(plain.encode("utf-8"), codec)).decode("ascii")
+    if len(encoded) >= len(plain):
+        return results, None
+    return [encoded], codec
+
+
+def decode_results(results: list, codec: Optional[str]) -> list:
+    if not codec or not results:
+        return results
+    try:
+        decoded = json.loads(decode_text(results[0], codec, max_size=CONST.MAX_RESULTS_BYTES))
+        if not isinstance(decoded, list):
+            raise ValueError("results are not a list")
+        return decoded
+    except Exception as e:
+        bt.logging.error(f"decode_results {codec} Exception: {e}")
+        return []
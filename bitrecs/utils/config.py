@@ -21,6 +21,7 @@ import subprocess
 import argparse
 import bittensor as bt
 from .logging import setup_events_logger
+from . import constants as CONST
 
 
 def is_cuda_available():
@@ -171,6 +172,27 @@ def add_miner_args(cls, parser):
         help="Which LLM model to use",
     )
 
+    parser.add_argument(
+        "--llm.candidates",
+        type=int,
+        default=0,
+        help="Narrow the catalog to this many products relevant to the query before prompting (0 sends the full catalog).",
+    )
+
+    parser.add_argument(
+        "--llm.context_tokens",
+        type=int,
+        default=0,
+        help="Token budget for the catalog in the prompt, e.g. the model num_ctx less room for instructions and output (0 for no budget).",
+    )
+
+    parser.add_argument(
+        "--llm.prefix_cache",
+        action="store_true",
+        help="Put the instructions and catalog ahead of the query in prompts so vLLM or Ollama can reuse the KV cache of a catalog. Works best without --llm.candidates, which changes the catalog per query.",
+        default=False,
+    )
+
 
 
 def add_validator_args(cls, parser):
@@ -193,7 +215,7 @@ def add_validator_args(cls, parser):
     parser.add_argument(
         "--neuron.num_concurrent_forwards",
         type=int,
-        help="The number of concurrent forwards running at any time.",
+        help="The number of concurrent forwards running at any time (API requests serviced in parallel).",
         default=1,
     )
 
@@ -204,6 +226,106 @@ def add_validator_args(cls, parser):
         default=16,
     )
 
+    parser.add_argument(
+        "--neuron.quorum",
+        type=int,
+        help="Answer API requests once this many valid miner responses agree, 0 waits for all miners.",
+        default=0,
+    )
+
+    parser.add_argument(
+        "--neuron.quorum_similarity",
+        type=float,
+        help="Minimum Jaccard similarity between responses for them to count towards the quorum.",
+        default=0.33,
+    )
+
+    parser.add_argument(
+        "--neuron.request_deadline",
+        type=float,
+        help="Total seconds an API request may spend querying miners, including retries.",
+        default=10.0,
+    )
+
+    parser.add_argument(
+        "--neuron.retry_count",
+        type=int,
+        help="Number of the fastest miners to re-query when no miner responded successfully.",
+        default=3,
+    )
+
+    parser.add_argument(
+        "--neuron.hedge_percentile",
+        type=float,
+        help="Latency percentile (0-1) after which a retry is hedged with another miner.",
+        default=0.9,
+    )
+
+    parser.add_argument(
+        "--neuron.fan_out",
+        type=int,
+        help="Number of active miners sampled per API request, 0 sends every request to all active miners.",
+        default=0,
+    )
+
+    parser.add_argument(
+        "--neuron.exploration",
+        type=float,
+        help="Fraction of the fan out sampled uniformly so every miner keeps being evaluated.",
+        default=0.2,
+    )
+
+    parser.add_argument(
+        "--neuron.similarity_mode",
+        type=str,
+        choices=["exact", "minhash"],
+        help="Similarity selection for consensus, minhash uses MinHash/LSH candidates on large samples.",
+        default="exact",
+    )
+
+    parser.add_argument(
+        "--neuron.minhash_permutations",
+        type=int,
+        help="MinHash signature length in minhash similarity mode, higher is more accurate and slower.",
+        default=64,
+    )
+
+    parser.add_argument(
+        "--neuron.lsh_bands",
+        type=int,
+        help="LSH bands in minhash similarity mode (must divide minhash_permutations), higher finds weaker matches.",
+        default=8,
+    )
+
+    parser.add_argument(
+        "--neuron.lsh_min_responses",
+        type=int,
+        help="Minimum number of valid responses before minhash similarity mode is used, smaller rounds are compared exactly.",
+        default=CONST.LSH_MIN_RESPONSES,
+    )
+
+    parser.add_argument(
+        "--neuron.compression",
+        type=str,
+        choices=["none", "auto", "gzip", "zstd"],
+        help="Compress the context for miners that advertise the codec, auto picks the best codec both sides support.",
+        default="none",
+    )
+
+    parser.add_argument(
+        "--neuron.catalog_refs",
+        action="store_true",
+        help="Send miners a catalog hash instead of the full catalog once they acknowledged holding it.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--neuron.disable_adaptive_timeouts",
+        action="store_true",
+        help="Use the fixed dendrite timeout for every miner instead of one derived from its latency history.",
+        default=False,
+    )
+
     parser.add_argument(
         "--neuron.disable_set_weights",
         action="store_true",
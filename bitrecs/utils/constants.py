@@ -22,6 +22,26 @@ Constants:
     RE_PRODUCT_NAME (Pattern): Regular expression to match valid product names.
     RE_REASON (Pattern): Regular expression to match valid reasons.
     CONVERSION_SCORING_ENABLED (bool): Flag to enable conversion scoring.
+    API_QUEUE_POLL_INTERVAL (float): Length of seconds the validator waits on the API queue before checking for exit.
+    MIN_DENDRITE_TIMEOUT (float): Lower bound in seconds for an adaptive per-miner dendrite timeout.
+    LATENCY_TIMEOUT_HEADROOM (float): Multiplier applied to a miner's p95 latency to get its dendrite timeout.
+    LATENCY_REPROBE_RATE (float): Chance a miner too slow for the deadline is still queried to refresh its latency.
+    VALIDITY_MOVING_AVERAGE_ALPHA (float): Smoothing factor for the per-miner share of valid responses.
+    PING_MAX_CONCURRENCY (int): Maximum number of miner liveness probes in flight at once.
+    PING_CACHE_TTL (int): Length of seconds a miner liveness probe result is reused.
+    CHAIN_SYNC_INTERVAL (int): Length of seconds between background chain syncs (registration, metagraph, weights, state).
+    CATALOG_CACHE_MAX_BYTES (int): Approximate memory budget for parsed catalogs kept in the catalog cache.
+    LSH_MIN_RESPONSES (int): Default minimum number of valid responses before minhash similarity mode is used instead of exact, below the 256 uids of a subnet.
+    CSV_CHUNK_ROWS (int): Number of rows read at a time when loading a catalog csv export.
+    CATALOG_STORE_MAX_BYTES (int): Approximate memory budget for catalogs a miner keeps for catalog reference requests.
+    CATALOG_REFS_PER_MINER (int): Number of catalog hashes the validator remembers per miner in catalog reference mode.
+    CATALOG_INDEX_CACHE_SIZE (int): Number of catalog retrieval indexes a miner keeps, keyed by catalog hash.
+    TOKEN_CACHE_MAX_ROWS (int): Number of product rows whose token count is kept by the context packer.
+    TOKEN_CACHE_MAX_CATALOGS (int): Number of catalogs whose token counts are kept by the context packer, keyed by catalog hash.
+    LLM_MAX_CONNECTIONS (int): Maximum open connections per pooled miner LLM client.
+    LLM_REQUEST_TIMEOUT (float): Length of seconds a miner waits on an LLM provider request.
+    MAX_RESULTS_BYTES (int): Maximum decompressed size of compressed miner results.
+    MAX_CONTEXT_BYTES (int): Maximum decompressed size of a compressed request context.
 
 """
 ROOT_DIR = Path(bitrecs.__file__).parent.parent
@@ -40,4 +60,24 @@ CATALOG_DUPE_THRESHOLD = 0.05
 R2_SYNC_INTERVAL = 3600
 RE_PRODUCT_NAME = re.compile(r"[^A-Za-z0-9 |-]")
 RE_REASON = re.compile(r"[^A-Za-z0-9 ]")
-CONVERSION_SCORING_ENABLED = False
\ No newline at end of file
+CONVERSION_SCORING_ENABLED = False
+API_QUEUE_POLL_INTERVAL = 1.0
+MIN_DENDRITE_TIMEOUT = 1.0
+LATENCY_TIMEOUT_HEADROOM = 1.5
+LATENCY_REPROBE_RATE = 0.1
+VALIDITY_MOVING_AVERAGE_ALPHA = 0.1
+PING_MAX_CONCURRENCY = 64
+PING_CACHE_TTL = 300
+CHAIN_SYNC_INTERVAL = 120
+CATALOG_CACHE_MAX_BYTES = 256 * 1024 * 1024
+LSH_MIN_RESPONSES = 64
+CSV_CHUNK_ROWS = 100_000
+CATALOG_STORE_MAX_BYTES = 256 * 1024 * 1024
+CATALOG_REFS_PER_MINER = 64
+CATALOG_INDEX_CACHE_SIZE = 32
+TOKEN_CACHE_MAX_ROWS = 200_000
+TOKEN_CACHE_MAX_CATALOGS = 8
+LLM_MAX_CONNECTIONS = 64
+LLM_REQUEST_TIMEOUT = 60.0
+MAX_RESULTS_BYTES = MAX_RECS_PER_REQUEST * 8 * 1024
+MAX_CONTEXT_BYTES = 4 * MAX_CONTEXT_TEXT_LENGTH
@@ -1,7 +1,10 @@
 import json
-import json_repair
-from typing import List, Optional, Set
+import numpy as np
+from dataclasses import dataclass, field
+from typing import List, Optional, Set, Tuple
 from bitrecs.protocol import BitrecsRequest
+from bitrecs.utils.parsing import get_parsed_response, parse_results
+from bitrecs.utils.minhash import EncodedSets, encode_sets, lsh_candidate_pairs, minhash_signatures
 from bitrecs.utils.color import ColorScheme, ColorPalette
 
 
@@ -26,71 +29,244 @@ def rec_list_to_set(recs: list) -> Set[str]:
     Returns:
         Set of SKUs
     """
-    sku_set = set()
-    for item in recs:
-        if isinstance(item, dict) and 'sku' in item:
-            sku_set.add(item['sku'])
-        elif isinstance(item, str):       
-            product = json_repair.loads(item)
-            if isinstance(product, dict) and 'sku' in product:
-                sku_set.add(product['sku'])
-        else:
-            print(f"Invalid item type in results: {item}")
-    return sku_set
+    parsed = parse_results(recs)
+    for error in parsed.errors:
+        print(f"Invalid item in results: {error}")
+    return parsed.sku_set
 
 
-def select_most_similar_sets(rec_sets: List[Set], top_n: int = 2) -> List[int]:
+def response_to_set(req: BitrecsRequest) -> Set[str]:
     """
-    Select most similar sets based on Jaccard similarity.
-    Returns indices of the top N most similar pairs.
-    
+    Set of SKUs in a BitrecsRequest, reusing the results already parsed for validation.
+    """
+    return get_parsed_response(req).sku_set
+
+
+@dataclass
+class SimilarityResult:
+    """
+    Similarity analysis of one round of sku sets, computed once and shared by
+    selection, the matrix renderers and logging.
+
+    sizes: skus per set
+    selected: indices picked by the selector, in order
+    pairs: k x 2 compared pairs (i < j), best first, down to the last rank the selector needed
+    pair_similarity: Jaccard similarity of each ranked pair
+    intersection: n x n shared sku counts, None when only LSH candidates were compared
+    """
+    sizes: np.ndarray
+    selected: List[int] = field(default_factory=list)
+    pairs: np.ndarray = field(default_factory=lambda: np.empty((0, 2), dtype=np.int64))
+    pair_similarity: np.ndarray = field(default_factory=lambda: np.empty(0))
+    intersection: Optional[np.ndarray] = None
+
+    @property
+    def has_matrix(self) -> bool:
+        return self.intersection is not None
+
+    @property
+    def union(self) -> np.ndarray:
+        return self.sizes[:, None] + self.sizes[None, :] - self.intersection
+
+    @property
+    def similarity(self) -> np.ndarray:
+        return _similarity_from_counts(self.intersection, self.sizes)
+
+    @property
+    def distance(self) -> np.ndarray:
+        return 1 - self.similarity
+
+
+def _intersection_matrix(rec_sets: List[Set]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Shared sku counts of all pairs from a set x sku incidence matrix, with the set sizes.
+    Only skus shared by at least two sets can intersect so the matrix keeps those columns.
+    """
+    n = len(rec_sets)
+    vocab = {}
+    rows = []
+    cols = []
+    for i, rec_set in enumerate(rec_sets):
+        for sku in rec_set:
+            cols.append(vocab.setdefault(sku, len(vocab)))
+            rows.append(i)
+    sizes = np.fromiter((len(s) for s in rec_sets), dtype=np.float64, count=n)
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+
+    shared = np.bincount(cols, minlength=len(vocab))[cols] > 1
+    rows, cols = rows[shared], cols[shared]
+    shared_skus, cols = np.unique(cols, return_inverse=True)
+    incidence = np.zeros((n, len(shared_skus)), dtype=np.float32)
+    incidence[rows, cols] = 1.0
+
+    # counts are small integers so the float32 product is exact
+    intersection = (incidence @ incidence.T).astype(np.float64)
+    return intersection, sizes
+
+
+def _similarity_from_counts(intersection: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    union = sizes[:, None] + sizes[None, :] - intersection
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similarity = np.where(union > 0, intersection / union, 0.0)
+    empty = sizes == 0
+    similarity[empty, :] = 0.0
+    similarity[:, empty] = 0.0
+    return similarity
+
+
+def jaccard_similarity_matrix(rec_sets: List[Set]) -> np.ndarray:
+    """
+    Pairwise Jaccard similarity of all sets.
+    Empty sets have similarity 0.0 with everything, matching calculate_jaccard_distance.
+
     Args:
         rec_sets: List of sets to compare
-        top_n: Number of indices to return (default 2)
     Returns:
-        List of indices for the most similar sets
+        n x n float64 matrix of intersection / union
     """
-    n = len(rec_sets)
-    all_pairs = []
-    
-    # Calculate similarities for all pairs
-    for i in range(n):
-        for j in range(i + 1, n):
-            distance = calculate_jaccard_distance(rec_sets[i], rec_sets[j])
-            similarity = 1 - distance
-            all_pairs.append((similarity, i, j))
-    
-    # Sort by similarity (highest first)
-    all_pairs.sort(reverse=True)
-    
-    # Debug info
-    # print("\nTop similarity pairs:")
-    # for sim, i, j in all_pairs[:5]:
-    #     print(f"Sets {i},{j}: similarity={sim:.3f} (distance={1-sim:.3f})")
-    
-    # Get indices from top pairs
+    return _similarity_from_counts(*_intersection_matrix(rec_sets))
+
+
+def pair_jaccard_similarity(encoded: EncodedSets, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """
+    Jaccard similarity for the pairs (i[k], j[k]) only, without the full matrix.
+    Empty sets have similarity 0.0 with everything, matching calculate_jaccard_distance.
+    """
+    # skus are unique within a set so equal neighbours in the merged row are shared skus, -1 is padding
+    merged = np.sort(np.concatenate((encoded.ids[i], encoded.ids[j]), axis=1), axis=1)
+    shared = (merged[:, 1:] == merged[:, :-1]) & (merged[:, 1:] >= 0)
+    intersection = shared.sum(axis=1).astype(np.float64)
+    sizes = encoded.sizes
+    union = sizes[i] + sizes[j] - intersection
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similarity = np.where(union > 0, intersection / union, 0.0)
+    similarity[(sizes[i] == 0) | (sizes[j] == 0)] = 0.0
+    return similarity
+
+
+def _upper_pairs(similarity: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ (i, j, similarity) for every pair i < j in row major order """
+    i, j = np.triu_indices(similarity.shape[0], k=1)
+    return i, j, similarity[i, j]
+
+
+def _take_pair_indices(pairs, top_n: int) -> List[int]:
+    """ Indices from the best pairs in order until top_n are collected """
     selected = set()
     result = []
-    
-    # Take indices from best pairs until we have top_n
-    for sim, i, j in all_pairs:
-        for idx in (i, j):
+    for i, j in pairs:
+        for idx in (int(i), int(j)):
             if idx not in selected and len(result) < top_n:
                 selected.add(idx)
                 result.append(idx)
         if len(result) >= top_n:
             break
-            
-    return result[:top_n]
+    return result
+
+
+def _rank_pairs(i: np.ndarray, j: np.ndarray, values: np.ndarray, top_n: int, sizes: np.ndarray,
+                intersection: Optional[np.ndarray] = None) -> SimilarityResult:
+    """ Rank pairs by (similarity, i, j) descending and select top_n indices from them """
+    order = np.lexsort((j, i, values))[::-1]
+    pairs = np.stack((i[order], j[order]), axis=1)
+    selected = _take_pair_indices(pairs, top_n)
+    return SimilarityResult(sizes=sizes, selected=selected, pairs=pairs,
+                            pair_similarity=values[order], intersection=intersection)
 
 
-def select_most_similar_bitrecs(rec_sets: List[BitrecsRequest], top_n: int = 2) -> List[BitrecsRequest]:
+def analyze_similar_sets(rec_sets: List[Set], top_n: int = 2, approximate: bool = False,
+                         num_perm: int = 64, bands: int = 8) -> SimilarityResult:
+    """
+    Select the most similar sets and keep the analysis for rendering and logging.
+    Pairs are ranked by (similarity, i, j) descending.
+
+    Exact mode computes the full matrix. Approximate mode sketches every set with MinHash,
+    buckets them with LSH and computes exact Jaccard only for pairs sharing a bucket,
+    falling back to exact mode when the candidates can not fill top_n.
+
+    Args:
+        rec_sets: List of sets to compare
+        top_n: Number of indices to select (default 2)
+        approximate: Use MinHash/LSH candidates instead of all pairs
+        num_perm: MinHash signature length, more is more accurate and slower
+        bands: LSH bands, more finds less similar pairs and yields more candidates
+    Returns:
+        SimilarityResult with the selected indices
+    """
+    n = len(rec_sets)
+    if n < 2 or top_n < 1:
+        sizes = np.fromiter((len(s) for s in rec_sets), dtype=np.float64, count=n)
+        return SimilarityResult(sizes=sizes)
+
+    if approximate:
+        encoded = encode_sets(rec_sets)
+        candidates = lsh_candidate_pairs(minhash_signatures(encoded, num_perm), bands)
+        if len(candidates) > 0:
+            i, j = candidates[:, 0], candidates[:, 1]
+            # 1 - distance as in the exact selector so ties break identically
+            values = 1 - (1 - pair_jaccard_similarity(encoded, i, j))
+            result = _rank_pairs(i, j, values, top_n, encoded.sizes.astype(np.float64))
+            if len(result.selected) >= top_n:
+                return result
+
+    intersection, sizes = _intersection_matrix(rec_sets)
+    # 1 - distance, the same float the pairwise loop compared so ties break identically
+    i, j, values = _upper_pairs(1 - (1 - _similarity_from_counts(intersection, sizes)))
+
+    # At most C(top_n, 2) visited pairs add no new index, every other pair adds one,
+    # so only the pairs down to that rank (and anything tied with it) need sorting
+    needed = top_n * (top_n - 1) // 2 + top_n
+    if needed < len(values):
+        kth = np.partition(values, len(values) - needed)[len(values) - needed]
+        keep = np.flatnonzero(values >= kth)
+        i, j, values = i[keep], j[keep], values[keep]
+    return _rank_pairs(i, j, values, top_n, sizes, intersection)
+
+
+def select_most_similar_sets(rec_sets: List[Set], top_n: int = 2) -> List[int]:
+    """
+    Select most similar sets based on Jaccard similarity.
+    Returns indices of the top N most similar pairs.
+    
+    Args:
+        rec_sets: List of sets to compare
+        top_n: Number of indices to return (default 2)
+    Returns:
+        List of indices for the most similar sets
+    """
+    return analyze_similar_sets(rec_sets, top_n).selected
+
+
+def select_most_similar_sets_approx(rec_sets: List[Set], top_n: int = 2,
+                                    num_perm: int = 64, bands: int = 8) -> List[int]:
+    """
+    Approximate select_most_similar_sets for large samples, see analyze_similar_sets.
+
+    Args:
+        rec_sets: List of sets to compare
+        top_n: Number of indices to return (default 2)
+        num_perm: MinHash signature length, more is more accurate and slower
+        bands: LSH bands, more finds less similar pairs and yields more candidates
+    Returns:
+        List of indices for the most similar sets
+    """
+    return analyze_similar_sets(rec_sets, top_n, True, num_perm, bands).selected
+
+
+def select_most_similar_bitrecs(rec_sets: List[BitrecsRequest], top_n: int = 2,
+                                approximate: bool = False, num_perm: int = 64,
+                                bands: int = 8) -> List[BitrecsRequest]:
     """
     Select most similar BitrecsRequest objects based on their SKU recommendations.
+    Requests without any SKUs are skipped.
     
     Args:
         rec_sets: List of BitrecsRequest objects
         top_n: Number of similar sets to return
+        approximate: Use MinHash/LSH candidate selection (see analyze_similar_sets)
+        num_perm: MinHash signature length when approximate
+        bands: LSH bands when approximate
     Returns:
         List of most similar BitrecsRequest objects
     """
@@ -98,15 +274,50 @@ def select_most_similar_bitrecs(rec_sets: List[BitrecsRequest], top_n: int = 2)
         return rec_sets
     
     sku_sets = []
+    requests = []
     for req in rec_sets:
-        this_set = rec_list_to_set(req.results)
+        this_set = response_to_set(req)
         if this_set:
             sku_sets.append(this_set)
+            requests.append(req)
     if not sku_sets:
         print("No valid SKUs found in results")
         return []
-    sim = select_most_similar_sets(sku_sets, top_n)
-    return [rec_sets[i] for i in sim]
+    analysis = analyze_similar_sets(sku_sets, top_n, approximate, num_perm, bands)
+    return [requests[i] for i in analysis.selected]
+
+
+def select_quorum_bitrecs(rec_sets: List[BitrecsRequest], quorum: int = 2,
+                          similarity_threshold: float = 0.33) -> Optional[List[BitrecsRequest]]:
+    """
+    Check if a quorum of BitrecsRequest objects agree on their SKU recommendations.
+    Uses the same selection as select_most_similar_bitrecs and requires every pair
+    within the selected group to meet the similarity threshold.
+
+    Args:
+        rec_sets: List of BitrecsRequest objects
+        quorum: Number of agreeing requests required
+        similarity_threshold: Minimum Jaccard similarity between each pair in the quorum
+    Returns:
+        List of agreeing BitrecsRequest objects or None if no quorum
+    """
+    if quorum < 1 or len(rec_sets) < quorum:
+        return None
+    if quorum == 1:
+        return rec_sets[:1]
+
+    sku_sets = [response_to_set(req) for req in rec_sets]
+    if not all(sku_sets):
+        return None
+    selected = select_most_similar_sets(sku_sets, quorum)
+    if len(selected) < quorum:
+        return None
+    for a in range(len(selected)):
+        for b in range(a + 1, len(selected)):
+            distance = calculate_jaccard_distance(sku_sets[selected[a]], sku_sets[selected[b]])
+            if 1 - distance < similarity_threshold:
+                return None
+    return [rec_sets[i] for i in selected]
 
 
 def select_most_similar_bitrecs_threshold(rec_sets: List[BitrecsRequest], top_n: int = 2, 
@@ -125,29 +336,13 @@ def select_most_similar_bitrecs_threshold(rec_sets: List[BitrecsRequest], top_n:
     if len(rec_sets) < 2:
         return rec_sets
 
-    def calc_jaccard_similarity(set1: Set[str], set2: Set[str]) -> float:
-        if not set1 or not set2:
-            return 0.0
-        intersection = len(set1.intersection(set2))
-        union = len(set1.union(set2))
-        return intersection / union if union > 0 else 0.0
-
-    # Convert BitrecsRequests to sets of SKUs
-    sku_sets = []
-    for req in rec_sets:
-        sku_set = set(r['sku'] for r in req.results)
-        sku_sets.append((sku_set, req))  # Keep original request paired with its SKUs
-
-    # Calculate all pairwise similarities
-    pairs = []
-    for i in range(len(sku_sets)):
-        for j in range(i + 1, len(sku_sets)):
-            similarity = calc_jaccard_similarity(sku_sets[i][0], sku_sets[j][0])
-            if similarity >= similarity_threshold:
-                pairs.append((i, j, similarity))
-
-    # Sort pairs by similarity (highest first)
-    pairs.sort(key=lambda x: x[2], reverse=True)
+    # Convert BitrecsRequests to sets of SKUs and rank pairs meeting the threshold
+    sku_sets = [response_to_set(req) for req in rec_sets]
+    i, j, values = _upper_pairs(jaccard_similarity_matrix(sku_sets))
+    meets = values >= similarity_threshold
+    i, j, values = i[meets], j[meets], values[meets]
+    order = np.argsort(-values, kind="stable")
+    pairs = [(int(a), int(b), float(sim)) for a, b, sim in zip(i[order], j[order], values[order])]
 
     if not pairs:
         print(f"No pairs found meeting threshold {similarity_threshold}")
@@ -200,39 +395,19 @@ def select_most_similar_bitrecs_threshold2(
         return None
         
     # Calculate similarities between all pairs
-    similar_pairs = []
-    for i in range(len(rec_sets)):
-        set1 = set(r['sku'] for r in rec_sets[i].results)
-        for j in range(i + 1, len(rec_sets)):
-            set2 = set(r['sku'] for r in rec_sets[j].results)
-            
-            # Calculate Jaccard similarity
-            intersection = len(set1 & set2)
-            union = len(set1 | set2)
-            similarity = intersection / union if union > 0 else 0.0
-            
-            if similarity >= similarity_threshold:
-                similar_pairs.append((i, j, similarity))
+    sku_sets = [response_to_set(req) for req in rec_sets]
+    i, j, values = _upper_pairs(jaccard_similarity_matrix(sku_sets))
+    meets = values >= similarity_threshold
+    i, j, values = i[meets], j[meets], values[meets]
     
-    if not similar_pairs:
+    if len(values) == 0:
         print(f"No pairs found above threshold {similarity_threshold}")
         return None
         
-    # Sort by similarity and get best pairs
-    similar_pairs.sort(key=lambda x: x[2], reverse=True)
-    selected = set()
-    result = []
-    
-    # Take best pairs until we have top_n requests
-    for i, j, sim in similar_pairs:
-        if len(result) >= top_n:
-            break
-        if i not in selected:
-            selected.add(i)
-            result.append(rec_sets[i])
-        if len(result) < top_n and j not in selected:
-            selected.add(j)
-            result.append(rec_sets[j])
+    # Sort by similarity (stable, ties keep pair order) and take best pairs until we have top_n requests
+    order = np.argsort(-values, kind="stable")
+    selected = _take_pair_indices(zip(i[order], j[order]), top_n)
+    result = [rec_sets[idx] for idx in selected]
             
     return result if result else None
 
@@ -242,7 +417,8 @@ def display_rec_matrix(
     rec_sets: List[Set[str]], 
     models_used: List[str], 
     highlight_indices: List[int] = None,
-    color_scheme: ColorScheme = ColorScheme.VIRIDIS
+    color_scheme: ColorScheme = ColorScheme.VIRIDIS,
+    analysis: Optional[SimilarityResult] = None
 ) -> str:
     """
     Displays the similarity matrix for recommendation sets.
@@ -252,13 +428,17 @@ def display_rec_matrix(
     Args:
         rec_sets: List of recommendation sets
         models_used: List of model names
-        highlight_indices: Indices of sets to highlight
+        highlight_indices: Indices of sets to highlight, defaults to analysis.selected
         color_scheme: Color scheme to use for visualization
+        analysis: Result of analyze_similar_sets for rec_sets, its matrix is reused instead of recomputed
     Returns:
         str: Complete formatted matrix report
     """
     output = []
     colors = ColorPalette.SCHEMES[color_scheme]
+    distance_matrix = analysis.distance if analysis is not None and analysis.has_matrix else None
+    if highlight_indices is None and analysis is not None:
+        highlight_indices = analysis.selected
     
     output.append(f"\nDistance Matrix - {len(rec_sets)} sets\n")
     
@@ -285,7 +465,10 @@ def display_rec_matrix(
         row = []
         for j in range(len(rec_sets)):
             if j < i:
-                distance = calculate_jaccard_distance(rec_sets[i], rec_sets[j])
+                if distance_matrix is not None:
+                    distance = float(distance_matrix[i, j])
+                else:
+                    distance = calculate_jaccard_distance(rec_sets[i], rec_sets[j])
                 cell = f"{distance:7.3f}"
                 
                 if distance < 0.91:
@@ -348,7 +531,8 @@ def display_rec_matrix(
 def display_rec_matrix_html(
     rec_sets: List[Set[str]], 
     models_used: List[str], 
-    highlight_indices: List[int] = None
+    highlight_indices: List[int] = None,
+    analysis: Optional[SimilarityResult] = None
 ) -> str:
     """
     Generate HTML visualization of the similarity matrix.
@@ -356,10 +540,14 @@ def display_rec_matrix_html(
     Args:
         rec_sets: List of recommendation sets
         models_used: List of model names
-        highlight_indices: Indices of sets to highlight
+        highlight_indices: Indices of sets to highlight, defaults to analysis.selected
+        analysis: Result of analyze_similar_sets for rec_sets, its matrix is reused instead of recomputed
     Returns:
         str: HTML formatted matrix with styling
     """
+    distance_matrix = analysis.distance if analysis is not None and analysis.has_matrix else None
+    if highlight_indices is None and analysis is not None:
+        highlight_indices = analysis.selected
     
     css = """
     <style>
@@ -400,7 +588,10 @@ def display_rec_matrix_html(
         
         for j in range(len(rec_sets)):
             if j < i:
-                distance = calculate_jaccard_distance(rec_sets[i], rec_sets[j])
+                if distance_matrix is not None:
+                    distance = float(distance_matrix[i, j])
+                else:
+                    distance = calculate_jaccard_distance(rec_sets[i], rec_sets[j])
                 
                 if distance < 0.91:
                     match_info.append((i, j, distance, models_used[i], models_used[j]))
@@ -488,7 +679,8 @@ def display_rec_matrix_numpy(
     rec_sets: List[Set[str]], 
     models_used: List[str], 
     highlight_indices: List[int] = None,
-    color_scheme: ColorScheme = ColorScheme.VIRIDIS
+    color_scheme: ColorScheme = ColorScheme.VIRIDIS,
+    analysis: Optional[SimilarityResult] = None
 ) -> str:
     """
     Display recommendation sets as a distance matrix
@@ -496,18 +688,13 @@ def display_rec_matrix_numpy(
     Args:
         rec_sets: List of recommendation sets (each set contains SKUs)
         models_used: List of model names corresponding to each rec_set
-        highlight_indices: Indices to highlight in the matrix
+        highlight_indices: Indices to highlight in the matrix, defaults to analysis.selected
         color_scheme: Color scheme for output formatting
+        analysis: Result of analyze_similar_sets for rec_sets, its matrix is reused instead of recomputed
         
     Returns:
         Formatted string representation of the distance matrix
     """
-    try:
-        import numpy as np
-    except ImportError:
-        # Fallback to optimized version if NumPy not available
-        return display_rec_matrix(rec_sets, models_used, highlight_indices, color_scheme)
-    
     n = len(rec_sets)
     if n == 0:
         return "No recommendation sets provided"
@@ -516,38 +703,26 @@ def display_rec_matrix_numpy(
         return f"Error: rec_sets length ({n}) != models_used length ({len(models_used)})"
     
     colors = ColorPalette.SCHEMES[color_scheme]
+    if highlight_indices is None and analysis is not None:
+        highlight_indices = analysis.selected
     highlight_set = set(highlight_indices) if highlight_indices else set()
     
-    # Convert sets to binary matrices for vectorized operations
-    all_skus = sorted(set().union(*rec_sets))
-    if not all_skus:
+    unique_skus = len(set().union(*rec_sets))
+    if not unique_skus:
         return "No SKUs found in recommendation sets"
     
-    sku_to_idx = {sku: i for i, sku in enumerate(all_skus)}
-    
-    # Create binary matrix: rows = sets, cols = SKUs
-    binary_matrix = np.zeros((n, len(all_skus)), dtype=bool)
-    for i, rec_set in enumerate(rec_sets):
-        for sku in rec_set:
-            if sku in sku_to_idx:  # Safety check
-                binary_matrix[i, sku_to_idx[sku]] = True
-    
-    # Vectorized Jaccard distance calculation
-    # intersection[i,j] = number of SKUs in both set i and set j
-    intersection = np.dot(binary_matrix, binary_matrix.T)
-    
-    # union[i,j] = number of SKUs in either set i or set j
-    set_sizes = binary_matrix.sum(axis=1)
+    # Reuse the counts from the selection, only compute them when rendering on its own
+    if analysis is not None and analysis.has_matrix:
+        intersection, set_sizes = analysis.intersection, analysis.sizes
+    else:
+        intersection, set_sizes = _intersection_matrix(rec_sets)
     union = set_sizes[:, None] + set_sizes[None, :] - intersection
-    
-    # Calculate Jaccard similarity, avoiding division by zero
-    jaccard_sim = np.where(union > 0, intersection / union, 0)
-    distance_matrix = 1 - jaccard_sim
+    distance_matrix = 1 - _similarity_from_counts(intersection, set_sizes)
     
     # Initialize output
     output = []
     output.append(f"\nDistance Matrix: {n} sets")
-    output.append(f"Total unique SKUs: {len(all_skus)}")
+    output.append(f"Total unique SKUs: {unique_skus}")
     output.append("")
     
     # Generate header
@@ -717,12 +892,9 @@ def display_rec_matrix_numpy(
     output.append("-" * 80)
     
     # Calculate overall statistics
-    all_distances = []
-    for i in range(n):
-        for j in range(i + 1, n):
-            all_distances.append(distance_matrix[i, j])
+    all_distances = distance_matrix[np.triu_indices(n, k=1)]
     
-    if all_distances:
+    if len(all_distances):
         avg_distance = np.mean(all_distances)
         min_distance = np.min(all_distances)
         max_distance = np.max(all_distances)
@@ -0,0 +1,103 @@
+import zlib
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Set
+
+# largest prime below 2^32, keeps a * x within uint64
+HASH_PRIME = np.uint64(4294967291)
+EMPTY_SIGNATURE = np.iinfo(np.uint64).max
+
+
+@dataclass
+class EncodedSets:
+    """
+    Sets of skus as integer ids, shared by MinHash and exact pair similarity.
+
+    ids: len(sets) x max set size matrix of vocab ids, -1 pads shorter sets
+    sizes: number of skus per set
+    vocab: sku per id
+    """
+    ids: np.ndarray
+    sizes: np.ndarray
+    vocab: List[str]
+
+
+def encode_sets(rec_sets: List[Set[str]]) -> EncodedSets:
+    n = len(rec_sets)
+    sizes = np.fromiter((len(s) for s in rec_sets), dtype=np.int64, count=n)
+    width = int(sizes.max()) if n else 0
+    vocab = {}
+    ids = np.full((n, max(width, 1)), -1, dtype=np.int64)
+    for row, rec_set in enumerate(rec_sets):
+        ids[row, :len(rec_set)] = [vocab.setdefault(sku, len(vocab)) for sku in rec_set]
+    return EncodedSets(ids=ids, sizes=sizes, vocab=list(vocab))
+
+
+def minhash_signatures(encoded: EncodedSets, num_perm: int = 64, seed: int = 1) -> np.ndarray:
+    """
+    MinHash signature per set, the minimum of num_perm universal hashes over its skus.
+    The fraction of equal rows between two signatures estimates their Jaccard similarity.
+    Empty sets get a signature of max values and never collide with a non empty set.
+
+    Args:
+        encoded: Sets from encode_sets
+        num_perm: Number of hash functions (signature length)
+        seed: Seed for the hash function coefficients, sketches are only comparable with the same seed
+    Returns:
+        len(sets) x num_perm uint64 matrix
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(HASH_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(HASH_PRIME), size=num_perm, dtype=np.uint64)
+
+    # crc32 is stable across processes unlike hash() on str
+    values = np.fromiter((zlib.crc32(sku.encode("utf-8")) for sku in encoded.vocab),
+                         dtype=np.uint64, count=len(encoded.vocab)) % HASH_PRIME
+    # (a * x + b) mod p with a, x < p < 2^32 so the product fits in uint64
+    hashed = ((values[:, None] * a[None, :]) % HASH_PRIME + b[None, :]) % HASH_PRIME
+    # padding gathers a row of max values so it never wins the minimum
+    hashed = np.vstack((hashed, np.full((1, num_perm), EMPTY_SIGNATURE, dtype=np.uint64)))
+    return hashed[encoded.ids].min(axis=1)
+
+
+def lsh_candidate_pairs(signatures: np.ndarray, bands: int = 8) -> np.ndarray:
+    """
+    Pairs of rows that share at least one identical band of their signatures.
+    More bands (fewer rows per band) finds pairs of lower similarity at the cost
+    of more candidates, the similarity where a pair becomes likely is about (1 / bands) ** (1 / rows).
+
+    Args:
+        signatures: Matrix from minhash_signatures
+        bands: Number of bands, must divide the signature length
+    Returns:
+        k x 2 int64 array of candidate pairs (i < j) sorted by i then j
+    """
+    n, num_perm = signatures.shape
+    if bands < 1 or num_perm % bands != 0:
+        raise ValueError(f"bands ({bands}) must divide the signature length ({num_perm})")
+    rows = num_perm // bands
+    non_empty = signatures[:, 0] != EMPTY_SIGNATURE
+
+    # random odd multipliers fold each band into one key, collisions between distinct bands are negligible
+    rng = np.random.default_rng(rows)
+    multipliers = rng.integers(1, 1 << 63, size=rows, dtype=np.uint64) | np.uint64(1)
+    codes = []
+    for band in range(bands):
+        block = signatures[:, band * rows:(band + 1) * rows]
+        keys = (block * multipliers).sum(axis=1, dtype=np.uint64)
+        order = np.argsort(keys, kind="stable")
+        order = order[non_empty[order]]
+        starts = np.flatnonzero(np.diff(keys[order])) + 1
+        bounds = np.concatenate(([0], starts, [len(order)]))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end - start < 2:
+                continue
+            members = order[start:end]
+            i, j = np.triu_indices(len(members), k=1)
+            # members are ascending (stable sort of row order) so members[i] < members[j]
+            codes.append(members[i] * n + members[j])
+
+    if not codes:
+        return np.empty((0, 2), dtype=np.int64)
+    codes = np.unique(np.concatenate(codes))
+    return np.stack((codes // n, codes % n), axis=1).astype(np.int64)
@@ -0,0 +1,86 @@
+import json
+import json_repair
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+from bitrecs.protocol import BitrecsRequest
+
+
+@dataclass
+class ParsedResponse:
+    """
+    Miner results decoded once and shared by schema validation, reward, consensus and the API.
+
+    items: decoded result per position, None if the item could not be parsed into an object
+    skus: sku per position as returned by the miner, None if missing or not a string
+    errors: parse errors, empty when every item decoded into an object
+    repaired: number of items that were not strict JSON and needed json_repair
+    """
+    items: List[Optional[dict]] = field(default_factory=list)
+    skus: List[Optional[str]] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    repaired: int = 0
+
+    @property
+    def is_valid(self) -> bool:
+        return len(self.errors) == 0
+
+    @property
+    def is_strict(self) -> bool:
+        """ True if every item was valid JSON without repair """
+        return self.is_valid and self.repaired == 0
+
+    @property
+    def sku_set(self) -> Set[str]:
+        return {sku for sku in self.skus if sku is not None}
+
+    @property
+    def normalized_skus(self) -> List[Optional[str]]:
+        return [sku.lower().strip() if sku is not None else None for sku in self.skus]
+
+
+def parse_result_item(item) -> tuple:
+    """
+    Decode a single result, strict json first then json_repair.
+    Returns (decoded, repaired)
+    """
+    if isinstance(item, dict):
+        return item, False
+    if not isinstance(item, str):
+        raise ValueError(f"Invalid item type in results: {type(item).__name__}")
+    try:
+        return json.loads(item), False
+    except json.JSONDecodeError:
+        return json_repair.loads(item), True
+
+
+def parse_results(results: list) -> ParsedResponse:
+    parsed = ParsedResponse()
+    for i, item in enumerate(results or []):
+        try:
+            decoded, repaired = parse_result_item(item)
+            parsed.repaired += int(repaired)
+            if not isinstance(decoded, dict):
+                raise ValueError(f"result is {type(decoded).__name__} not an object")
+        except Exception as e:
+            parsed.items.append(None)
+            parsed.skus.append(None)
+            parsed.errors.append(f"item {i}: {e}")
+            continue
+        sku = decoded.get("sku")
+        parsed.items.append(decoded)
+        parsed.skus.append(sku if isinstance(sku, str) else None)
+    return parsed
+
+
+def get_parsed_response(response: BitrecsRequest) -> ParsedResponse:
+    """
+    Parsed results for a response, decoded on first use and cached on the synapse.
+    The cache is dropped if the results list is replaced or resized.
+    """
+    results = response.results or []
+    cached = response._parsed
+    if cached is not None and cached[0] is results and cached[1] == len(results):
+        return cached[2]
+    parsed = parse_results(results)
+    response._parsed = (results, len(results), parsed)
+    return parsed
@@ -1,9 +1,14 @@
 
+import time
 import socket
+import asyncio
 import bittensor as bt
 import numpy as np
 import random
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from bitrecs.utils import constants as CONST
+
+_ping_cache: Dict[Tuple[int, str, int], Tuple[float, Optional[float]]] = {}
 
 
 def check_uid_availability(
@@ -104,6 +109,49 @@ def get_random_miner_uids2(self,
 
 
 
+def get_weighted_miner_uids(uids: List[int], k: int, scores: np.ndarray, validity: np.ndarray,
+                            latencies: List[float], exploration: float = 0.2) -> List[int]:
+    """
+    Sample k miners from uids for a single request.
+    Most slots are drawn without replacement weighted by score EMA, recent validity and
+    latency, the exploration share is drawn uniformly from the rest so every miner keeps
+    getting evaluated.
+    Args:
+        uids: candidate miner uids
+        k: fan-out size, all uids are returned when k <= 0 or k >= len(uids)
+        scores: moving average scores indexed by uid
+        validity: recent share of valid responses indexed by uid
+        latencies: typical response time in seconds, aligned with uids
+        exploration: fraction of k drawn uniformly
+    Returns:
+        List of sampled uids
+    """
+    if k <= 0 or k >= len(uids):
+        return list(uids)
+
+    n_explore = min(k, int(np.ceil(k * max(0.0, min(1.0, exploration)))))
+    n_weighted = k - n_explore
+    candidates = np.asarray(uids, dtype=int)
+
+    score = np.nan_to_num(np.asarray(scores, dtype=np.float64)[candidates], nan=0.0)
+    max_score = score.max()
+    if max_score > 0:
+        score = score / max_score
+    valid = np.clip(np.asarray(validity, dtype=np.float64)[candidates], 0.0, 1.0)
+    speed = 1.0 / (1.0 + np.asarray(latencies, dtype=np.float64))
+    weights = (score + 0.01) * (valid + 0.01) * speed
+    
+    rng = np.random.default_rng()
+    chosen = np.array([], dtype=int)
+    if n_weighted > 0:
+        chosen = rng.choice(len(candidates), size=n_weighted, replace=False, p=weights / weights.sum())
+    rest = np.setdiff1d(np.arange(len(candidates)), chosen)
+    explored = rng.choice(rest, size=n_explore, replace=False)
+    selected = candidates[np.concatenate([chosen, explored]).astype(int)]
+    return selected.astype(int).tolist()
+
+
+
 def best_uid(metagraph: bt.metagraph) -> int:
     """Returns the best performing UID in the metagraph."""
     return max(range(metagraph.n), key=lambda uid: metagraph.I[uid].item()) 
@@ -138,4 +186,59 @@ def ping_miner_uid(self, uid, port=8091, timeout=5) -> bool:
 
     finally:        
         if 'sock' in locals():
-            sock.close()
\ No newline at end of file
+            sock.close()
+
+
+async def ping_miner_address(uid: int, ip: str, port: int = 8091, timeout: float = 3) -> Optional[float]:
+    """
+    Open a TCP connection to a miner axon without blocking the event loop.
+    Returns the connect latency in seconds, None if the miner is unreachable.
+    """
+    st = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout=timeout)
+    except ConnectionRefusedError:
+        bt.logging.warning(f"Port {port} on for UID {uid} is not connected.")
+        return None
+    except asyncio.TimeoutError:
+        bt.logging.warning(f"Timeout on Port {port} for UID {uid}.")
+        return None
+    except Exception as e:
+        bt.logging.error(f"An error occurred: {e}")
+        return None
+    latency = time.perf_counter() - st
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except Exception:
+        pass
+    return latency
+
+
+async def ping_miner_uids(self, uids: List[int], port: int = 8091, timeout: float = 3,
+                          max_concurrency: int = CONST.PING_MAX_CONCURRENCY,
+                          ttl: float = CONST.PING_CACHE_TTL) -> Dict[int, Optional[float]]:
+    """
+    Check many miner UIDs concurrently, at most max_concurrency connections at a time.
+    Results are cached per uid/ip/port for ttl seconds.
+    Returns a dict of uid to connect latency in seconds, None for unreachable miners.
+    """
+    ignored = ["localhost", "127.0.0.1", "0.0.0.0"]
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def probe(uid: int) -> Tuple[int, Optional[float]]:
+        ip = self.metagraph.axons[uid].ip
+        if ip in ignored:
+            bt.logging.trace("Ignoring localhost ping.")
+            return uid, None
+        key = (uid, ip, port)
+        cached = _ping_cache.get(key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return uid, cached[1]
+        async with semaphore:
+            latency = await ping_miner_address(uid, ip, port, timeout)
+        _ping_cache[key] = (time.monotonic(), latency)
+        return uid, latency
+
+    results = await asyncio.gather(*[probe(uid) for uid in uids])
+    return dict(results)
@@ -0,0 +1,72 @@
+import threading
+import bitrecs.utils.constants as CONST
+from collections import OrderedDict
+from typing import Dict
+from bitrecs.protocol import BitrecsRequest
+
+
+class CatalogRefTracker:
+    """
+    Catalog hashes each miner hotkey acknowledged holding, for catalog reference mode.
+    Miners that echo the hash of a catalog they were sent are only sent the hash next time,
+    a miner that reports the catalog missing is forgotten and gets it in full again.
+    Keeps the most recent hashes per hotkey, all access is under a lock.
+    """
+
+    def __init__(self, per_miner: int = CONST.CATALOG_REFS_PER_MINER):
+        self.per_miner = per_miner
+        self.held: Dict[str, OrderedDict] = {}
+        self._lock = threading.Lock()
+        self.refs_sent = 0
+        self.full_sent = 0
+        self.missing = 0
+        self.bytes_saved = 0
+
+    def has(self, hotkey: str, digest: str) -> bool:
+        with self._lock:
+            return digest in self.held.get(hotkey, ())
+
+    def remember(self, hotkey: str, digest: str):
+        with self._lock:
+            hashes = self.held.setdefault(hotkey, OrderedDict())
+            hashes[digest] = True
+            hashes.move_to_end(digest)
+            while len(hashes) > self.per_miner:
+                hashes.popitem(last=False)
+
+    def forget(self, hotkey: str, digest: str):
+        with self._lock:
+            self.held.get(hotkey, {}).pop(digest, None)
+
+    def record(self, hotkey: str, digest: str, response: BitrecsRequest, by_ref: bool, context_bytes: int):
+        """ Update what the miner holds from its response to a reference or full request """
+        with self._lock:
+            if by_ref:
+                self.refs_sent += 1
+                if response.catalog_missing:
+                    self.missing += 1
+                else:
+                    self.bytes_saved += context_bytes
+            else:
+                self.full_sent += 1
+        if response.catalog_missing:
+            self.forget(hotkey, digest)
+        elif response.is_success and response.context_hash == digest:
+            self.remember(hotkey, digest)
+
+    def prune(self, hotkeys):
+        """ Drop hotkeys no longer in the metagraph """
+        keep = set(hotkeys)
+        with self._lock:
+            for hotkey in [h for h in self.held if h not in keep]:
+                del self.held[hotkey]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "miners": len(self.held),
+                "refs_sent": self.refs_sent,
+                "full_sent": self.full_sent,
+                "missing": self.missing,
+                "bytes_saved": self.bytes_saved
+            }
@@ -0,0 +1,51 @@
+import threading
+from typing import Dict, Optional
+from bitrecs.protocol import BitrecsRequest
+from bitrecs.utils.compression import negotiate
+
+
+class MinerCodecTracker:
+    """
+    Codecs each miner hotkey advertised in its last successful response, used to pick
+    the compression of the context sent to it. Miners that never advertised codecs get
+    plain json. Also counts context bytes before and after compression.
+    """
+
+    def __init__(self):
+        self.accepted: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.plain_bytes = 0
+        self.wire_bytes = 0
+
+    def codec_for(self, hotkey: str, preferred: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            accepted = self.accepted.get(hotkey)
+        return negotiate(accepted, preferred)
+
+    def record(self, hotkey: str, response: BitrecsRequest, plain_bytes: int, wire_bytes: int):
+        with self._lock:
+            self.plain_bytes += plain_bytes
+            self.wire_bytes += wire_bytes
+            if wire_bytes != plain_bytes:
+                self.compressed += 1
+            if response.is_success:
+                # a miner that stops advertising codecs goes back to plain json
+                self.accepted[hotkey] = list(response.accept_codecs or [])
+
+    def prune(self, hotkeys):
+        """ Drop hotkeys no longer in the metagraph """
+        keep = set(hotkeys)
+        with self._lock:
+            for hotkey in [h for h in self.accepted if h not in keep]:
+                del self.accepted[hotkey]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "miners": sum(1 for codecs in self.accepted.values() if codecs),
+                "compressed": self.compressed,
+                "plain_bytes": self.plain_bytes,
+                "wire_bytes": self.wire_bytes,
+                "ratio": round(self.wire_bytes / self.plain_bytes, 4) if self.plain_bytes else 1.0
+            }
@@ -0,0 +1,127 @@
+import threading
+import numpy as np
+import bittensor as bt
+from collections import deque
+from typing import Dict, List, Optional
+from bitrecs.protocol import BitrecsRequest
+
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 3.0, 4.0, 5.0)
+
+
+class MinerLatencyTracker:
+    """
+    Rolling window of observed dendrite response times per miner uid.
+    Timeouts and failures are recorded as the timeout they were given so slow
+    miners rank behind responsive ones, and are flagged as misses so a miner that keeps
+    timing out cannot meet any deadline. Samples are reset when a uid changes hotkey.
+    Reads may come from the API thread so access is guarded by a lock.
+    """
+
+    def __init__(self, window: int = 100, min_samples: int = 5):
+        self.window = window
+        self.min_samples = min_samples
+        self.samples: Dict[int, deque] = {}
+        self.misses: Dict[int, deque] = {}
+        self.hotkeys: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def record(self, uid: int, seconds: float, hotkey: Optional[str] = None, missed: bool = False):
+        if seconds is None or seconds < 0:
+            return
+        with self._lock:
+            if hotkey is not None and self.hotkeys.get(uid) != hotkey:
+                self.hotkeys[uid] = hotkey
+                self.samples.pop(uid, None)
+                self.misses.pop(uid, None)
+            if uid not in self.samples:
+                self.samples[uid] = deque(maxlen=self.window)
+                self.misses[uid] = deque(maxlen=self.window)
+            self.samples[uid].append(float(seconds))
+            self.misses[uid].append(bool(missed))
+
+    def record_responses(self, uids: List[int], responses: List[BitrecsRequest],
+                         timeout: float, hotkeys: Optional[List[str]] = None):
+        for i, (uid, response) in enumerate(zip(uids, responses)):
+            hotkey = hotkeys[i] if hotkeys else None
+            given = response.timeout or timeout
+            if response.is_success:
+                self.record(uid, get_process_time(response, given), hotkey)
+            else:
+                self.record(uid, given, hotkey, missed=True)
+
+    def _snapshot(self, uid: int, misses_as_inf: bool = False) -> Optional[np.ndarray]:
+        with self._lock:
+            samples = self.samples.get(uid)
+            if not samples:
+                return None
+            values = np.fromiter(samples, dtype=np.float64, count=len(samples))
+            if misses_as_inf:
+                missed = np.fromiter(self.misses[uid], dtype=bool, count=len(samples))
+                values[missed] = np.inf
+            return values
+
+    def percentile(self, uid: int, q: float, default: Optional[float] = None) -> Optional[float]:
+        """ q in [0, 1], returns default when nothing has been recorded for the miner """
+        samples = self._snapshot(uid)
+        if samples is None:
+            return default
+        return float(np.percentile(samples, q * 100))
+
+    def rank(self, uids: List[int], q: float = 0.5) -> List[int]:
+        """ Order uids fastest first by latency percentile, unseen miners go last """
+        unseen = float("inf")
+        return sorted(uids, key=lambda uid: self.percentile(uid, q, default=unseen))
+
+    def has_history(self, uid: int) -> bool:
+        with self._lock:
+            return len(self.samples.get(uid, ())) >= self.min_samples
+
+    def can_meet(self, uid: int, deadline: float, q: float = 0.95) -> bool:
+        """
+        False only when the miner has enough history and its percentile misses the deadline.
+        Misses count as slower than any deadline, so a miner failing more than 1 - q of its
+        requests is too slow whatever timeout it was given.
+        """
+        if not self.has_history(uid):
+            return True
+        samples = self._snapshot(uid, misses_as_inf=True)
+        return float(np.percentile(samples, q * 100, method="inverted_cdf")) <= deadline
+
+    def timeout_for(self, uid: int, max_timeout: float, min_timeout: float = 1.0,
+                    headroom: float = 1.5, q: float = 0.95) -> float:
+        """ Per miner dendrite timeout from its latency percentile, max_timeout until there is history """
+        if not self.has_history(uid):
+            return max_timeout
+        timeout = self.percentile(uid, q) * headroom
+        return float(min(max_timeout, max(min_timeout, timeout)))
+
+    def histogram(self, uid: int) -> Optional[dict]:
+        samples = self._snapshot(uid)
+        if samples is None:
+            return None
+        bucket_index = np.searchsorted(LATENCY_BUCKETS, samples, side="left")
+        counts = np.bincount(bucket_index, minlength=len(LATENCY_BUCKETS) + 1)
+        labels = [f"<={b}" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}"]
+        return {
+            "hotkey": self.hotkeys.get(uid),
+            "count": int(len(samples)),
+            "p50": round(float(np.percentile(samples, 50)), 4),
+            "p95": round(float(np.percentile(samples, 95)), 4),
+            "buckets": {label: int(c) for label, c in zip(labels, counts)}
+        }
+
+    def to_dict(self) -> Dict[int, dict]:
+        with self._lock:
+            uids = list(self.samples.keys())
+        return {uid: h for uid in sorted(uids) if (h := self.histogram(uid)) is not None}
+
+
+def get_process_time(response: BitrecsRequest, default: float) -> float:
+    try:
+        process_time = response.dendrite.process_time
+        if process_time is None:
+            return default
+        return float(process_time)
+    except (TypeError, ValueError) as e:
+        bt.logging.trace(f"Invalid process_time from miner {response.miner_uid}: {e}")
+        return default
@@ -22,12 +22,14 @@ import traceback
 import numpy as np
 import bittensor as bt
 import jsonschema
-import json_repair
-from typing import List
-from bitrecs.commerce.user_action import UserAction, ActionType
+from typing import List, Optional, Union
+from bitrecs.commerce.user_action import UserAction, UserActionIndex, ActionType
 from bitrecs.protocol import BitrecsRequest
 from bitrecs.commerce.product import Product, ProductFactory
+from bitrecs.commerce.catalog import Catalog
+from bitrecs.commerce.catalog_cache import catalog_cache
 from bitrecs.utils import constants as CONST
+from bitrecs.utils.parsing import ParsedResponse, get_parsed_response, parse_results
 
 BASE_BOOST = 1/256
 BASE_REWARD = 0.80
@@ -40,9 +42,28 @@ ACTION_WEIGHTS = {
     ActionType.PURCHASE.value: 0.85,
 }
 
+RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "sku": {"type": "string"},
+        "name": {"type": "string"},
+        "price": {"type": ["string", "number"]},
+        "reason": {"type": "string"}
+    },
+    "required": ["sku", "name", "price", "reason"],
+}
+
+RESULT_VALIDATOR = jsonschema.Draft7Validator(RESULT_SCHEMA)
+
 class CatalogValidator:
-    def __init__(self, store_catalog: List[Product]):
-        self.sku_set = {product.sku.lower().strip() for product in store_catalog}
+    def __init__(self, store_catalog: Union[List[Product], Catalog], sku_set: Optional[frozenset] = None):
+        if sku_set is None:
+            if isinstance(store_catalog, Catalog):
+                # the catalog index is keyed by the normalized sku
+                sku_set = store_catalog
+            else:
+                sku_set = {product.sku.lower().strip() for product in store_catalog}
+        self.sku_set = sku_set
     
     def validate_sku(self, sku: str) -> bool:
         if not sku:
@@ -54,70 +75,82 @@ def validate_result_schema(num_recs: int, results: list) -> bool:
     """
     Ensure results from Miner match the required schema
     """
+    return validate_parsed_schema(num_recs, parse_results(results))
+
+
+def validate_parsed_schema(num_recs: int, parsed: ParsedResponse) -> bool:
+    """
+    Ensure already decoded results from Miner match the required schema
+    """
     if num_recs < 1 or num_recs > CONST.MAX_RECS_PER_REQUEST:
         return False
-    if len(results) != num_recs:
+    if len(parsed.items) != num_recs:
         bt.logging.error("Error validate_result_schema num_recs mismatch")
         return False
+    if not parsed.is_valid:
+        bt.logging.trace(f"JSON JSONDecodeError ERROR: {parsed.errors[0]}")
+        return False
     
-    schema = {
-        "type": "object",
-        "properties": {
-            "sku": {"type": "string"},
-            "name": {"type": "string"},
-            "price": {"type": ["string", "number"]},
-            "reason": {"type": "string"}
-        },
-        "required": ["sku", "name", "price", "reason"],
-    }
-
-    count = 0
-    for item in results:
-        try:            
-            #thing = json.loads(item)
-            thing = json_repair.loads(item)
-            jsonschema.validate(thing, schema)           
-            count += 1
-        except json.decoder.JSONDecodeError as e:            
-            bt.logging.trace(f"JSON JSONDecodeError ERROR: {e}")
-            break
-        except jsonschema.exceptions.ValidationError as e:            
-            bt.logging.trace(f"JSON ValidationError ERROR: {e}")
-            break
-        except Exception as e:            
-            bt.logging.trace(f"JSON Exception ERROR: {e}")
-            break
-
-    return count == len(results)
-
-
-def calculate_miner_boost(hotkey: str, actions: List[UserAction]) -> float:
+    for thing in parsed.items:
+        if not validate_result_item(thing):
+            return False
+    return True
+
+
+def validate_result_item(thing) -> bool:
+    """
+    Check a decoded result against RESULT_SCHEMA.
+    Plain field/type checks cover the schema, the compiled validator only runs to report why an item failed.
+    """
+    if (isinstance(thing, dict)
+        and type(thing.get("sku")) is str
+        and type(thing.get("name")) is str
+        and type(thing.get("reason")) is str
+        and _is_price(thing.get("price"))):
+        return True
+    try:
+        RESULT_VALIDATOR.validate(thing)
+    except jsonschema.exceptions.ValidationError as e:
+        bt.logging.trace(f"JSON ValidationError ERROR: {e.message}")
+        return False
+    except Exception as e:
+        bt.logging.trace(f"JSON Exception ERROR: {e}")
+        return False
+    return True
+
+
+def _is_price(price) -> bool:
+    if isinstance(price, bool):
+        return False
+    return isinstance(price, (str, int, float))
+
+
+def calculate_miner_boost(hotkey: str, actions: Union[UserActionIndex, List[UserAction]]) -> float:
     """
     Reward miners who generate positive actions on ecommerce sites
+    actions is normally the UserActionIndex built by action_sync, a raw list is indexed on the fly
 
     """
     try:
         if not actions or len(actions) == 0:
             return 0.0
 
-        miner_actions = [a for a in actions if a["hot_key"].lower() == hotkey.lower()]
-        if len(miner_actions) == 0:
+        index = actions if isinstance(actions, UserActionIndex) else UserActionIndex.build(actions)
+        counts = index.get(hotkey)
+        if counts.actions == 0:
             bt.logging.trace(f"Miner {hotkey} has no actions")
             return 0.0
 
-        views = [v for v in miner_actions if v["action"] == ActionType.VIEW_PRODUCT.name]
-        add_to_carts = [a for a in miner_actions if a["action"] == ActionType.ADD_TO_CART.name]
-        purchases = [p for p in miner_actions if p["action"] == ActionType.PURCHASE.name]        
-
-        if len(views) == 0 and len(add_to_carts) == 0 and len(purchases) == 0:
+        views, add_to_carts, purchases = counts.views, counts.add_to_carts, counts.purchases
+        if views == 0 and add_to_carts == 0 and purchases == 0:
             bt.logging.trace(f"Miner {hotkey} has no parsed actions - skipping boost")
             return 0.0
         
-        vf = ACTION_WEIGHTS[ActionType.VIEW_PRODUCT.value] * len(views)
-        af = ACTION_WEIGHTS[ActionType.ADD_TO_CART.value] * len(add_to_carts)
-        pf = ACTION_WEIGHTS[ActionType.PURCHASE.value] * len(purchases)
+        vf = ACTION_WEIGHTS[ActionType.VIEW_PRODUCT.value] * views
+        af = ACTION_WEIGHTS[ActionType.ADD_TO_CART.value] * add_to_carts
+        pf = ACTION_WEIGHTS[ActionType.PURCHASE.value] * purchases
         total_boost = vf + af + pf
-        bt.logging.trace(f"Miner {hotkey} total_boost: {total_boost} from views: ({len(views)}) add_to_carts: ({len(add_to_carts)}) purchases: ({len(purchases)})")
+        bt.logging.trace(f"Miner {hotkey} total_boost: {total_boost} from views: ({views}) add_to_carts: ({add_to_carts}) purchases: ({purchases})")
 
         # miner has no actions this round
         if total_boost == 0:
@@ -134,68 +167,91 @@ def calculate_miner_boost(hotkey: str, actions: List[UserAction]) -> float:
         return 0.0
 
 
-def reward(
-    num_recs: int, 
-    catalog_validator: CatalogValidator, 
-    response: BitrecsRequest,
-    actions: List[UserAction]
-) -> float:
+def validate_response(
+    num_recs: int,
+    catalog_validator: CatalogValidator,
+    response: BitrecsRequest
+) -> bool:
     """
-    Score the Miner's response to the BitrecsRequest 
+    Cheap validity checks for a single miner response, used by reward() and
+    to evaluate responses incrementally as they arrive.
 
-    Nubmer of recommendations should match the requested number of recommendations
-    Recommendations must exist in the original catalog
-    Unique recommendations in the response is expected
-    Malformed JSON or invliad skus will result in a 0.0 reward
-    Miner rewards are boosted based on end-user actions on the ecommerce sites to encourage positive recs
+    Response must be successful, match the requested number of recommendations,
+    pass schema validation and only contain unique skus from the catalog (excluding the query)
 
     Returns:
-    - float: The reward value for the miner.
-    """    
-    
-    bt.logging.trace("*************** VALIDATOR REWARD *****************")
-    
+    - bool: True if the response is valid
+    """
     try:
-        score = 0.0
         if response.is_timeout:
             bt.logging.error(f"Miner {response.miner_uid} is_timeout is True, status: {response.dendrite.status_code}")
-            return 0.0
+            return False
         if response.is_failure:            
             bt.logging.error(f"Miner {response.miner_uid} is_failure is True, status: {response.dendrite.status_code}")
-            return 0.0
+            return False
         if not response.is_success:
             bt.logging.error(f"Miner {response.miner_uid} is_success is False, status: {response.dendrite.status_code}")
-            return 0.0
+            return False
         if len(response.results) != num_recs:
             bt.logging.error(f"Miner {response.miner_uid} num_recs mismatch, expected {num_recs} but got {len(response.results)}")
-            return 0.0
-        if not validate_result_schema(num_recs, response.results):
+            return False
+        parsed = get_parsed_response(response)
+        if not validate_parsed_schema(num_recs, parsed):
             bt.logging.error(f"Miner {response.miner_uid} failed schema validation: {response.miner_hotkey}")
-            return 0.0        
+            return False
         
         valid_items = set()
         query_lower = response.query.lower().strip()
-        for result in response.results:
+        for sku in parsed.skus:
             try:
-                product = json_repair.loads(result)
-                sku = product["sku"]
                 if sku.lower() == query_lower:
                     bt.logging.warning(f"Miner {response.miner_uid} has query in results: {response.miner_hotkey}")
-                    return 0.0
+                    return False
                 if sku in valid_items:
                     bt.logging.warning(f"Miner {response.miner_uid} has duplicate results: {response.miner_hotkey}")
-                    return 0.0
+                    return False
                 if not catalog_validator.validate_sku(sku):
                     bt.logging.warning(f"Miner {response.miner_uid} has invalid results: {response.miner_hotkey}")
-                    return 0.00
+                    return False
                 
                 valid_items.add(sku)
             except Exception as e:
                 bt.logging.error(f"JSON ERROR: {e}, miner data: {response.miner_hotkey}")
-                return 0.0
+                return False
 
         if len(valid_items) != num_recs:
             bt.logging.warning(f"Miner {response.miner_uid} invalid number of valid_items: {response.miner_hotkey}")
+            return False
+        return True
+    except Exception as e:
+        bt.logging.error(f"Error in validate_response: {e}, miner data: {response}")
+        return False
+
+
+def reward(
+    num_recs: int, 
+    catalog_validator: CatalogValidator, 
+    response: BitrecsRequest,
+    actions: Union[UserActionIndex, List[UserAction]]
+) -> float:
+    """
+    Score the Miner's response to the BitrecsRequest 
+
+    Nubmer of recommendations should match the requested number of recommendations
+    Recommendations must exist in the original catalog
+    Unique recommendations in the response is expected
+    Malformed JSON or invliad skus will result in a 0.0 reward
+    Miner rewards are boosted based on end-user actions on the ecommerce sites to encourage positive recs
+
+    Returns:
+    - float: The reward value for the miner.
+    """    
+    
+    bt.logging.trace("*************** VALIDATOR REWARD *****************")
+    
+    try:
+        score = 0.0
+        if not validate_response(num_recs, catalog_validator, response):
             return 0.0
 
         score = BASE_REWARD
@@ -231,11 +287,24 @@ def reward(
         return 0.0
 
 
+def get_catalog_validator(ground_truth: BitrecsRequest) -> Optional[CatalogValidator]:
+    """
+    Get the catalog of the ground truth request from the catalog cache as a CatalogValidator.
+    Returns None if the catalog size is out of bounds.
+    """
+    catalog = catalog_cache.get(ground_truth.context, ground_truth.site_key)
+    store_catalog : Catalog = catalog.products
+    if len(store_catalog) < CONST.MIN_CATALOG_SIZE or len(store_catalog) > CONST.MAX_CATALOG_SIZE:
+        bt.logging.error(f"Invalid catalog size: {len(store_catalog)}")
+        return None
+    return CatalogValidator(store_catalog)
+
+
 def get_rewards(
     num_recs: int,
     ground_truth: BitrecsRequest,
     responses: List[BitrecsRequest],
-    actions: List[UserAction] = None
+    actions: Union[UserActionIndex, List[UserAction]] = None
 ) -> np.ndarray:
     """
     Returns an array of rewards for the given query and responses.
@@ -244,7 +313,7 @@ def get_rewards(
     - num_recs (int): The number of results expected per miner response.
     - ground_truth (BitrecsRequest): The original ground truth which contains the catalog and query
     - responses (List[float]): A list of responses from the miners.
-    - actions (List[UserAction]): A list of user actions across all miners. 
+    - actions (UserActionIndex): User actions across all miners, aggregated per hotkey. 
 
     Returns:
     - np.ndarray: An array of rewards for the given query and responses.
@@ -254,11 +323,9 @@ def get_rewards(
         bt.logging.error(f"Invalid number of recommendations: {num_recs}")
         return np.zeros(len(responses), dtype=float)
     
-    store_catalog : list[Product] = ProductFactory.try_parse_context_strict(ground_truth.context)
-    if len(store_catalog) < CONST.MIN_CATALOG_SIZE or len(store_catalog) > CONST.MAX_CATALOG_SIZE:
-        bt.logging.error(f"Invalid catalog size: {len(store_catalog)}")
+    catalog_validator = get_catalog_validator(ground_truth)
+    if catalog_validator is None:
         return np.zeros(len(responses), dtype=float)
-    catalog_validator = CatalogValidator(store_catalog)
     
     if not actions or len(actions) == 0:
         bt.logging.warning(f"\033[1;33m WARNING - no actions found in get_rewards \033[0m")
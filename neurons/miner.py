@@ -29,6 +29,8 @@ from typing import List
 from datetime import datetime, timedelta, timezone
 from bitrecs.base.miner import BaseMinerNeuron
 from bitrecs.commerce.user_profile import UserProfile
+from bitrecs.commerce.catalog_cache import CatalogStore
+from bitrecs.utils.compression import SUPPORTED_CODECS, decode_text, encode_results, negotiate
 from bitrecs.protocol import BitrecsRequest
 from bitrecs.llms.prompt_factory import PromptFactory
 from bitrecs.llms.factory import LLM, LLMFactory
@@ -46,7 +48,10 @@ async def do_work(user_prompt: str,
                   model: str,
                   system_prompt="You are a helpful assistant.", 
                   profile : UserProfile = None,
-                  debug_prompts=False) -> List[str]:
+                  debug_prompts=False,
+                  max_candidates: int = 0,
+                  max_context_tokens: int = 0,
+                  prefix_cache: bool = False) -> List[str]:
     """
     Miner work is done here.
     This function is invoked by the API validator to generate recommendations.
@@ -62,6 +67,9 @@ async def do_work(user_prompt: str,
         system_prompt (str): The system prompt for the LLM.
         profile (UserProfile): The user profile to use when generating recommendations.
         debug_prompts (bool): Whether to log debug information about the prompts.
+        max_candidates (int): Products kept from the context by lexical retrieval before prompting, 0 sends the full context.
+        max_context_tokens (int): Token budget the context is packed into before prompting, 0 for no budget.
+        prefix_cache (bool): Whether to lay the prompt out with the catalog first so the LLM server can reuse its KV cache.
 
     Returns:
         typing.List[str]: A list of product recommendations generated by the miner.
@@ -76,13 +84,16 @@ async def do_work(user_prompt: str,
                             context=context, 
                             num_recs=num_recs,                                                         
                             debug=debug_prompts,
-                            profile=profile)
+                            profile=profile,
+                            max_candidates=max_candidates,
+                            max_context_tokens=max_context_tokens,
+                            prefix_cache=prefix_cache)
     prompt = factory.generate_prompt()
     try:
-        llm_response = LLMFactory.query_llm(server=server, 
-                                            model=model, 
-                                            system_prompt=system_prompt, 
-                                            temp=0.0, user_prompt=prompt)
+        llm_response = await LLMFactory.query_llm_async(server=server,
+                                                        model=model,
+                                                        system_prompt=system_prompt,
+                                                        temp=0.0, user_prompt=prompt)
         if not llm_response or len(llm_response) < 10:
             bt.logging.error("LLM response is empty.")
             return []
@@ -150,6 +161,8 @@ class Miner(BaseMinerNeuron):
             bt.logging.info(f"\033[1;32m 🐸 You are the BEST performing miner in the subnet, keep it up!\033[0m")
 
         self.total_request_in_interval = 0
+        # Catalogs sent by validators in catalog reference mode, keyed by catalog hash
+        self.catalog_store = CatalogStore()
         
         if(self.config.logging.trace):
             bt.logging.trace(f"TRACE ENABLED Miner {self.uid} - {self.llm_provider} - {self.model}")
@@ -180,20 +193,46 @@ class Miner(BaseMinerNeuron):
         debug_prompts = self.config.logging.trace
         user_profile = UserProfile.tryparse_profile(synapse.user)
 
-        try:
-            results = await do_work(user_prompt=query,
-                                    context=context, 
-                                    num_recs=num_recs, 
-                                    server=server, 
-                                    model=model, 
-                                    profile=user_profile,
-                                    debug_prompts=debug_prompts)            
-            bt.logging.info(f"LLM {self.model} - Results: count ({len(results)})")
-        except Exception as e:
-            bt.logging.error(f"\033[31mFATAL ERROR calling do_work: {e!r} \033[0m")
-        finally:
-            et = time.time()
-            bt.logging.info(f"{self.model} Query - Elapsed Time: \033[1;32m {et-st} \033[0m")
+        if synapse.codec and context:
+            try:
+                context = decode_text(context, synapse.codec)
+            except Exception as e:
+                bt.logging.error(f"Failed to decode {synapse.codec} context: {e}")
+                context = ""
+
+        # Catalog reference mode: keep the catalog when it is sent, look it up when only its hash is
+        context_hash = None
+        catalog_missing = False
+        if synapse.context_hash:
+            if context:
+                if self.catalog_store.put(synapse.context_hash, context):
+                    context_hash = synapse.context_hash
+            else:
+                context = self.catalog_store.get(synapse.context_hash)
+                if context is None:
+                    bt.logging.info(f"MINER {self.uid} catalog {synapse.context_hash} not held, requesting it")
+                    catalog_missing = True
+                else:
+                    context_hash = synapse.context_hash
+
+        if not catalog_missing:
+            try:
+                results = await do_work(user_prompt=query,
+                                        context=context, 
+                                        num_recs=num_recs, 
+                                        server=server, 
+                                        model=model, 
+                                        profile=user_profile,
+                                        debug_prompts=debug_prompts,
+                                        max_candidates=self.config.llm.candidates,
+                                        max_context_tokens=self.config.llm.context_tokens,
+                                        prefix_cache=self.config.llm.prefix_cache)            
+                bt.logging.info(f"LLM {self.model} - Results: count ({len(results)})")
+            except Exception as e:
+                bt.logging.error(f"\033[31mFATAL ERROR calling do_work: {e!r} \033[0m")
+            finally:
+                et = time.time()
+                bt.logging.info(f"{self.model} Query - Elapsed Time: \033[1;32m {et-st} \033[0m")
 
         utc_now = datetime.now(timezone.utc)
         created_at = utc_now.strftime("%Y-%m-%dT%H:%M:%S")
@@ -222,6 +261,9 @@ class Miner(BaseMinerNeuron):
             except Exception as e:
                 bt.logging.error(f"Failed to parse LLM result: {item}, error: {e}")
                 continue
+
+        # Compress results only for validators that advertise a codec we support
+        final_results, codec = encode_results(final_results, negotiate(synapse.accept_codecs))
         
         output_synapse=BitrecsRequest(
             name=synapse.name, 
@@ -236,7 +278,11 @@ class Miner(BaseMinerNeuron):
             results=final_results,
             models_used=[self.model],
             miner_uid=str(self.uid),
-            miner_hotkey=self.wallet.hotkey.ss58_address
+            miner_hotkey=self.wallet.hotkey.ss58_address,
+            context_hash=context_hash,
+            catalog_missing=catalog_missing,
+            accept_codecs=SUPPORTED_CODECS,
+            codec=codec
         )
         
         bt.logging.info(f"MINER {self.uid} FORWARD PASS RESULT -> {output_synapse}")
@@ -23,10 +23,10 @@ import bittensor as bt
 import asyncio
 from datetime import timedelta
 from bitrecs.base.validator import BaseValidatorNeuron
-from bitrecs.commerce.user_action import UserAction
+from bitrecs.commerce.user_action import UserAction, UserActionIndex
 from bitrecs.utils.r2 import ValidatorUploadRequest
 from bitrecs.utils.runtime import execute_periodically
-from bitrecs.utils.uids import get_random_miner_uids2, ping_miner_uid
+from bitrecs.utils.uids import get_random_miner_uids2, ping_miner_uids
 from bitrecs.utils.version import LocalMetadata
 from bitrecs.validator import forward
 from bitrecs.protocol import BitrecsRequest
@@ -111,7 +111,7 @@ class Validator(BaseValidatorNeuron):
             return
         
         chosen_uids = list(set(chosen_uids))
-        selected_miners = []
+        candidates = []
         for uid in chosen_uids:            
             bt.logging.trace(f"Checking uid: {uid} with stake {self.metagraph.S[uid]} and trust {self.metagraph.T[uid]}")
             if uid == self.uid:                
@@ -126,16 +126,19 @@ class Validator(BaseValidatorNeuron):
             if this_stake > stake_limit:
                 bt.logging.trace(f"uid: {uid} has stake {this_stake} > {stake_limit}, skipping")
                 continue
+            candidates.append(uid)
 
-            try:                
-                if ping_miner_uid(self, uid, 8091, 3):
-                    bt.logging.trace(f"\033[1;32m ping: {uid}:OK \033[0m")
-                    selected_miners.append(uid)
-                else:
-                    bt.logging.trace(f"\033[1;33m ping: {uid}:FALSE \033[0m")
-            except Exception as e:
-                bt.logging.trace(f"\033[1;33 {e} \033[0m")
+        st = time.perf_counter()
+        latencies = await ping_miner_uids(self, candidates, 8091, 3)
+        bt.logging.trace(f"Pinged {len(candidates)} miners in {time.perf_counter() - st:0.2f} seconds")
+        selected_miners = []
+        for uid, latency in latencies.items():
+            if latency is None:
+                bt.logging.trace(f"\033[1;33m ping: {uid}:FALSE \033[0m")
                 continue
+            bt.logging.trace(f"\033[1;32m ping: {uid}:OK {latency*1000:0.1f}ms \033[0m")
+            selected_miners.append(uid)
+        self.miner_ping_latency = {uid: latency for uid, latency in latencies.items() if latency is not None}
         if len(selected_miners) == 0:
             self.active_miners = []
             bt.logging.error("\033[31mNo active miners selected in round - check your connectivity \033[0m")
@@ -155,8 +158,11 @@ class Validator(BaseValidatorNeuron):
         sd, ed = UserAction.get_retro_range()
         bt.logging.trace(f"Gathering user actions for range: {sd} to {ed}")
         try:
-            self.user_actions = UserAction.get_actions_range(start_date=sd, end_date=ed)
-            bt.logging.trace(f"Success - User actions size: \033[1;32m {len(self.user_actions)} \033[0m")
+            user_actions = UserAction.get_actions_range(start_date=sd, end_date=ed)
+            # Build the aggregate off to the side, then swap both in so scoring never sees a partial index
+            index = UserActionIndex.build(user_actions, bucket_size=timedelta(days=1))
+            self.user_actions, self.user_action_index = user_actions, index
+            bt.logging.trace(f"Success - User actions size: \033[1;32m {len(self.user_actions)} \033[0m for {len(index.counts)} hotkeys")
         except Exception as e:
             bt.logging.error(f"Failed to get user actions with exception: {e}")
         return
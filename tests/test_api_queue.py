@@ -0,0 +1,96 @@
+import os
+os.environ["NEST_ASYNCIO"] = "0"
+import asyncio
+import threading
+from bitrecs.protocol import BitrecsRequest
+from bitrecs.base.validator import ApiRequestQueue, SynapseWithFuture
+
+
+def make_request(query: str) -> BitrecsRequest:
+    return BitrecsRequest(created_at="", user="", num_results=5, query=query,
+                          context="[]", site_key="site1", results=[], models_used=[],
+                          miner_uid="", miner_hotkey="")
+
+
+def start_consumer(queue: ApiRequestQueue, handled: list) -> tuple:
+    """ Run a validator style consumer loop in its own thread, like run_in_background_thread """
+    ready = threading.Event()
+    stop = threading.Event()
+
+    async def consume():
+        queue.bind(asyncio.get_running_loop())
+        ready.set()
+        while not stop.is_set():
+            item = await queue.get(timeout=0.05)
+            if item is None:
+                continue
+            handled.append(item.input_synapse.query)
+            output = item.input_synapse.model_copy()
+            output.results = [f"done-{item.input_synapse.query}"]
+            item.set_result(output)
+
+    thread = threading.Thread(target=lambda: asyncio.run(consume()), daemon=True)
+    thread.start()
+    ready.wait(5)
+    return thread, stop
+
+
+def test_queue_get_times_out_without_blocking():
+    queue = ApiRequestQueue()
+
+    async def run():
+        queue.bind(asyncio.get_running_loop())
+        ticks = 0
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.01)
+                ticks += 1
+        item, _ = await asyncio.gather(queue.get(timeout=0.2), ticker())
+        return item, ticks
+
+    item, ticks = asyncio.run(run())
+    assert item is None
+    assert ticks == 5
+
+
+def test_queue_round_trip_across_loops():
+    queue = ApiRequestQueue()
+    handled = []
+    thread, stop = start_consumer(queue, handled)
+
+    async def producer():
+        loop = asyncio.get_running_loop()
+        items = [SynapseWithFuture(input_synapse=make_request(f"SKU-{i}"),
+                                   future=loop.create_future(),
+                                   output_synapse=make_request("")) for i in range(20)]
+        for item in items:
+            queue.put(item)
+        return await asyncio.wait_for(asyncio.gather(*[i.future for i in items]), timeout=5)
+
+    results = asyncio.run(producer())
+    stop.set()
+    thread.join(5)
+    assert len(results) == 20
+    assert [r.results[0] for r in results] == [f"done-SKU-{i}" for i in range(20)]
+    assert handled == [f"SKU-{i}" for i in range(20)]
+
+
+def test_queue_buffers_items_before_bind():
+    queue = ApiRequestQueue()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        item = SynapseWithFuture(input_synapse=make_request("SKU-EARLY"),
+                                 future=loop.create_future(),
+                                 output_synapse=make_request(""))
+        queue.put(item)
+        assert queue.qsize() == 1
+        queue.bind(loop)
+        got = await queue.get(timeout=1)
+        got.set_result()
+        got.set_result() # second resolve is ignored
+        return await asyncio.wait_for(item.future, timeout=1)
+
+    result = asyncio.run(run())
+    assert result.query == ""
@@ -0,0 +1,163 @@
+import json
+import time
+import tracemalloc
+from dataclasses import asdict
+import bitrecs.utils.constants as CONST
+from bitrecs.commerce.catalog import Catalog, ingest_catalog
+from bitrecs.commerce.product import CatalogProvider, Product, ProductFactory, ShopifyConverter, WalmartConverter
+from bitrecs.validator.reward import CatalogValidator
+
+
+def load_products() -> list[Product]:
+    context = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/asos_30k_trimmed.csv")
+    return ProductFactory.try_parse_context_strict(context)
+
+
+def test_catalog_matches_products():
+    products = load_products()
+    catalog = Catalog.from_products(products)
+    assert len(catalog) == len(products)
+    assert list(catalog) == products
+    assert catalog[0] == products[0] and catalog[-1] == products[-1]
+    assert catalog.to_json() == json.dumps([asdict(p) for p in products], separators=(',', ':'))
+
+    validator = CatalogValidator(catalog)
+    legacy = CatalogValidator(products)
+    for product in products[:500]:
+        assert validator.validate_sku(product.sku)
+        assert validator.validate_sku(f"  {product.sku.upper()} ")
+        assert catalog.find(product.sku.lower().strip()) is not None
+    for sku in ["", "missing-sku", "NOT A SKU"]:
+        assert validator.validate_sku(sku) == legacy.validate_sku(sku)
+    assert 123 not in catalog
+
+
+def test_catalog_memory_and_json_benchmark():
+    products = load_products()
+    # rebuild the strings so both containers own their memory
+    rows = [(p.sku + " ")[:-1] for p in products], [(p.name + " ")[:-1] for p in products], [(p.price + " ")[:-1] for p in products]
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    as_products = [Product(sku=s, name=n, price=p) for s, n, p in zip(*rows)]
+    product_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    catalog = Catalog(*rows)
+    catalog_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    # product strings are shared with rows so count them for the product list
+    string_bytes = sum(len(s) + 49 for column in rows for s in column)
+    product_total = product_bytes + string_bytes
+    print(f"{len(products)} products: list[Product] ~{product_total / 1e6:.2f}MB "
+          f"Catalog {catalog_bytes / 1e6:.2f}MB ({product_total / catalog_bytes:.1f}x) nbytes={catalog.nbytes / 1e6:.2f}MB")
+    assert catalog_bytes * 2.5 < product_total
+
+    st = time.perf_counter()
+    legacy = json.dumps([asdict(p) for p in as_products], separators=(',', ':'))
+    legacy_time = time.perf_counter() - st
+    st = time.perf_counter()
+    columnar = catalog.to_json()
+    columnar_time = time.perf_counter() - st
+    print(f"canonical json asdict: {legacy_time * 1000:.1f}ms columnar: {columnar_time * 1000:.1f}ms")
+    assert columnar == legacy
+
+
+def test_ingest_catalog_single_pass():
+    context = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/asos_30k_trimmed.csv")
+
+    st = time.perf_counter()
+    products = ProductFactory.try_parse_context_strict(context)
+    dupes = ProductFactory.get_dupe_count(products)
+    seen = set()
+    deduped = [p for p in products if not (p.sku in seen or seen.add(p.sku))]
+    legacy = Catalog.from_products(deduped)
+    legacy_time = time.perf_counter() - st
+
+    st = time.perf_counter()
+    ingest = ingest_catalog(context)
+    ingest_time = time.perf_counter() - st
+    print(f"{ingest.total} products, {ingest.dupes} dupes: separate passes {legacy_time * 1000:.1f}ms "
+          f"single pass {ingest_time * 1000:.1f}ms")
+
+    assert ingest.error is None
+    assert ingest.total == len(products)
+    assert ingest.dupes == dupes
+    assert list(ingest.catalog) == deduped
+    assert ingest.catalog.to_json() == legacy.to_json()
+
+
+def test_ingest_catalog_rejections():
+    rows = [{"sku": f"sku-{i}", "name": f"product {i}", "price": "1"} for i in range(100)]
+    assert ingest_catalog(json.dumps(rows), max_size=50).error == "size"
+    dupes = ingest_catalog(json.dumps(rows + rows[:10]))
+    assert dupes.error == "dupes" and len(dupes.catalog) == 0
+    assert ingest_catalog("not json").error == "invalid"
+    ok = ingest_catalog(json.dumps(rows + rows[:5]))
+    assert ok.error is None and ok.dupes == 5 and len(ok.catalog) == 100
+
+
+def test_ingest_catalog_short_items_not_rejected_early():
+    # duplicates up front, then items shorter than the usual product row
+    head = [{"sku": "x", "name": "y"}] * 47
+    tail = [{"sku": i, "name": 1} for i in range(100, 1000)]
+    ingest = ingest_catalog(json.dumps(head + tail, separators=(',', ':')))
+    print(f"{ingest.total} products, {ingest.dupes} dupes")
+    assert ingest.dupes <= ingest.total * CONST.CATALOG_DUPE_THRESHOLD
+    assert ingest.error is None and ingest.dupes == 46 and len(ingest.catalog) == 901
+
+
+CSV_LOADERS = [
+    (ProductFactory.tryload_catalog, "./tests/data/asos/asos_30k_trimmed.csv"),
+    (ProductFactory.tryload_catalog, "./tests/data/woocommerce/product_catalog.csv"),
+    (WalmartConverter.tryload_catalog, "./tests/data/walmart/wallmart_1k_kaggle_trimmed.csv"),
+    (WalmartConverter.tryload_catalog, "./tests/data/walmart/wallmart_5k_kaggle_trimmed.csv"),
+    (ShopifyConverter.tryload_catalog_shopify, "./tests/data/shopify/electronics/shopify_products.csv"),
+]
+
+
+def test_csv_loaders_chunked_match_full_read():
+    # a single chunk is the whole file, read and sorted at once
+    for loader, path in CSV_LOADERS:
+        for max_rows in [100_000, 1000, 7]:
+            full = loader(path, max_rows, chunk_rows=10 ** 9)
+            chunked = loader(path, max_rows, chunk_rows=333)
+            print(f"{loader.__qualname__} {path} max_rows={max_rows}: {len(full)} rows")
+            assert len(full) == min(max_rows, len(full)) and len(full) > 0
+            assert json.dumps(chunked) == json.dumps(full)
+
+
+def test_csv_loader_mixed_chunk_dtypes(tmp_path):
+    # prices only turn to text and stock only gets gaps after the first chunk
+    rows = [f"{i},product {i % 50},{i}.5,{i}" for i in range(200)]
+    rows += [f"{i},product {i % 50},From {i}.00," for i in range(200, 260)]
+    path = tmp_path / "woo.csv"
+    path.write_text("SKU,Name,Regular price,Stock\n" + "\n".join(rows) + "\n")
+    for max_rows in [1000, 40]:
+        full = ProductFactory.tryload_catalog(str(path), max_rows, chunk_rows=10 ** 9)
+        chunked = ProductFactory.tryload_catalog(str(path), max_rows, chunk_rows=64)
+        assert json.dumps(chunked) == json.dumps(full)
+        assert isinstance(full[0]["price"], str) and isinstance(full[0]["OnHand"], float)
+
+
+def test_csv_loader_benchmark():
+    peaks = {}
+    for loader, path in [CSV_LOADERS[0]] + CSV_LOADERS[2:4]:
+        results = {}
+        for label, chunk_rows in [("full", 10 ** 9), ("chunked", 1000)]:
+            tracemalloc.start()
+            st = time.perf_counter()
+            rows = loader(path, 500, chunk_rows=chunk_rows)
+            elapsed = time.perf_counter() - st
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[label] = rows
+            peaks[path, label] = peak
+            print(f"{loader.__qualname__} {path} {label}: {len(rows)} rows {elapsed * 1000:.1f}ms peak {peak / 1e6:.2f}MB")
+        assert results["chunked"] == results["full"]
+    # memory is bounded by max_rows + chunk_rows instead of the export size
+    asos = CSV_LOADERS[0][1]
+    assert peaks[asos, "chunked"] * 2 < peaks[asos, "full"]
@@ -0,0 +1,80 @@
+import json
+from bitrecs.commerce.catalog_cache import CatalogCache
+from bitrecs.commerce.product import ProductFactory
+
+
+def make_context(n: int, prefix: str = "SKU") -> str:
+    return json.dumps([{"sku": f"{prefix}-{i}", "name": f"Product {i}!", "price": str(i)} for i in range(n)], indent=2)
+
+
+def test_catalog_cache_hits_and_canonical_alias():
+    cache = CatalogCache()
+    context = make_context(50)
+    first = cache.get(context, "site1")
+    assert cache.stats()["misses"] == 1
+    assert list(first.products) == ProductFactory.try_parse_context_strict(context)
+    assert all(f"sku-{i}" in first.products for i in range(50))
+    assert "SKU-1" not in first.products
+
+    # Same catalog again and the canonical form sent to miners are both hits
+    assert cache.get(context, "site1") is first
+    assert cache.get(first.context, "site1") is first
+    stats = cache.stats()
+    print(stats)
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+    # Scoped by site key
+    other = cache.get(context, "site2")
+    assert other is not first
+    assert list(other.products) == list(first.products)
+    assert cache.stats()["misses"] == 2
+
+
+def test_catalog_cache_memory_eviction():
+    probe = CatalogCache.parse(make_context(100))
+    cache = CatalogCache(max_bytes=probe.nbytes * 5)
+    for i in range(10):
+        cache.get(make_context(100, prefix=f"S{i}"), "site1")
+    stats = cache.stats()
+    print(stats)
+    assert stats["bytes"] <= probe.nbytes * 5
+    assert stats["evictions"] > 0
+    # Most recent catalog is still cached, the oldest was evicted
+    cache.get(make_context(100, prefix="S9"), "site1")
+    assert cache.stats()["hits"] == 1
+    cache.get(make_context(100, prefix="S0"), "site1")
+    assert cache.stats()["misses"] == 11
+
+
+def test_catalog_cache_counts_aliased_catalog_once():
+    context = make_context(100)
+    probe = CatalogCache.parse(context)
+    cache = CatalogCache(max_bytes=probe.nbytes * 2)
+    entry = cache.get(context, "site1")
+    assert cache.get(entry.context, "site1") is entry
+    # another raw form of the same catalog is parsed once more, then aliased to the cached entry
+    assert cache.get(make_context(100).replace("  ", "\t"), "site1") is entry
+    stats = cache.stats()
+    print(stats)
+    assert stats["entries"] == 1 and stats["aliases"] == 2
+    assert stats["bytes"] == probe.nbytes
+
+    # a second catalog fits the budget, a third evicts the first together with its aliases
+    cache.get(make_context(100, prefix="SKB"), "site1")
+    assert cache.stats()["evictions"] == 0
+    cache.get(make_context(100, prefix="SKC"), "site1")
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["aliases"] == 2 and stats["evictions"] == 1
+    assert stats["bytes"] == 2 * probe.nbytes
+    misses = stats["misses"]
+    cache.get(context, "site1")
+    assert cache.stats()["misses"] == misses + 1
+
+
+def test_catalog_cache_rejected_catalogs_not_shared():
+    cache = CatalogCache()
+    invalid = cache.get("not json", "site1")
+    dupes = cache.get(json.dumps([{"sku": "same", "name": "product", "price": "1"}] * 100), "site1")
+    assert invalid.error == "invalid" and dupes.error == "dupes"
+    assert cache.stats()["entries"] == 2 and cache.stats()["aliases"] == 0
@@ -0,0 +1,119 @@
+import os
+os.environ["NEST_ASYNCIO"] = "0"
+import asyncio
+from types import MethodType, SimpleNamespace
+from bitrecs.commerce.catalog_cache import CatalogStore
+from bitrecs.commerce.product import CatalogProvider, ProductFactory
+from bitrecs.protocol import BitrecsRequest, catalog_hash
+from bitrecs.base.validator import BaseValidatorNeuron
+from bitrecs.validator.catalog_refs import CatalogRefTracker
+
+
+def make_request(context: str) -> BitrecsRequest:
+    return BitrecsRequest(created_at="", user="", num_results=5, query="SKU-1",
+                          context=context, site_key="site1", results=[], models_used=[],
+                          miner_uid="", miner_hotkey="")
+
+
+class FakeMiner:
+    """ Answers like neurons/miner.py forward, supports_refs=False behaves like a miner without a catalog store """
+
+    def __init__(self, supports_refs: bool = True, max_bytes: int = 1 << 30):
+        self.store = CatalogStore(max_bytes=max_bytes)
+        self.supports_refs = supports_refs
+        self.received_bytes = 0
+
+    def answer(self, synapse: BitrecsRequest) -> BitrecsRequest:
+        self.received_bytes += len(synapse.context)
+        context = synapse.context
+        response = make_request("[]")
+        if self.supports_refs and synapse.context_hash:
+            if context:
+                if self.store.put(synapse.context_hash, context):
+                    response.context_hash = synapse.context_hash
+            else:
+                context = self.store.get(synapse.context_hash)
+                response.catalog_missing = context is None
+                response.context_hash = None if context is None else synapse.context_hash
+        if context and not response.catalog_missing:
+            response.results = ['{"sku":"a"}']
+        response.dendrite.status_code = 200
+        return response
+
+
+def make_validator(miners: dict, catalog_refs: bool = True):
+    async def call(target_axon, synapse, timeout, deserialize):
+        return miners[target_axon.hotkey].answer(synapse)
+    validator = SimpleNamespace(config=SimpleNamespace(neuron=SimpleNamespace(catalog_refs=catalog_refs, compression="none")),
+                                catalog_refs=CatalogRefTracker(),
+                                dendrite=SimpleNamespace(call=call))
+    validator.send_to_miner = MethodType(BaseValidatorNeuron.send_to_miner, validator)
+    return validator
+
+
+def run_requests(validator, miners: dict, contexts: list) -> list:
+    async def run():
+        responses = []
+        for context in contexts:
+            request = make_request(context)
+            if validator.config.neuron.catalog_refs:
+                request.context_hash = catalog_hash(context)
+            for hotkey in miners:
+                responses.append(await BaseValidatorNeuron.call_miner(validator, SimpleNamespace(hotkey=hotkey), request, 5.0))
+        return responses
+    return asyncio.run(run())
+
+
+def test_catalog_store_lru():
+    contexts = [f'[{{"sku":"{i}","name":"product {i}","price":"1"}}]' * 10 for i in range(5)]
+    store = CatalogStore(max_bytes=3 * len(contexts[0]) + 200)
+    assert not store.put("not-the-hash", contexts[0])
+    assert not store.put(catalog_hash(""), "")
+    for context in contexts:
+        assert store.put(catalog_hash(context), context)
+    assert len(store) == 3 and store.evictions == 2
+    assert store.get(catalog_hash(contexts[0])) is None
+    assert store.get(catalog_hash(contexts[4])) == contexts[4]
+    print(store.stats())
+
+
+def test_catalog_refs_send_each_catalog_once():
+    catalog = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_1k.csv")
+    contexts = [catalog] * 20
+
+    full_miners = {f"hk{i}": FakeMiner() for i in range(8)}
+    run_requests(make_validator(full_miners, catalog_refs=False), full_miners, contexts)
+    full_bytes = sum(m.received_bytes for m in full_miners.values())
+
+    ref_miners = {f"hk{i}": FakeMiner() for i in range(8)}
+    validator = make_validator(ref_miners)
+    responses = run_requests(validator, ref_miners, contexts)
+    ref_bytes = sum(m.received_bytes for m in ref_miners.values())
+    stats = validator.catalog_refs.stats()
+    print(f"20 requests x 8 miners: full {full_bytes / 1e6:.1f}MB refs {ref_bytes / 1e6:.2f}MB {stats}")
+
+    assert all(r.results for r in responses)
+    assert ref_bytes == len(catalog) * len(ref_miners)
+    assert full_bytes == ref_bytes * len(contexts)
+    assert stats["full_sent"] == 8 and stats["refs_sent"] == 8 * 19 and stats["missing"] == 0
+
+
+def test_catalog_refs_missing_and_legacy_miners():
+    catalogs = [f'[{{"sku":"{i}","name":"product {i}","price":"1"}}]' * 50 for i in range(3)]
+    miners = {
+        "legacy": FakeMiner(supports_refs=False),
+        # holds a single catalog, alternating catalogs always evicts the other one
+        "small": FakeMiner(max_bytes=len(catalogs[0]) + 100),
+    }
+    validator = make_validator(miners)
+    contexts = [catalogs[0], catalogs[1], catalogs[0], catalogs[0], catalogs[2]]
+    responses = run_requests(validator, miners, contexts)
+    assert all(r.results for r in responses)
+
+    # miners that never acknowledge a hash are always sent the full catalog
+    assert miners["legacy"].received_bytes == sum(len(c) for c in contexts)
+    assert not validator.catalog_refs.has("legacy", catalog_hash(catalogs[0]))
+    # catalogs[0] was evicted by catalogs[1] then resent, the repeat after that is a reference
+    stats = validator.catalog_refs.stats()
+    assert stats["missing"] == 1 and stats["refs_sent"] == 2
+    assert miners["small"].received_bytes == sum(len(c) for c in contexts) - len(catalogs[0])
@@ -0,0 +1,151 @@
+import os
+os.environ["NEST_ASYNCIO"] = "0"
+import json
+import time
+import asyncio
+from types import MethodType, SimpleNamespace
+from bitrecs.commerce.catalog_cache import CatalogCache
+from bitrecs.commerce.product import CatalogProvider, ProductFactory
+from bitrecs.protocol import BitrecsRequest
+from bitrecs.base.validator import BaseValidatorNeuron
+import base64
+import gzip
+import bitrecs.utils.constants as CONST
+from bitrecs.utils.compression import (
+    SUPPORTED_CODECS, DecompressionLimitError, _compress, decode_results, decode_text,
+    encode_results, encode_text, negotiate
+)
+from bitrecs.validator.codecs import MinerCodecTracker
+
+CATALOGS = [
+    (CatalogProvider.WOOCOMMERCE, "./tests/data/woocommerce/product_catalog.csv"),
+    (CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_1k.csv"),
+    (CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_10k.csv"),
+    (CatalogProvider.WALMART, "./tests/data/walmart/wallmart_5k_kaggle_trimmed.csv"),
+    (CatalogProvider.SHOPIFY, "./tests/data/shopify/electronics/shopify_products.csv"),
+]
+
+
+def make_request(context: str) -> BitrecsRequest:
+    return BitrecsRequest(created_at="", user="", num_results=5, query="SKU-1",
+                          context=context, site_key="site1", results=[], models_used=[],
+                          miner_uid="", miner_hotkey="")
+
+
+def test_context_compression_measurements():
+    for provider, path in CATALOGS:
+        raw = ProductFactory.tryload_catalog_to_json(provider, path)
+        context = CatalogCache.parse(raw).context
+        plain = len(json.dumps(context))
+        for codec in SUPPORTED_CODECS:
+            encode_text.cache_clear()
+            st = time.perf_counter()
+            encoded = encode_text(context, codec)
+            encode_time = time.perf_counter() - st
+            st = time.perf_counter()
+            decoded = decode_text(encoded, codec)
+            decode_time = time.perf_counter() - st
+            print(f"{path} {codec}: {plain / 1e3:.0f}KB -> {len(encoded) / 1e3:.0f}KB ({len(encoded) / plain:.2f}) "
+                  f"encode {encode_time * 1000:.1f}ms decode {decode_time * 1000:.1f}ms")
+            assert decoded == context
+            assert len(encoded) < plain * 0.5
+
+    # the second miner sent the same catalog reuses the encoding
+    st = time.perf_counter()
+    encode_text(context, "gzip")
+    assert time.perf_counter() - st < 0.001
+
+
+def test_results_compression():
+    results = [json.dumps({"sku": f"SKU-{i}", "name": f"Product {i}", "price": "10.00",
+                           "reason": "Pairs well with the viewed product"}) for i in range(20)]
+    encoded, codec = encode_results(results, "gzip")
+    assert codec == "gzip" and len(encoded) == 1
+    assert len(encoded[0]) < len(json.dumps(results))
+    assert decode_results(encoded, codec) == results
+    # too small to shrink stays plain
+    assert encode_results(['{"sku":"a"}'], "gzip") == (['{"sku":"a"}'], None)
+    assert encode_results(results, None) == (results, None)
+    assert decode_results(["not base64"], "gzip") == []
+
+
+def test_decompression_bomb_rejected():
+    for codec in SUPPORTED_CODECS:
+        bomb = base64.b64encode(_compress(b"[" + b"0" * (64 * 1024 * 1024) + b"]", codec)).decode("ascii")
+        print(f"{codec} bomb: {len(bomb) / 1e3:.0f}KB for 64MB")
+        assert decode_results([bomb], codec) == []
+        try:
+            decode_text(bomb, codec, max_size=CONST.MAX_RESULTS_BYTES)
+            assert False, "expected DecompressionLimitError"
+        except DecompressionLimitError:
+            pass
+    # payloads right at the limit still decode, truncated ones do not
+    exact = "x" * CONST.MAX_RESULTS_BYTES
+    assert decode_text(encode_text(exact, "gzip"), "gzip", max_size=CONST.MAX_RESULTS_BYTES) == exact
+    truncated = base64.b64encode(gzip.compress(b"abc" * 1000)[:-20]).decode("ascii")
+    try:
+        decode_text(truncated, "gzip")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_codec_negotiation():
+    assert negotiate(None) is None
+    assert negotiate(["brotli"]) is None
+    assert negotiate(["gzip", "zstd"]) == SUPPORTED_CODECS[0]
+    assert negotiate(["gzip", "zstd"], preferred="gzip") == "gzip"
+
+
+class FakeMiner:
+    """ Answers like neurons/miner.py forward, legacy=True behaves like a miner without compression """
+
+    def __init__(self, legacy: bool = False):
+        self.legacy = legacy
+        self.received_bytes = 0
+        self.contexts = []
+
+    def answer(self, synapse: BitrecsRequest) -> BitrecsRequest:
+        self.received_bytes += len(synapse.context)
+        context = synapse.context
+        if not self.legacy and synapse.codec:
+            context = decode_text(context, synapse.codec)
+        self.contexts.append(context)
+        response = make_request("[]")
+        response.results = [json.dumps({"sku": f"SKU-{i}", "name": f"Product {i}"}) for i in range(10)]
+        if not self.legacy:
+            response.results, response.codec = encode_results(response.results, negotiate(synapse.accept_codecs))
+            response.accept_codecs = SUPPORTED_CODECS
+        response.dendrite.status_code = 200
+        return response
+
+
+def test_validator_negotiates_per_miner():
+    context = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_1k.csv")
+    miners = {"new": FakeMiner(), "legacy": FakeMiner(legacy=True)}
+
+    async def call(target_axon, synapse, timeout, deserialize):
+        return miners[target_axon.hotkey].answer(synapse)
+
+    validator = SimpleNamespace(config=SimpleNamespace(neuron=SimpleNamespace(catalog_refs=False, compression="auto")),
+                                miner_codecs=MinerCodecTracker(),
+                                dendrite=SimpleNamespace(call=call))
+    validator.send_to_miner = MethodType(BaseValidatorNeuron.send_to_miner, validator)
+
+    async def run():
+        responses = []
+        for _ in range(3):
+            for hotkey in miners:
+                axon = SimpleNamespace(hotkey=hotkey)
+                responses.append(await BaseValidatorNeuron.call_miner(validator, axon, make_request(context), 5.0))
+        return responses
+
+    responses = asyncio.run(run())
+    expected = [json.dumps({"sku": f"SKU-{i}", "name": f"Product {i}"}) for i in range(10)]
+    assert all(r.results == expected and r.codec is None for r in responses)
+    for miner in miners.values():
+        assert miner.contexts == [context] * 3
+    # the first request is plain until the miner advertised its codecs
+    assert miners["legacy"].received_bytes == 3 * len(context)
+    assert miners["new"].received_bytes < len(context) + 2 * len(context) * 0.5
+    print(validator.miner_codecs.stats())
@@ -0,0 +1,90 @@
+import re
+import json
+import time
+from bitrecs.commerce.catalog_cache import CatalogCache
+from bitrecs.commerce.product import CatalogProvider, ProductFactory
+from bitrecs.llms.context_packer import ContextPacker, context_packer
+from bitrecs.llms.prompt_factory import PromptFactory
+
+_WORDS = re.compile(r"\w+|[^\w\s]")
+
+
+def word_counter(texts):
+    """ Rough tokenizer so packing can be checked without downloading a tiktoken encoding """
+    return [len(_WORDS.findall(text)) for text in texts]
+
+
+def load_context(path: str = "./tests/data/asos/sample_10k.csv") -> str:
+    raw = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, path)
+    return CatalogCache.parse(raw).context
+
+
+def test_count_matches_full_context():
+    context = load_context()
+    packer = ContextPacker(count_fn=word_counter)
+    total = packer.count(context)
+    print(f"10k catalog: {total} tokens, full count {word_counter([context])[0]}")
+    assert total == word_counter([context])[0]
+
+
+def test_counts_cached_per_catalog_and_row():
+    context = load_context("./tests/data/asos/asos_30k_trimmed.csv")
+    calls = []
+
+    def counter(texts):
+        calls.append(len(texts))
+        return word_counter(texts)
+
+    packer = ContextPacker(count_fn=counter)
+    st = time.perf_counter()
+    total = packer.count(context)
+    first = time.perf_counter() - st
+    st = time.perf_counter()
+    assert packer.count(context) == total
+    second = time.perf_counter() - st
+    st = time.perf_counter()
+    packed = packer.pack(context, total // 10)
+    packing = time.perf_counter() - st
+    print(f"30k catalog count {first * 1000:.0f}ms cached {second * 1000:.2f}ms pack {packing * 1000:.2f}ms")
+    assert len(calls) == 1 and second < first
+
+    # a different catalog of the same products only encodes rows not seen before
+    products = json.loads(context)
+    packer.count(json.dumps(products[:1000] + [{"sku": "new", "name": "new product", "price": "1"}],
+                            separators=(',', ':')))
+    assert calls == [calls[0], 1]
+    assert packer.count(packed) == word_counter([packed])[0]
+
+    # rows are cached by a short digest and a canonical context is not copied
+    assert all(len(key) == 8 for key in packer._rows)
+    assert packer.get(context).compact is context
+
+
+def test_pack_is_deterministic_and_keeps_skus():
+    context = load_context()
+    products = json.loads(context)
+    packer = ContextPacker(count_fn=word_counter)
+    assert packer.pack(context, packer.count(context)) == context
+
+    viewed = products[-1]["sku"]
+    packed = packer.pack(context, 5000, keep=[viewed])
+    assert packed == packer.pack(context, 5000, keep=[viewed.upper()])
+    kept = json.loads(packed)
+    assert word_counter([packed])[0] <= 5000
+    assert kept[-1] == products[-1]
+    # everything else is the leading products of the context
+    assert kept[:-1] == products[:len(kept) - 1]
+    assert packer.pack(context, 5) is None
+
+
+def test_prompt_token_budget(monkeypatch):
+    monkeypatch.setattr(context_packer, "count_fn", word_counter)
+    context = load_context()
+    sku = json.loads(context)[123]["sku"]
+    factory = PromptFactory(sku=sku, context=context, num_recs=5, max_candidates=200, max_context_tokens=2000)
+    assert sku in factory.context
+    try:
+        PromptFactory(sku=sku, context=context, num_recs=5, max_context_tokens=1)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
@@ -29,7 +29,8 @@ from bitrecs.utils.distance import (
     calculate_jaccard_distance,
     select_most_similar_bitrecs,
     select_most_similar_bitrecs_threshold,
-    select_most_similar_bitrecs_threshold2,        
+    select_most_similar_bitrecs_threshold2,
+    select_quorum_bitrecs,
 )
 from bitrecs.utils.color import ColorScheme
 from dotenv import load_dotenv
@@ -1611,3 +1612,27 @@ def test_distance_limit():
     matrix = display_rec_matrix(rec_sets, models_used, most_similar_indices)
     print(matrix)
 
+
+def test_quorum_bitrecs():
+    group_id = secrets.token_hex(16)
+    def make_req(skus: List[str], model: str) -> BitrecsRequest:
+        return BitrecsRequest(created_at=datetime.now().isoformat(), user="test_user",
+                              num_results=len(skus), query="SKU-Q", context="[]",
+                              site_key=group_id, results=[{"sku": s} for s in skus],
+                              models_used=[model], miner_uid="1", miner_hotkey=secrets.token_hex(16))
+
+    agree_1 = make_req(["A", "B", "C", "D", "E"], "agree-1")
+    agree_2 = make_req(["A", "B", "C", "D", "F"], "agree-2")
+    outlier = make_req(["V", "W", "X", "Y", "Z"], "outlier")
+
+    assert select_quorum_bitrecs([agree_1], quorum=2) is None
+    assert select_quorum_bitrecs([agree_1, outlier], quorum=2) is None
+    assert select_quorum_bitrecs([outlier], quorum=1) == [outlier]
+
+    quorum = select_quorum_bitrecs([agree_1, outlier, agree_2], quorum=2)
+    assert quorum is not None
+    assert set(r.models_used[0] for r in quorum) == {"agree-1", "agree-2"}
+    print(f"Quorum: {[r.models_used for r in quorum]}")
+
+    assert select_quorum_bitrecs([agree_1, outlier, agree_2], quorum=3) is None
+    assert select_quorum_bitrecs([agree_1, agree_2], quorum=2, similarity_threshold=0.9) is None
@@ -1,13 +1,17 @@
 import os
 os.environ["NEST_ASYNCIO"] = "0"
 import json
+import time
 import json_repair
 import jsonschema
+import bitrecs.utils.constants as CONST
 from dataclasses import asdict
 from random import SystemRandom
 from bitrecs.llms.prompt_factory import PromptFactory
-from bitrecs.commerce.product import CatalogProvider, Product, ProductFactory
-from bitrecs.validator.reward import CatalogValidator, validate_result_schema
+from bitrecs.commerce.product import CatalogLimitError, CatalogProvider, Product, ProductFactory
+from bitrecs.validator.reward import CatalogValidator, validate_result_schema, validate_result_item
+from bitrecs.protocol import BitrecsRequest
+from bitrecs.utils.parsing import get_parsed_response
 safe_random = SystemRandom()
 
 
@@ -549,4 +553,122 @@ def test_catalog_validator():
     sku = "B00006IEBUe"
     is_valid = catalog_validator.validate_sku(sku)
     assert is_valid == False
-    
\ No newline at end of file
+    
+
+
+def test_parsed_response_is_shared():
+    results = ['{"sku": "24-UG03", "name": "Harmony Band Kit", "price": "22", "reason": "a"}',
+               "{'sku': '24-WG088', 'name': 'Sprite Foam Roller', 'price': '19', 'reason': 'b'}",
+               '["not", "an", "object"]']
+    response = BitrecsRequest(created_at="", user="", num_results=3, query="24-MB04", context="[]",
+                              site_key="site1", results=results, models_used=[], miner_uid="", miner_hotkey="")
+    parsed = get_parsed_response(response)
+    print(parsed)
+    assert parsed.skus == ["24-UG03", "24-WG088", None]
+    assert parsed.sku_set == {"24-UG03", "24-WG088"}
+    assert parsed.repaired == 1
+    assert len(parsed.errors) == 1
+    assert not parsed.is_valid
+    # Parsed once, copies share it, replacing results parses again
+    assert get_parsed_response(response) is parsed
+    assert get_parsed_response(response.model_copy()) is parsed
+    response.results = results[:2]
+    reparsed = get_parsed_response(response)
+    assert reparsed is not parsed
+    assert reparsed.is_valid and not reparsed.is_strict
+    assert validate_result_schema(2, response.results)
+
+
+def test_result_validation_benchmark():
+    legacy_schema = {
+        "type": "object",
+        "properties": {
+            "sku": {"type": "string"},
+            "name": {"type": "string"},
+            "price": {"type": ["string", "number"]},
+            "reason": {"type": "string"}
+        },
+        "required": ["sku", "name", "price", "reason"],
+    }
+    items = [json.dumps({"sku": f"SKU-{i}", "name": f"Product number {i}", "price": str(i * 1.5),
+                         "reason": "Frequently bought together with the query product"}) for i in range(20)]
+    rounds = 50
+
+    def legacy_valid(item: str) -> bool:
+        try:
+            jsonschema.validate(json_repair.loads(item), legacy_schema)
+            return True
+        except jsonschema.ValidationError:
+            return False
+
+    st = time.perf_counter()
+    for _ in range(rounds):
+        legacy_verdicts = [legacy_valid(item) for item in items]
+    legacy = (time.perf_counter() - st) / (rounds * len(items))
+
+    st = time.perf_counter()
+    for _ in range(rounds):
+        compiled_verdict = validate_result_schema(len(items), items)
+    compiled = (time.perf_counter() - st) / (rounds * len(items))
+
+    print(f"per item legacy: {legacy * 1e6:.1f}us compiled: {compiled * 1e6:.1f}us ({legacy / compiled:.1f}x)")
+    assert compiled_verdict and all(legacy_verdicts)
+    assert [validate_result_item(json.loads(item)) for item in items] == legacy_verdicts
+
+    # Same verdicts as the schema
+    assert validate_result_item({"sku": "a", "name": "b", "price": 5, "reason": "c"})
+    assert not validate_result_item({"sku": "a", "name": "b", "price": True, "reason": "c"})
+    assert not validate_result_item({"sku": "a", "name": "b", "reason": "c"})
+    assert not validate_result_item({"sku": 1, "name": "b", "price": "5", "reason": "c"})
+    assert not validate_result_item(["sku"])
+
+
+def test_streaming_strict_parser_matches_json_loads():
+    context = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_5k.csv")
+    expected = []
+    for product in json.loads(context):
+        name = str(product.get("name"))
+        name = CONST.RE_PRODUCT_NAME.sub("", name).strip()
+        if product.get("sku") and name and product.get("price", "0"):
+            expected.append(Product(sku=str(product["sku"]), name=name, price=str(product.get("price", "0"))))
+    expected.sort(key=lambda p: p.name)
+
+    products = ProductFactory.try_parse_context_strict(context, dupe_threshold=None)
+    print(f"streamed {len(products)} products")
+    assert products == expected
+    assert ProductFactory.try_parse_context_strict("  [ ] ") == []
+    assert ProductFactory.try_parse_context_strict('[{"sku": "a", "name": "b"}] extra') == []
+    assert ProductFactory.try_parse_context_strict('{"sku": "a", "name": "b"}') == []
+
+
+def test_streaming_strict_parser_aborts_early():
+    oversized = json.dumps([{"sku": f"sku-{i}", "name": f"product {i}", "price": "1"} for i in range(200)])
+    stream = ProductFactory.iter_context_strict(oversized, max_size=50)
+    read = 0
+    try:
+        for _ in stream:
+            read += 1
+        assert False, "oversized catalog accepted"
+    except CatalogLimitError as e:
+        print(f"rejected after {read} products: {e}")
+    assert read == 50
+    assert ProductFactory.try_parse_context_strict(oversized, max_size=50) == []
+
+    # all duplicates, rejected long before the end of the context
+    dupes = json.dumps([{"sku": "same", "name": "product", "price": "1"}] * 100_000)
+    st = time.perf_counter()
+    read = 0
+    try:
+        for _ in ProductFactory.iter_context_strict(dupes, dupe_threshold=0.05):
+            read += 1
+        assert False, "duplicate catalog accepted"
+    except CatalogLimitError as e:
+        print(f"rejected after {read} products in {time.perf_counter() - st:.4f}s: {e}")
+    assert read < 20_000
+
+    # a few duplicates under the threshold are fine
+    ok = [{"sku": f"sku-{i}", "name": f"product {i}", "price": "1"} for i in range(100)]
+    ok += [{"sku": "sku-1", "name": "product 1", "price": "1"}] * 5
+    assert len(ProductFactory.try_parse_context_strict(json.dumps(ok))) == 105
+    ok += [{"sku": "sku-2", "name": "product 2", "price": "1"}] * 2
+    assert ProductFactory.try_parse_context_strict(json.dumps(ok)) == []
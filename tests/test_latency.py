@@ -0,0 +1,90 @@
+from bitrecs.validator.latency import MinerLatencyTracker
+
+
+def test_latency_percentile_and_window():
+    tracker = MinerLatencyTracker(window=10)
+    assert tracker.percentile(1, 0.9) is None
+    assert tracker.percentile(1, 0.9, default=2.5) == 2.5
+    for i in range(1, 21):
+        tracker.record(1, float(i))
+    # Only the last 10 samples (11..20) are kept
+    assert len(tracker.samples[1]) == 10
+    assert tracker.percentile(1, 0.0) == 11.0
+    assert tracker.percentile(1, 1.0) == 20.0
+    tracker.record(1, -1)
+    tracker.record(1, None)
+    assert len(tracker.samples[1]) == 10
+
+
+def test_latency_rank_fastest_first():
+    tracker = MinerLatencyTracker()
+    for uid, seconds in [(5, 3.0), (7, 0.5), (9, 1.2)]:
+        for _ in range(3):
+            tracker.record(uid, seconds)
+    ranked = tracker.rank([5, 8, 9, 7])
+    print(f"Ranked: {ranked}")
+    assert ranked == [7, 9, 5, 8]
+
+
+def test_latency_hotkey_change_resets_history():
+    tracker = MinerLatencyTracker()
+    for _ in range(5):
+        tracker.record(3, 4.0, hotkey="hk-old")
+    tracker.record(3, 0.5, hotkey="hk-new")
+    assert tracker.percentile(3, 0.95) == 0.5
+    assert tracker.histogram(3)["hotkey"] == "hk-new"
+
+
+def test_latency_adaptive_timeouts_and_histogram():
+    tracker = MinerLatencyTracker(min_samples=5)
+    for _ in range(4):
+        tracker.record(1, 4.5)
+    # Not enough history yet, keep the default timeout and query the miner
+    assert tracker.timeout_for(1, 5.0) == 5.0
+    assert tracker.can_meet(1, 3.0)
+    tracker.record(1, 4.5)
+    assert not tracker.can_meet(1, 3.0)
+    assert tracker.timeout_for(1, 5.0) == 5.0
+
+    for seconds in [0.4, 0.8, 1.5, 1.5, 2.0]:
+        tracker.record(2, seconds)
+    assert tracker.can_meet(2, 3.0)
+    assert tracker.timeout_for(2, 5.0, min_timeout=1.0, headroom=1.5) == 1.9 * 1.5
+
+    histograms = tracker.to_dict()
+    print(histograms)
+    assert list(histograms.keys()) == [1, 2]
+    assert histograms[2]["count"] == 5
+    assert histograms[2]["buckets"]["<=0.5"] == 1
+    assert histograms[2]["buckets"]["<=2.0"] == 3
+    assert histograms[1]["buckets"]["<=5.0"] == 5
+    assert sum(histograms[2]["buckets"].values()) == 5
+
+
+def test_timing_out_miner_is_filtered(monkeypatch):
+    from types import SimpleNamespace
+    import bitrecs.utils.constants as CONST
+    from bitrecs.base.validator import BaseValidatorNeuron
+    from bitrecs.protocol import BitrecsRequest
+
+    def response(uid: int, status: int) -> BitrecsRequest:
+        r = BitrecsRequest(created_at="", user="", num_results=5, query="", context="", site_key="",
+                           results=[], models_used=[], miner_uid=str(uid), miner_hotkey="", timeout=timeout)
+        r.dendrite.status_code = status
+        r.dendrite.process_time = 0.8 if status == 200 else None
+        return r
+
+    timeout = 5.0
+    monkeypatch.setattr(CONST, "LATENCY_REPROBE_RATE", 0.0)
+    validator = SimpleNamespace(miner_latency=MinerLatencyTracker(min_samples=5))
+    for i in range(10):
+        # miner 2 times out every round, miner 3 once in 10 rounds
+        statuses = [200, 408, 408 if i == 0 else 200]
+        validator.miner_latency.record_responses([1, 2, 3], [response(uid, s) for uid, s in zip([1, 2, 3], statuses)],
+                                                 timeout=timeout)
+    # timeouts are recorded at the given timeout so they alone never exceed it
+    assert validator.miner_latency.percentile(2, 0.95) == timeout
+    assert not validator.miner_latency.can_meet(2, timeout)
+    assert not validator.miner_latency.can_meet(3, timeout)
+    assert validator.miner_latency.can_meet(3, timeout, q=0.9)
+    assert BaseValidatorNeuron.filter_slow_miners(validator, [1, 2, 4], timeout) == [1, 4]
@@ -0,0 +1,87 @@
+import json
+import time
+import asyncio
+import httpx
+from bitrecs.llms.async_clients import LLMClientPool, llm_clients
+from bitrecs.llms.factory import LLM, LLMFactory
+
+PROMPT = "Recommend products for SKU-1 from the catalog"
+
+
+class SlowProvider:
+    """ Serves chat completions in the OpenAI and Ollama formats after a fixed delay """
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        body = json.loads(request.content)
+        self.requests.append((str(request.url), body))
+        content = json.dumps([{"sku": "SKU-2", "model": body["model"]}])
+        if request.url.path.endswith("/chat/completions"):
+            return httpx.Response(200, json={
+                "id": "1", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}]
+            })
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": content}})
+
+
+def test_concurrent_calls_share_pooled_clients(monkeypatch):
+    provider = SlowProvider()
+    monkeypatch.setattr(llm_clients, "transport", httpx.MockTransport(provider))
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setenv("OLLAMA_LOCAL_URL", "http://localhost:11434/api/chat/")
+    created = llm_clients.created
+
+    async def run():
+        calls = [LLMFactory.query_llm_async(LLM.OPEN_ROUTER, "model-a", user_prompt=PROMPT) for _ in range(16)]
+        calls += [LLMFactory.query_llm_async(LLM.OLLAMA_LOCAL, "model-b", user_prompt=PROMPT) for _ in range(16)]
+        st = time.perf_counter()
+        results = await asyncio.gather(*calls)
+        elapsed = time.perf_counter() - st
+        await llm_clients.aclose()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(run())
+    print(f"32 LLM calls of {provider.delay}s in {elapsed:.2f}s, max in flight {provider.max_in_flight}")
+    assert elapsed < 16 * provider.delay
+    assert provider.max_in_flight > 1
+    assert [json.loads(r)[0]["model"] for r in results] == ["model-a"] * 16 + ["model-b"] * 16
+    # one openai client for open router and one http client for ollama
+    assert llm_clients.created - created == 2
+
+    urls = {url for url, _ in provider.requests}
+    assert urls == {"https://openrouter.ai/api/v1/chat/completions", "http://localhost:11434/api/chat"}
+    ollama = next(body for url, body in provider.requests if "11434" in url)
+    assert ollama["messages"] == [{"role": "user", "content": PROMPT}] and ollama["stream"] is False
+
+
+def test_clients_bound_to_event_loop():
+    pool = LLMClientPool(transport=httpx.MockTransport(SlowProvider(delay=0)))
+
+    async def clients():
+        return pool.http(), pool.http(), pool.openai("key"), pool.openai("key", "http://localhost:8000/v1")
+
+    first = asyncio.run(clients())
+    second = asyncio.run(clients())
+    assert first[0] is first[1]
+    assert first[2] is not first[3]
+    assert first[0] is not second[0]
+    assert pool.created == 6
+
+
+def test_missing_api_key(monkeypatch):
+    monkeypatch.delenv("CHATGPT_API_KEY", raising=False)
+    try:
+        asyncio.run(LLMFactory.query_llm_async(LLM.CHAT_GPT, "gpt-4o-mini", user_prompt=PROMPT))
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert "CHATGPT_API_KEY" in str(e)
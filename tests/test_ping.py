@@ -0,0 +1,63 @@
+import asyncio
+import time
+import types
+from bitrecs.utils import uids as uid_utils
+from bitrecs.utils.uids import ping_miner_uids
+
+
+def fake_validator(ips: list):
+    axons = [types.SimpleNamespace(ip=ip) for ip in ips]
+    return types.SimpleNamespace(metagraph=types.SimpleNamespace(axons=axons))
+
+
+def test_ping_miner_uids_concurrent_and_cached():
+    uid_utils._ping_cache.clear()
+
+    async def run():
+        server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.2", 0)
+        port = server.sockets[0].getsockname()[1]
+        # uid 0 and 1 are up, uid 2 is localhost and ignored
+        validator = fake_validator(["127.0.0.2", "127.0.0.2", "127.0.0.1"])
+        st = time.perf_counter()
+        first = await ping_miner_uids(validator, [0, 1, 2], port=port, timeout=1, max_concurrency=2)
+        elapsed = time.perf_counter() - st
+        server.close()
+        await server.wait_closed()
+        # Server is gone, cached results are reused within the ttl
+        cached = await ping_miner_uids(validator, [0, 1], port=port, timeout=1)
+        fresh = await ping_miner_uids(validator, [0], port=port, timeout=1, ttl=0)
+        return first, elapsed, cached, fresh
+
+    first, elapsed, cached, fresh = asyncio.run(run())
+    print(f"first: {first} in {elapsed:0.3f}s, cached: {cached}, fresh: {fresh}")
+    assert first[0] is not None and first[0] >= 0
+    assert first[1] is not None
+    assert first[2] is None
+    assert cached == {0: first[0], 1: first[1]}
+    assert fresh == {0: None}
+    uid_utils._ping_cache.clear()
+
+
+def test_ping_miner_uids_bounded_parallelism(monkeypatch):
+    uid_utils._ping_cache.clear()
+    in_flight = 0
+    peak = 0
+
+    async def slow_ping(uid, ip, port=8091, timeout=3):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.2)
+        in_flight -= 1
+        return None
+
+    monkeypatch.setattr(uid_utils, "ping_miner_address", slow_ping)
+    validator = fake_validator(["10.0.0.1"] * 8)
+    st = time.perf_counter()
+    results = asyncio.run(ping_miner_uids(validator, list(range(8)), timeout=0.2, max_concurrency=4))
+    elapsed = time.perf_counter() - st
+    print(f"8 unreachable miners in {elapsed:0.3f}s, peak {peak}")
+    assert all(latency is None for latency in results.values())
+    assert peak == 4
+    assert elapsed < 0.8
+    uid_utils._ping_cache.clear()
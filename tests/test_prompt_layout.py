@@ -0,0 +1,68 @@
+import os
+import json
+import time
+from bitrecs.commerce.product import CatalogProvider, ProductFactory
+from bitrecs.commerce.user_profile import UserProfile
+from bitrecs.llms.prompt_factory import PromptFactory
+
+
+def shared_prefix(a: str, b: str) -> int:
+    return len(os.path.commonprefix([a, b]))
+
+
+def test_prefix_cache_layout_shares_catalog_prefix():
+    context = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_5k.csv")
+    products = json.loads(context)
+    first, second = str(products[10]["sku"]), str(products[2000]["sku"])
+
+    # cart and query differ, validators send the same num_results
+    cart = [{"sku": str(products[3]["sku"]), "name": products[3]["name"], "price": products[3]["price"]}]
+    profiles = [None, UserProfile(id="1", created_at="", cart=cart, orders=[], site_config={})]
+    standard = [PromptFactory(sku=sku, context=context, num_recs=5, profile=profile).generate_prompt()
+                for sku, profile in zip([first, second], profiles)]
+    cached = [PromptFactory(sku=sku, context=context, num_recs=5, profile=profile, prefix_cache=True).generate_prompt()
+              for sku, profile in zip([first, second], profiles)]
+
+    standard_shared = shared_prefix(*standard)
+    cached_shared = shared_prefix(*cached)
+    print(f"shared prefix standard {standard_shared}/{len(standard[0])} prefix_cache {cached_shared}/{len(cached[0])}")
+    assert context not in standard[0][:standard_shared]
+    assert context in cached[0][:cached_shared]
+    assert len(cached[0]) - cached_shared < 1000
+
+    for prompt, sku, n in zip(cached, [first, second], [5, 5]):
+        assert prompt.index(context) < prompt.index(f"<sku>{sku}</sku>")
+        assert f"select {n} complementary products from the context" in prompt
+        assert f"Must return exactly {n} items" in prompt
+
+
+def test_layouts_only_differ_in_order():
+    context = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_1k.csv")
+    sku = str(json.loads(context)[10]["sku"])
+
+    def body(prompt: str) -> list:
+        return sorted(line.strip() for line in prompt.splitlines() if line.strip() and not line.strip().startswith("#"))
+
+    for persona in PromptFactory.PERSONAS:
+        factories = [PromptFactory(sku=sku, context=context, num_recs=7, prefix_cache=layout) for layout in (False, True)]
+        for factory in factories:
+            factory.persona = persona
+        standard, cached = [factory.generate_prompt() for factory in factories]
+        assert standard != cached
+        assert body(standard) == body(cached)
+
+
+def test_static_prefix_built_once():
+    context = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_10k.csv")
+    sku = str(json.loads(context)[0]["sku"])
+    PromptFactory._static_prefix.cache_clear()
+    st = time.perf_counter()
+    PromptFactory(sku=sku, context=context, prefix_cache=True).generate_prompt()
+    first = time.perf_counter() - st
+    st = time.perf_counter()
+    for _ in range(10):
+        PromptFactory(sku=sku, context=context, prefix_cache=True).generate_prompt()
+    repeat = (time.perf_counter() - st) / 10
+    info = PromptFactory._static_prefix.cache_info()
+    print(f"prompt build first {first * 1000:.2f}ms repeat {repeat * 1000:.2f}ms {info}")
+    assert info.misses == 1 and info.hits == 10
@@ -0,0 +1,74 @@
+import json
+import time
+from bitrecs.commerce.product import CatalogProvider, ProductFactory
+from bitrecs.commerce.retrieval import CatalogIndex, CatalogIndexCache, retrieve_candidates, tokenize
+from bitrecs.llms.prompt_factory import PromptFactory
+from bitrecs.protocol import catalog_hash
+
+
+def test_tokenize_category_hierarchy():
+    assert tokenize("Electronics|Audio|Wireless Headphones-X2") == ["electronics", "audio", "wireless", "headphones", "x2"]
+    assert tokenize("") == []
+
+
+def test_candidates_are_relevant():
+    catalogs = [
+        (CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_10k.csv"),
+        (CatalogProvider.WALMART, "./tests/data/walmart/wallmart_5k_kaggle_trimmed.csv"),
+    ]
+    for provider, path in catalogs:
+        context = ProductFactory.tryload_catalog_to_json(provider, path)
+        products = json.loads(context)
+        index = CatalogIndex.from_context(context)
+        for viewed in products[::997]:
+            candidates = index.select_candidates(viewed["sku"], 40)
+            assert viewed in candidates and len(candidates) <= 41
+            # every candidate shares at least one word with the viewed product
+            words = set(tokenize(viewed["name"]))
+            assert all(words & set(tokenize(p["name"])) for p in candidates)
+        print(f"{path}: {viewed['name']} -> {[p['name'] for p in candidates][:5]}")
+
+
+def test_cart_items_are_kept():
+    context = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_1k.csv")
+    products = json.loads(context)
+    viewed, cart = products[10], [products[500], products[900]]
+    candidates = json.loads(retrieve_candidates(context, viewed["sku"], 20, cart))
+    assert viewed in candidates
+    assert all(item in candidates for item in cart)
+    assert len(candidates) <= 23
+
+
+def test_unknown_sku_and_small_catalogs_keep_context():
+    context = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_1k.csv")
+    assert retrieve_candidates(context, "NOT-IN-CATALOG", 20) == context
+    assert retrieve_candidates(context, json.loads(context)[0]["sku"], 5000) == context
+    assert retrieve_candidates("not json", "SKU-1", 20) == "not json"
+
+
+def test_index_cached_per_catalog():
+    context = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/asos_30k_trimmed.csv")
+    cache = CatalogIndexCache(max_entries=2)
+    st = time.perf_counter()
+    index = cache.get(context)
+    build = time.perf_counter() - st
+    st = time.perf_counter()
+    assert cache.get(context, catalog_hash(context)) is index
+    cached = time.perf_counter() - st
+    print(f"30k catalog index build {build * 1000:.0f}ms cached {cached * 1000:.2f}ms")
+    assert cache.hits == 1 and cache.misses == 1
+    assert cached < build
+
+    for other in ['[{"sku":"a","name":"x"}]', '[{"sku":"b","name":"y"}]']:
+        cache.get(other)
+    assert cache.get(context) is not index
+
+
+def test_prompt_context_reduction():
+    context = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_10k.csv")
+    sku = str(json.loads(context)[123]["sku"])
+    full = PromptFactory(sku=sku, context=context, num_recs=5).generate_prompt()
+    narrowed = PromptFactory(sku=sku, context=context, num_recs=5, max_candidates=50).generate_prompt()
+    print(f"prompt {len(full)} -> {len(narrowed)} chars")
+    assert sku in narrowed
+    assert len(narrowed) < len(full) * 0.05
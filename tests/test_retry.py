@@ -0,0 +1,97 @@
+import time
+import asyncio
+from types import SimpleNamespace
+from bitrecs.base.validator import BaseValidatorNeuron
+from bitrecs.protocol import BitrecsRequest
+from bitrecs.validator.latency import MinerLatencyTracker
+
+
+def make_response(uid: int, status: int) -> BitrecsRequest:
+    r = BitrecsRequest(created_at="", user="", num_results=5, query="", context="", site_key="",
+                       results=[], models_used=[], miner_uid=str(uid), miner_hotkey="")
+    r.dendrite.status_code = status
+    return r
+
+
+class FakeMiners:
+    """ call_miner stand in, each miner answers after its delay or fails at its timeout """
+
+    def __init__(self, delays: dict, failing=()):
+        self.delays = delays
+        self.failing = set(failing)
+        self.started = {}
+        self.cancelled = []
+        self.st = time.perf_counter()
+
+    async def __call__(self, axon: int, synapse: BitrecsRequest, timeout: float) -> BitrecsRequest:
+        self.started[axon] = (time.perf_counter() - self.st, timeout)
+        delay = self.delays[axon]
+        try:
+            await asyncio.sleep(min(delay, timeout))
+        except asyncio.CancelledError:
+            self.cancelled.append(axon)
+            raise
+        if delay > timeout or axon in self.failing:
+            return make_response(axon, 408)
+        return make_response(axon, 200)
+
+
+def make_validator(miners: FakeMiners, latencies: dict, retry_count: int = 1):
+    tracker = MinerLatencyTracker(min_samples=1)
+    for uid, seconds in latencies.items():
+        tracker.record(uid, seconds)
+    neuron = SimpleNamespace(retry_count=retry_count, hedge_percentile=0.9)
+    return SimpleNamespace(miner_latency=tracker, config=SimpleNamespace(neuron=neuron),
+                           metagraph=SimpleNamespace(axons=list(range(10))), call_miner=miners)
+
+
+def retry(validator, uids, deadline_in: float):
+    responses = [make_response(uid, 503) for uid in uids]
+    deadline = time.perf_counter() + deadline_in
+    st = time.perf_counter()
+    retried = asyncio.run(BaseValidatorNeuron.retry_miners(validator, uids, None, responses, deadline))
+    return retried, time.perf_counter() - st
+
+
+def test_retry_hedges_slow_miner_and_first_success_wins():
+    # miner 1 is usually fastest but hangs this time, miner 2 is next in line
+    miners = FakeMiners({1: 1.0, 2: 0.05, 3: 0.05})
+    validator = make_validator(miners, {1: 0.1, 2: 0.2, 3: 0.3})
+    uids = [3, 2, 1]
+    retried, elapsed = retry(validator, uids, 2.0)
+    print(f"hedged retry in {elapsed:.2f}s, started {miners.started}")
+
+    assert sorted(miners.started) == [1, 2]
+    hedged_at = miners.started[2][0]
+    assert 0.1 <= hedged_at < 0.5
+    assert miners.started[1][1] <= 2.0
+    assert [r.is_success for r in retried] == [False, True, False]
+    # the hung retry was cancelled instead of waited for
+    assert miners.cancelled == [1]
+    assert elapsed < 0.5
+
+
+def test_retry_without_hedge_when_miner_is_fast():
+    miners = FakeMiners({1: 0.02, 2: 0.02})
+    validator = make_validator(miners, {1: 0.5, 2: 0.6})
+    retried, _ = retry(validator, [1, 2], 2.0)
+    assert list(miners.started) == [1]
+    assert [r.is_success for r in retried] == [True, False]
+
+
+def test_retry_stops_at_deadline():
+    miners = FakeMiners({1: 1.0, 2: 1.0, 3: 1.0})
+    validator = make_validator(miners, {1: 0.05, 2: 0.1, 3: 0.2})
+    # nothing is sent once the deadline has passed
+    retried, _ = retry(validator, [1, 2, 3], -0.1)
+    assert miners.started == {} and not any(r.is_success for r in retried)
+
+    # the retry and its hedge are bounded by the deadline, no hedge launches after it
+    miners = FakeMiners({1: 1.0, 2: 1.0, 3: 1.0})
+    validator.call_miner = miners
+    retried, elapsed = retry(validator, [1, 2, 3], 0.3)
+    print(f"retry until deadline {elapsed:.2f}s, started {miners.started}")
+    assert sorted(miners.started) == [1, 2]
+    assert all(start < 0.3 and start + timeout <= 0.35 for start, timeout in miners.started.values())
+    assert not any(r.is_success for r in retried)
+    assert elapsed < 0.6
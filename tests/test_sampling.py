@@ -0,0 +1,52 @@
+import numpy as np
+from collections import Counter
+from bitrecs.utils.uids import get_weighted_miner_uids
+
+
+def test_weighted_sampling_fan_out():
+    uids = list(range(10))
+    scores = np.zeros(12)
+    validity = np.ones(12)
+    latencies = [1.0] * len(uids)
+    # Disabled or larger than the active set returns everyone
+    assert get_weighted_miner_uids(uids, 0, scores, validity, latencies) == uids
+    assert get_weighted_miner_uids(uids, 20, scores, validity, latencies) == uids
+
+    for _ in range(50):
+        sampled = get_weighted_miner_uids(uids, 4, scores, validity, latencies, exploration=0.25)
+        assert len(sampled) == 4
+        assert len(set(sampled)) == 4
+        assert set(sampled).issubset(uids)
+
+
+def test_weighted_sampling_prefers_good_miners_but_explores():
+    uids = list(range(10))
+    scores = np.array([1.0, 0.9] + [0.01] * 8)
+    validity = np.array([1.0, 1.0] + [0.1] * 8)
+    latencies = [0.5, 0.5] + [4.0] * 8
+    counts = Counter()
+    rounds = 500
+    for _ in range(rounds):
+        counts.update(get_weighted_miner_uids(uids, 3, scores, validity, latencies, exploration=0.3))
+    print(counts)
+    # Two good miners take the weighted slots, the exploration slot reaches everyone else
+    assert counts[0] > rounds * 0.9
+    assert counts[1] > rounds * 0.9
+    assert all(counts[uid] > 0 for uid in uids)
+
+
+def test_ping_latency_is_prior_for_unseen_miners():
+    from types import SimpleNamespace
+    import bitrecs.utils.constants as CONST
+    from bitrecs.base.validator import BaseValidatorNeuron
+    from bitrecs.validator.latency import MinerLatencyTracker
+
+    validator = SimpleNamespace(miner_latency=MinerLatencyTracker(), miner_ping_latency={1: 0.02, 2: 0.8, 3: 60.0})
+    for _ in range(5):
+        validator.miner_latency.record(4, 0.3)
+    prior = lambda uid: BaseValidatorNeuron.latency_prior(validator, uid)
+    assert prior(1) < prior(2)
+    assert prior(0) == CONST.MAX_DENDRITE_TIMEOUT / 2
+    assert prior(3) == CONST.MAX_DENDRITE_TIMEOUT
+    # observed latency wins over the prior
+    assert validator.miner_latency.percentile(4, 0.5, default=prior(4)) == 0.3
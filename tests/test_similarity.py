@@ -0,0 +1,264 @@
+import json
+import time
+import random
+import numpy as np
+from datetime import datetime
+from typing import List, Set
+from bitrecs.commerce.product import CatalogProvider, ProductFactory
+from bitrecs.protocol import BitrecsRequest
+import bitrecs.utils.distance as distance
+from bitrecs.utils.distance import (
+    analyze_similar_sets,
+    calculate_jaccard_distance,
+    display_rec_matrix,
+    display_rec_matrix_html,
+    display_rec_matrix_numpy,
+    jaccard_similarity_matrix,
+    pair_jaccard_similarity,
+    select_most_similar_bitrecs,
+    select_most_similar_sets,
+    select_most_similar_sets_approx
+)
+from bitrecs.utils.minhash import encode_sets, lsh_candidate_pairs, minhash_signatures
+
+
+def reference_most_similar_sets(rec_sets: List[Set], top_n: int = 2) -> List[int]:
+    """ The pairwise set loop select_most_similar_sets used before the matrix engine """
+    all_pairs = []
+    for i in range(len(rec_sets)):
+        for j in range(i + 1, len(rec_sets)):
+            distance = calculate_jaccard_distance(rec_sets[i], rec_sets[j])
+            all_pairs.append((1 - distance, i, j))
+    all_pairs.sort(reverse=True)
+    selected = set()
+    result = []
+    for sim, i, j in all_pairs:
+        for idx in (i, j):
+            if idx not in selected and len(result) < top_n:
+                selected.add(idx)
+                result.append(idx)
+        if len(result) >= top_n:
+            break
+    return result[:top_n]
+
+
+def make_rec_sets(n: int, catalog_size: int, set_size: int = 20, seed: int = 0) -> List[Set[str]]:
+    rng = random.Random(seed)
+    catalog = [f"SKU-{i}" for i in range(catalog_size)]
+    return [set(rng.sample(catalog, set_size)) for _ in range(n)]
+
+
+def test_similarity_matrix_matches_jaccard():
+    rec_sets = make_rec_sets(24, 60, 8) + [set(), {"SKU-1"}]
+    similarity = jaccard_similarity_matrix(rec_sets)
+    for i in range(len(rec_sets)):
+        for j in range(len(rec_sets)):
+            if i == j:
+                continue
+            expected = 1 - calculate_jaccard_distance(rec_sets[i], rec_sets[j])
+            assert abs(similarity[i, j] - expected) < 1e-12
+
+
+def test_select_most_similar_sets_matches_reference():
+    # small catalogs give many tied similarities so tie breaking is exercised
+    for seed in range(20):
+        for n, catalog_size, set_size in [(2, 10, 3), (7, 12, 4), (16, 30, 5), (40, 200, 20)]:
+            rec_sets = make_rec_sets(n, catalog_size, set_size, seed)
+            if seed % 3 == 0:
+                rec_sets[0] = set()
+            for top_n in (1, 2, 3, 5):
+                expected = reference_most_similar_sets(rec_sets, top_n)
+                actual = select_most_similar_sets(rec_sets, top_n)
+                assert actual == expected, f"seed={seed} n={n} top_n={top_n} {actual} != {expected}"
+
+
+def test_select_most_similar_sets_benchmark():
+    print("\nresponses  reference_ms  matrix_ms  speedup")
+    for n in (16, 64, 256, 1024):
+        rec_sets = make_rec_sets(n, 400, 20, seed=n)
+
+        start = time.perf_counter()
+        expected = reference_most_similar_sets(rec_sets, 2)
+        reference_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        actual = select_most_similar_sets(rec_sets, 2)
+        matrix_ms = (time.perf_counter() - start) * 1000
+
+        assert actual == expected
+        print(f"{n:9d}  {reference_ms:12.2f}  {matrix_ms:9.2f}  {reference_ms / max(matrix_ms, 1e-6):7.1f}x")
+
+
+def simulate_round(skus: List[str], n: int, rng: random.Random, num_recs: int = 20) -> List[Set[str]]:
+    """
+    Miner responses for one request from a real catalog: a few model families that
+    each return a noisy copy of their own ranking, plus miners returning random skus.
+    """
+    families = [rng.sample(skus, num_recs) for _ in range(rng.randint(2, 5))]
+    rec_sets = []
+    for _ in range(n):
+        if rng.random() < 0.3:
+            rec_sets.append(set(rng.sample(skus, num_recs)))
+            continue
+        base = rng.choice(families)
+        keep = rng.randint(num_recs // 3, num_recs)
+        recs = set(rng.sample(base, keep))
+        while len(recs) < num_recs:
+            recs.add(rng.choice(skus))
+        rec_sets.append(recs)
+    return rec_sets
+
+
+def test_approx_selection_agrees_with_exact():
+    catalog = ProductFactory.tryload_catalog_to_json(CatalogProvider.WOOCOMMERCE, "./tests/data/asos/sample_1k.csv")
+    skus = [p.sku for p in ProductFactory.convert(catalog, CatalogProvider.WOOCOMMERCE)]
+    rng = random.Random(42)
+    print("\nresponses  perm/bands  agreement  similarity_ratio  exact_ms  approx_ms")
+    for n in (256, 1024):
+        rounds = [simulate_round(skus, n, rng) for _ in range(10)]
+        for num_perm, bands in [(64, 16), (64, 8), (128, 8)]:
+            agree = 0
+            ratio = []
+            exact_ms = approx_ms = 0.0
+            for rec_sets in rounds:
+                start = time.perf_counter()
+                exact = select_most_similar_sets(rec_sets, 3)
+                exact_ms += (time.perf_counter() - start) * 1000
+                start = time.perf_counter()
+                approx = select_most_similar_sets_approx(rec_sets, 3, num_perm, bands)
+                approx_ms += (time.perf_counter() - start) * 1000
+
+                agree += int(approx == exact)
+                best = 1 - calculate_jaccard_distance(rec_sets[exact[0]], rec_sets[exact[1]])
+                found = 1 - calculate_jaccard_distance(rec_sets[approx[0]], rec_sets[approx[1]])
+                ratio.append(found / best if best else 1.0)
+            agreement = agree / len(rounds)
+            mean_ratio = sum(ratio) / len(ratio)
+            print(f"{n:9d}  {num_perm:5d}/{bands:<4d}  {agreement:9.2f}  {mean_ratio:16.3f}"
+                  f"  {exact_ms / len(rounds):8.2f}  {approx_ms / len(rounds):9.2f}")
+            if (num_perm, bands) == (64, 8):
+                assert agreement >= 0.9
+                assert mean_ratio >= 0.98
+
+
+def test_approx_selection_on_bitrecs():
+    rng = random.Random(7)
+    skus = [f"SKU-{i}" for i in range(500)]
+    requests = []
+    for i, recs in enumerate(simulate_round(skus, 80, rng)):
+        results = [json.dumps({"sku": sku, "name": sku, "price": "1"}) for sku in sorted(recs)]
+        requests.append(BitrecsRequest(
+            created_at=datetime.now().isoformat(),
+            user="test_user",
+            num_results=len(results),
+            query="SKU-0",
+            context="[]",
+            site_key="test",
+            results=results,
+            models_used=[f"model-{i}"],
+            miner_uid=str(i),
+            miner_hotkey=f"hotkey-{i}"
+        ))
+    exact = select_most_similar_bitrecs(requests, 3)
+    approx = select_most_similar_bitrecs(requests, 3, approximate=True)
+    print(f"exact: {[r.miner_uid for r in exact]} approx: {[r.miner_uid for r in approx]}")
+    assert [r.miner_uid for r in approx] == [r.miner_uid for r in exact]
+
+
+def test_minhash_estimates_jaccard():
+    rec_sets = make_rec_sets(30, 80, 20, seed=3)
+    encoded = encode_sets(rec_sets)
+    signatures = minhash_signatures(encoded, num_perm=256)
+    similarity = jaccard_similarity_matrix(rec_sets)
+    i, j = np.triu_indices(len(rec_sets), k=1)
+    estimate = (signatures[i] == signatures[j]).mean(axis=1)
+    error = np.abs(estimate - similarity[i, j])
+    print(f"mean error {error.mean():.4f} max error {error.max():.4f}")
+    assert error.mean() < 0.05
+    assert np.allclose(pair_jaccard_similarity(encoded, i, j), similarity[i, j])
+
+    candidates = lsh_candidate_pairs(minhash_signatures(encode_sets([set(), set(), {"a"}, {"a"}])), bands=8)
+    assert candidates.tolist() == [[2, 3]]
+
+
+def test_renderers_reuse_analysis(monkeypatch):
+    rec_sets = make_rec_sets(12, 40, 6, seed=5)
+    models_used = [f"model-{i}" for i in range(len(rec_sets))]
+    analysis = analyze_similar_sets(rec_sets, 3)
+    assert analysis.selected == select_most_similar_sets(rec_sets, 3)
+    assert len(analysis.pairs) == len(analysis.pair_similarity) > 0
+    assert list(analysis.pairs[0]) in [analysis.selected[:2], analysis.selected[1::-1]]
+
+    expected_numpy = display_rec_matrix_numpy(rec_sets, models_used, analysis.selected)
+    expected_text = display_rec_matrix(rec_sets, models_used, analysis.selected)
+    expected_html = display_rec_matrix_html(rec_sets, models_used, analysis.selected)
+
+    def no_recompute(*args, **kwargs):
+        raise AssertionError("similarity was recomputed")
+    monkeypatch.setattr(distance, "_intersection_matrix", no_recompute)
+    monkeypatch.setattr(distance, "calculate_jaccard_distance", no_recompute)
+    assert display_rec_matrix_numpy(rec_sets, models_used, analysis=analysis) == expected_numpy
+    assert display_rec_matrix(rec_sets, models_used, analysis=analysis) == expected_text
+    assert display_rec_matrix_html(rec_sets, models_used, analysis=analysis) == expected_html
+
+
+def test_most_similar_bitrecs_skips_empty_responses():
+    requests = []
+    for i, skus in enumerate([[], ["a", "b", "c"], ["x", "y"], ["a", "b", "d"]]):
+        results = [json.dumps({"sku": sku, "name": sku, "price": "1"}) for sku in skus]
+        requests.append(BitrecsRequest(
+            created_at=datetime.now().isoformat(),
+            user="test_user",
+            num_results=len(results),
+            query="a",
+            context="[]",
+            site_key="test",
+            results=results,
+            models_used=[f"model-{i}"],
+            miner_uid=str(i),
+            miner_hotkey=f"hotkey-{i}"
+        ))
+    most_similar = select_most_similar_bitrecs(requests, 2)
+    assert sorted(r.miner_uid for r in most_similar) == ["1", "3"]
+
+
+def test_validator_uses_minhash_mode_on_large_rounds(monkeypatch):
+    import asyncio
+    import argparse
+    from types import SimpleNamespace
+    import bitrecs.base.validator as validator_module
+    from bitrecs.base.validator import BaseValidatorNeuron
+    from bitrecs.utils.config import add_validator_args
+
+    parser = argparse.ArgumentParser()
+    add_validator_args(None, parser)
+    defaults = parser.parse_args([])
+    assert defaults.__dict__["neuron.lsh_min_responses"] < 256
+
+    calls = []
+    def spy(rec_sets, top_n, approximate=False, **kwargs):
+        calls.append((len(rec_sets), approximate))
+        return analyze_similar_sets(rec_sets, top_n, approximate=approximate, **kwargs)
+    monkeypatch.setattr(validator_module, "analyze_similar_sets", spy)
+
+    def request(uid: int) -> BitrecsRequest:
+        skus = [f"SKU-{(uid % 8) * 3 + i}" for i in range(5)]
+        r = BitrecsRequest(created_at="", user="", num_results=5, query="SKU-0", context="", site_key="",
+                           results=[json.dumps({"sku": sku, "name": sku, "price": "1"}) for sku in skus],
+                           models_used=["model"], miner_uid=str(uid), miner_hotkey="")
+        r.dendrite.status_code = 200
+        r.dendrite.process_time = 1.5
+        return r
+
+    for mode, expected in [("exact", False), ("minhash", True)]:
+        neuron = SimpleNamespace(similarity_mode=mode, minhash_permutations=64, lsh_bands=8,
+                                 lsh_min_responses=defaults.__dict__["neuron.lsh_min_responses"])
+        validator = SimpleNamespace(step=1, config=SimpleNamespace(neuron=neuron, logging=SimpleNamespace(trace=False)))
+        requests = [request(uid) for uid in range(neuron.lsh_min_responses)]
+        selected = asyncio.run(BaseValidatorNeuron.analyze_similar_requests(validator, 5, requests))
+        assert calls[-1] == (len(requests), expected)
+        assert selected and all(s in requests for s in selected)
+
+    # smaller rounds are compared exactly in minhash mode
+    asyncio.run(BaseValidatorNeuron.analyze_similar_requests(validator, 5, requests[:10]))
+    assert calls[-1] == (10, False)
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+from bitrecs.commerce.user_action import ActionType, UserActionIndex
+from bitrecs.validator.reward import calculate_miner_boost
+
+
+def make_actions() -> list:
+    actions = []
+    day = datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+    for i in range(30):
+        actions.append({"hot_key": "5HotKeyA", "action": ActionType.VIEW_PRODUCT.name, "sku": f"SKU-{i}",
+                        "created_at": (day + timedelta(hours=i)).isoformat()})
+    actions.append({"hot_key": "5hotkeya", "action": ActionType.ADD_TO_CART.name, "sku": "SKU-1",
+                    "created_at": "2025-03-02T08:00:00Z"})
+    actions.append({"hot_key": "5HotKeyA", "action": ActionType.PURCHASE.name, "sku": "SKU-1",
+                    "created_at": "not a date"})
+    actions.append({"hot_key": "5HotKeyB", "action": "UNKNOWN", "sku": "SKU-2", "created_at": ""})
+    actions.append({"action": ActionType.PURCHASE.name})
+    return actions
+
+
+def test_user_action_index_counts():
+    index = UserActionIndex.build(make_actions(), bucket_size=timedelta(days=1))
+    assert len(index) == 33
+    a = index.get("5HOTKEYA")
+    assert (a.actions, a.views, a.add_to_carts, a.purchases) == (32, 30, 1, 1)
+    b = index.get("5HotKeyB")
+    assert (b.actions, b.views) == (1, 0)
+    assert index.get("missing").actions == 0
+
+    buckets = index.get_buckets("5hotkeya")
+    print(buckets)
+    assert sorted(buckets.keys()) == [datetime(2025, 3, 1, tzinfo=timezone.utc),
+                                      datetime(2025, 3, 2, tzinfo=timezone.utc)]
+    assert buckets[datetime(2025, 3, 1, tzinfo=timezone.utc)].views == 12
+    assert buckets[datetime(2025, 3, 2, tzinfo=timezone.utc)].add_to_carts == 1
+
+
+def test_miner_boost_index_matches_list():
+    actions = make_actions()
+    index = UserActionIndex.build(actions)
+    for hot_key in ["5HotKeyA", "5hotkeyb", "nobody"]:
+        assert calculate_miner_boost(hot_key, index) == calculate_miner_boost(hot_key, actions)
+    assert calculate_miner_boost("5HotKeyA", index) > 0
+    assert calculate_miner_boost("5HotKeyB", index) == 0.0
+    assert calculate_miner_boost("5HotKeyA", UserActionIndex()) == 0.0